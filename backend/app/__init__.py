@@ -5,9 +5,11 @@ from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from datetime import timedelta, datetime
 
-db = SQLAlchemy()
+from app.utils.sharding import RoutingSession
 
-def create_app():
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def create_app(config=None):
     # Get absolute paths
     app_dir = os.path.dirname(__file__)  # backend/app
     backend_dir = os.path.dirname(app_dir)  # backend
@@ -21,11 +23,35 @@ def create_app():
     # Store database in data directory for persistence across container rebuilds
     data_dir = os.path.join(backend_dir, 'data')
     os.makedirs(data_dir, exist_ok=True)  # Ensure data directory exists
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(data_dir, "expense_tracker.db")}'
+    # DATABASE_URL selects a server database (e.g. postgresql://...); without it
+    # the bundled SQLite file is used
+    from app.utils.database import resolve_database_url
+    app.config['SQLALCHEMY_DATABASE_URI'] = resolve_database_url(
+        f'sqlite:///{os.path.join(data_dir, "expense_tracker.db")}'
+    )
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file upload
     app.config['UPLOAD_FOLDER'] = os.path.join(backend_dir, 'uploads')
-    
+    # Limits of /api/uploads/batch: statements per request, and total
+    # uncompressed size of the ZIP archives in it
+    app.config['UPLOAD_BATCH_MAX_FILES'] = int(os.environ.get('UPLOAD_BATCH_MAX_FILES', 50))
+    app.config['UPLOAD_ZIP_MAX_BYTES'] = int(os.environ.get('UPLOAD_ZIP_MAX_BYTES', 256 * 1024 * 1024))
+
+    # SQLite connection tuning (applied to every pooled connection, see
+    # app/utils/database.py). WAL lets readers proceed while an upload commits.
+    app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000))
+    app.config['SQLITE_CACHE_SIZE_KB'] = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    app.config['SQLITE_TEMP_STORE'] = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+
+    # Connection pool sizing (gunicorn runs 4 threads per worker by default)
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+
     # Session configuration
     # Use consistent secret key based on environment or generate one that persists
     secret_key = os.environ.get('SECRET_KEY')
@@ -39,12 +65,88 @@ def create_app():
     app.config['SECRET_KEY'] = secret_key
     app.config['SESSION_TYPE'] = 'filesystem'
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
+    # Seconds a worker may reuse a user's role/session timeout before
+    # re-reading it (see app/utils/auth_context.py)
+    app.config['AUTH_CACHE_TTL'] = float(os.environ.get('AUTH_CACHE_TTL', 30))
+    # How often a worker checks whether another worker changed the API
+    # status or log settings (see app/utils/settings_cache.py)
+    app.config['SETTINGS_CACHE_CHECK_SECONDS'] = float(os.environ.get('SETTINGS_CACHE_CHECK_SECONDS', 5))
+
+    # Activity log entries are queued and inserted in batches by a background
+    # thread (see app/utils/activity_writer.py)
+    app.config['ACTIVITY_LOG_ASYNC'] = os.environ.get('ACTIVITY_LOG_ASYNC', 'true').lower() == 'true'
+    app.config['ACTIVITY_LOG_BUFFER_SIZE'] = int(os.environ.get('ACTIVITY_LOG_BUFFER_SIZE', 10000))
+    app.config['ACTIVITY_LOG_BATCH_SIZE'] = int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE', 200))
+    app.config['ACTIVITY_LOG_FLUSH_SECONDS'] = float(os.environ.get('ACTIVITY_LOG_FLUSH_SECONDS', 1.0))
+    # How long the activity viewer may reuse a filtered total it had to count
+    # (see app/utils/activity_counters.py)
+    app.config['ACTIVITY_COUNT_CACHE_SECONDS'] = float(os.environ.get('ACTIVITY_COUNT_CACHE_SECONDS', 30))
+
+    # Expired activity logs are archived to monthly gzip JSONL files and
+    # deleted in small chunks by a background job (see app/utils/activity_retention.py)
+    app.config['ACTIVITY_RETENTION_ENABLED'] = os.environ.get('ACTIVITY_RETENTION_ENABLED', 'true').lower() == 'true'
+    app.config['ACTIVITY_RETENTION_INTERVAL_SECONDS'] = float(os.environ.get('ACTIVITY_RETENTION_INTERVAL_SECONDS', 3600))
+    app.config['ACTIVITY_RETENTION_CHUNK_SIZE'] = int(os.environ.get('ACTIVITY_RETENTION_CHUNK_SIZE', 500))
+    app.config['ACTIVITY_RETENTION_IDLE_SECONDS'] = float(os.environ.get('ACTIVITY_RETENTION_IDLE_SECONDS', 2))
+    app.config['ACTIVITY_ARCHIVE_ENABLED'] = os.environ.get('ACTIVITY_ARCHIVE_ENABLED', 'true').lower() == 'true'
+    app.config['ACTIVITY_ARCHIVE_DIR'] = os.environ.get('ACTIVITY_ARCHIVE_DIR', os.path.join(data_dir, 'activity_archive'))
+
+    # Database setup on boot: 'auto' runs migrations and seeding only when
+    # the schema_version table is behind the latest migration, 'check' refuses
+    # to start instead (the setup belongs to prestart.py), 'always' runs it
+    # and 'skip' leaves the database alone (migrate.py)
+    app.config['DB_SETUP_MODE'] = os.environ.get('DB_SETUP_MODE', 'auto')
+    # Rows per transaction when a migration backfills a column
+    app.config['MIGRATION_BATCH_SIZE'] = int(os.environ.get('MIGRATION_BATCH_SIZE', 5000))
+
+    # Request profiling, query counting and /api/status/metrics (opt-in)
+    app.config['INSTRUMENTATION_ENABLED'] = os.environ.get('INSTRUMENTATION_ENABLED', 'false').lower() == 'true'
+    app.config['SLOW_REQUEST_MS'] = int(os.environ.get('SLOW_REQUEST_MS', 500))
+    app.config['N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))
+    # Bearer token required by /api/status/metrics when set
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '')
+
+    # 'user' keeps each user's transactions, budgets, plans and uploads in
+    # their own SQLite file under SHARD_DIR (see app/utils/sharding.py)
+    app.config['DB_SHARDING'] = os.environ.get('DB_SHARDING', 'none')
+    app.config['SHARD_DIR'] = os.environ.get('SHARD_DIR', os.path.join(data_dir, 'shards'))
+
+    # Processes that parse uploaded statements (see app/utils/ingest_pool.py):
+    # 0 parses in the request thread, 'auto' starts one per core
+    ingest_workers = os.environ.get('INGEST_WORKERS', '0')
+    app.config['INGEST_WORKERS'] = (os.cpu_count() or 1) if ingest_workers == 'auto' else int(ingest_workers)
+    # CSV files larger than this are split into byte ranges across the workers
+    app.config['INGEST_SPLIT_BYTES'] = int(os.environ.get('INGEST_SPLIT_BYTES', 1024 * 1024))
+
+    # Gregorian years covered by the precomputed Badí' day table
+    app.config['BADI_TABLE_SPAN'] = os.environ.get('BADI_TABLE_SPAN', '1900-2200')
+
+    # Explicit overrides (used by the test suite to point at a scratch database)
+    if config:
+        app.config.update(config)
+
+    from app.utils.badi_calendar import configure_badi_table
+    start_year, _, end_year = app.config['BADI_TABLE_SPAN'].partition('-')
+    configure_badi_table(int(start_year), int(end_year))
     
     # Ensure directories exist
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
     # Initialize extensions
+    from app.utils.database import engine_options, configure_engine
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
     db.init_app(app)
+    with app.app_context():
+        configure_engine(app, db.engine)
+        if app.config['INSTRUMENTATION_ENABLED']:
+            # Registered before the other request hooks so they are timed too
+            from app.utils.instrumentation import init_instrumentation
+            init_instrumentation(app, db.engine)
+        if app.config['DB_SHARDING'] == 'user':
+            from app.utils.sharding import init_sharding
+            init_sharding(app, db.engine)
+        elif app.config['DB_SHARDING'] != 'none':
+            raise RuntimeError(f"DB_SHARDING must be 'none' or 'user', not {app.config['DB_SHARDING']!r}")
     CORS(app, supports_credentials=True)
     
     # Register blueprints
@@ -94,9 +196,9 @@ def create_app():
                     'authenticated': False
                 }), 401
             
-            # Fetch user once for both timeout check and write permission check
-            from app.models.user import User
-            user = User.query.get(session['user_id'])
+            # Load the auth context once for both timeout check and write permission check
+            from app.utils.auth_context import get_auth_user
+            user = get_auth_user(session['user_id'])
             if not user:
                 session.clear()
                 return jsonify({'error': 'Authentication required', 'authenticated': False}), 401
@@ -107,7 +209,7 @@ def create_app():
                 try:
                     last_dt = datetime.fromisoformat(last_activity)
                     elapsed_minutes = (datetime.utcnow() - last_dt).total_seconds() / 60
-                    timeout = user.session_timeout if user.session_timeout is not None else User.DEFAULT_SESSION_TIMEOUT
+                    timeout = user.session_timeout
                     if elapsed_minutes > timeout:
                         session.clear()
                         return jsonify({
@@ -130,18 +232,23 @@ def create_app():
                         'authorized': False
                     }), 403
     
+    # Lets the retention job wait until this worker is idle
+    @app.before_request
+    def track_request_activity():
+        from app.utils.activity_retention import note_request
+        note_request(app)
+
     # API Status Middleware
     @app.before_request
     def check_api_status():
         """Check if API is enabled before processing requests"""
-        from app.models.api_status import ApiStatus
+        from app.utils.settings_cache import api_enabled
         
         # Always allow status endpoint and frontend routes
         if request.path.startswith('/api/status') or not request.path.startswith('/api'):
             return
         
-        status = ApiStatus.query.first()
-        if status and not status.is_enabled:
+        if not api_enabled():
             return jsonify({
                 'error': 'API is currently offline for maintenance',
                 'status': 'offline'
@@ -184,55 +291,71 @@ def create_app():
     def serve_static(filename):
         return send_from_directory(app.static_folder, filename)
     
-    # Create tables and initialize defaults
+    # Create tables and initialize defaults (skipped when already current)
+    with app.app_context():
+        from app.utils.migrations import SCHEMA_VERSION, current_version
+        mode = app.config['DB_SETUP_MODE']
+        if mode == 'always' or (mode != 'skip' and current_version(db.engine) < SCHEMA_VERSION):
+            if mode == 'check':
+                raise RuntimeError(
+                    f'Database schema is at version {current_version(db.engine)}, '
+                    f'this release needs {SCHEMA_VERSION}: run `python prestart.py` first'
+                )
+            prepare_database(app)
+
+    # Background activity-log retention (not in tests, which trigger it directly)
+    if app.config['ACTIVITY_RETENTION_ENABLED'] and not app.config.get('TESTING'):
+        import atexit
+        from app.utils.activity_retention import RetentionScheduler
+        scheduler = RetentionScheduler(app).start()
+        app.extensions['activity_retention_scheduler'] = scheduler
+        atexit.register(scheduler.stop)
+    
+    return app
+
+
+def prepare_database(app):
+    """Create tables, apply pending migrations and seed default data."""
+    from app.models.user import User
+    from app.utils.migrations import upgrade
+    upgrade(app)
     with app.app_context():
-        db.create_all()
-        # Run any pending schema migrations
-        _run_migrations(app)
         # Create default admin user
-        from app.models.user import User
         User.create_default_admin()
         # Initialize default categorization rules
         _initialize_default_rules()
-    
-    return app
 
 
-def _run_migrations(app):
-    """Apply incremental schema migrations that db.create_all() won't handle
-    (adding columns to existing tables)."""
-    from sqlalchemy import text
-    with app.app_context():
-        with db.engine.connect() as conn:
-            # --- Migration: add session_timeout to users ---
-            result = conn.execute(text("PRAGMA table_info(users)"))
-            columns = {row[1] for row in result.fetchall()}
-            if 'session_timeout' not in columns:
-                conn.execute(text(
-                    "ALTER TABLE users ADD COLUMN session_timeout INTEGER NOT NULL DEFAULT 15"
-                ))
-                conn.commit()
-                print("✓ Migration applied: added session_timeout column to users table")
-
-            # --- Migration: add group_name + consolidated_category_ids to budget_plan_items ---
-            result2 = conn.execute(text("PRAGMA table_info(budget_plan_items)"))
-            bp_cols_rows = result2.fetchall()
-            if bp_cols_rows:  # table exists
-                bp_cols = {row[1] for row in bp_cols_rows}
-                if 'group_name' not in bp_cols:
-                    conn.execute(text(
-                        "ALTER TABLE budget_plan_items ADD COLUMN group_name TEXT"
-                    ))
-                    conn.commit()
-                    print("✓ Migration applied: added group_name to budget_plan_items")
-                if 'consolidated_category_ids' not in bp_cols:
-                    conn.execute(text(
-                        "ALTER TABLE budget_plan_items"
-                        " ADD COLUMN consolidated_category_ids TEXT"
-                    ))
-                    conn.commit()
-                    print("✓ Migration applied: added consolidated_category_ids"
-                          " to budget_plan_items")
+# Secondary indexes for the hot access paths. Every report and listing query
+# filters on user_id plus a date range (sometimes with category_id), uploads
+# and budgets are looked up by owner, and rules/plans by their foreign keys.
+# db.create_all() never adds indexes to tables that already exist, so the set
+# is managed here and built by create_managed_indexes() in app/utils/migrations.py.
+# Adding an entry needs a new migration that calls it, so existing databases
+# get the index too.
+# (name, table, columns)
+MANAGED_INDEXES = [
+    ('ix_transactions_user_date', 'transactions', ('user_id', 'date')),
+    ('ix_transactions_user_category_date', 'transactions', ('user_id', 'category_id', 'date')),
+    ('ix_transactions_upload', 'transactions', ('upload_id',)),
+    ('ix_budgets_user_period_year', 'budgets', ('user_id', 'period', 'year')),
+    ('ix_budgets_category', 'budgets', ('category_id',)),
+    ('ix_budget_plans_user', 'budget_plans', ('user_id',)),
+    ('ix_budget_plan_items_plan', 'budget_plan_items', ('plan_id',)),
+    ('ix_budget_plan_items_category', 'budget_plan_items', ('category_id',)),
+    ('ix_categorization_rules_user_active', 'categorization_rules', ('user_id', 'is_active', 'priority')),
+    ('ix_categorization_rules_category', 'categorization_rules', ('category_id',)),
+    ('ix_categories_user', 'categories', ('user_id',)),
+    ('ix_categories_parent', 'categories', ('parent_id',)),
+    ('ix_excluded_expenses_transaction', 'excluded_expenses', ('transaction_id',)),
+    ('ix_uploads_user_created', 'uploads', ('user_id', 'created_at')),
+    ('ix_bank_templates_user', 'bank_templates', ('user_id',)),
+    # Activity viewer filters, each ordered by the (created_at, id) cursor
+    ('ix_activity_logs_created_id', 'activity_logs', ('created_at', 'id')),
+    ('ix_activity_logs_category_action_created', 'activity_logs', ('category', 'action', 'created_at', 'id')),
+    ('ix_activity_logs_action_created', 'activity_logs', ('action', 'created_at', 'id')),
+    ('ix_activity_logs_username_created', 'activity_logs', ('username', 'created_at', 'id')),
+]
 
 
 def _initialize_default_rules():
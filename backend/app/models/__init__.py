@@ -7,7 +7,11 @@ from app.models.excluded_expense import ExcludedExpense
 from app.models.categorization_rule import CategorizationRule
 from app.models.api_status import ApiStatus
 from app.models.activity_log import ActivityLog
+from app.models.activity_daily_count import ActivityDailyCount
 from app.models.log_settings import LogSettings
+from app.models.settings_version import SettingsVersion
+from app.models.schema_version import SchemaVersion
 
 __all__ = ['Upload', 'Transaction', 'Category', 'Budget', 'BudgetPlan', 'BudgetPlanItem',
-           'ExcludedExpense', 'CategorizationRule', 'ApiStatus', 'ActivityLog', 'LogSettings']
+           'ExcludedExpense', 'CategorizationRule', 'ApiStatus', 'ActivityLog', 'LogSettings',
+           'SettingsVersion', 'ActivityDailyCount', 'SchemaVersion']
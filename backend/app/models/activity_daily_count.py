@@ -0,0 +1,22 @@
+"""
+Per-day activity counters backing the activity viewer totals and stats.
+"""
+
+from app import db
+
+
+class ActivityDailyCount(db.Model):
+    """Number of activity_logs rows per (UTC day, category, action).
+
+    Maintained incrementally by app/utils/activity_counters.py whenever
+    entries are written or purged.
+    """
+    __tablename__ = 'activity_daily_counts'
+    
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    action = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ActivityDailyCount {self.day} {self.category}/{self.action}: {self.count}>'
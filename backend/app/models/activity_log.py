@@ -99,6 +99,9 @@ class ActivityLog(db.Model):
         )
         db.session.add(log_entry)
         try:
+            from app.utils.activity_counters import bump_counters
+            db.session.flush()
+            bump_counters(db.session.connection(), [log_entry])
             db.session.commit()
         except Exception:
             db.session.rollback()
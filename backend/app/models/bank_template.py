@@ -17,6 +17,8 @@ class BankTemplate(db.Model):
     # JSON dict: {date_col, description_col, amount_col, category_col (optional)}
     column_mapping = db.Column(db.Text, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Shared templates are offered to every user (only superusers can share)
+    is_shared = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     user = db.relationship('User', backref='bank_templates')
@@ -45,5 +47,6 @@ class BankTemplate(db.Model):
             'headers': self.get_headers(),
             'column_mapping': self.get_mapping(),
             'user_id': self.user_id,
+            'is_shared': bool(self.is_shared),
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
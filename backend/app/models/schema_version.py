@@ -0,0 +1,18 @@
+"""
+Schema version record used to skip database setup on worker boot.
+"""
+
+from app import db
+from datetime import datetime
+
+
+class SchemaVersion(db.Model):
+    """One row per schema version whose setup has been applied to this database"""
+    __tablename__ = 'schema_version'
+    
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(200))
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SchemaVersion {self.version}>'
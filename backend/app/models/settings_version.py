@@ -0,0 +1,16 @@
+"""
+Settings version counter used to invalidate per-process settings caches.
+"""
+
+from app import db
+
+
+class SettingsVersion(db.Model):
+    """Single-row counter, bumped whenever ApiStatus or LogSettings change"""
+    __tablename__ = 'settings_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<SettingsVersion {self.version}>'
@@ -1,3 +1,5 @@
+import uuid
+
 from app import db
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -29,6 +31,9 @@ class User(db.Model):
     session_timeout = db.Column(db.Integer, nullable=False, default=15)  # Idle session timeout in minutes
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Names the user's shard file (DB_SHARDING=user). Unlike the id it is never
+    # reused, so a new user can never reach a deleted user's shard.
+    shard_key = db.Column(db.String(32), default=lambda: uuid.uuid4().hex)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -2,25 +2,39 @@
 Activity Log routes for viewing and managing activity history.
 """
 
-from flask import Blueprint, request, jsonify, send_file, session
+from flask import Blueprint, request, jsonify, session, current_app, Response, stream_with_context
 from app import db
 from app.models.activity_log import ActivityLog
 from app.models.log_settings import LogSettings
 from app.routes.auth import write_required, superuser_required
+from app.utils.settings_cache import invalidate_settings
+from app.utils.activity_writer import flush_activity_log, get_activity_writer
+from app.utils.activity_counters import activity_stats, cached_count, counted_total
+from app.utils.activity_export import ActivityExport, available_compressions
+from app.utils.activity_retention import purge_activity_logs, retention_status, run_retention
 from datetime import datetime, timedelta
-import csv
-import json
-import io
+from sqlalchemy import and_, or_
 import os
 
 bp = Blueprint('activity', __name__, url_prefix='/api/activity')
 
+@bp.before_request
+def write_pending_activities():
+    """Entries are written asynchronously; make sure queued ones are visible here"""
+    flush_activity_log()
+
 @bp.route('/', methods=['GET'])
 def get_activities():
-    """Get activity logs with optional filters"""
+    """Get activity logs with optional filters.
+
+    Pages are fetched by keyset: pass the previous response's next_cursor as
+    ?cursor= to get the following page (?page= still works, via OFFSET).
+    """
     # Pagination
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
+    per_page = max(1, min(per_page, 500))
+    cursor = request.args.get('cursor')
     
     # Filters
     category = request.args.get('category')
@@ -28,6 +42,7 @@ def get_activities():
     username = request.args.get('username')
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    start = end = None
     
     query = ActivityLog.query
     
@@ -50,18 +65,43 @@ def get_activities():
         except ValueError:
             pass
     
-    # Order by most recent
-    query = query.order_by(ActivityLog.created_at.desc())
+    # Total from the per-day counters; a username filter needs a (cached) count
+    if username:
+        total = cached_count((category, action, username, start, end), query)
+    else:
+        total = counted_total(category, action, start, end)
+    
+    # Order by most recent, id breaking ties so the cursor is unambiguous
+    query = query.order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc())
     
-    # Paginate
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    if cursor:
+        try:
+            cursor_at, cursor_id = cursor.rsplit('_', 1)
+            cursor_at, cursor_id = datetime.fromisoformat(cursor_at), int(cursor_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(or_(
+            ActivityLog.created_at < cursor_at,
+            and_(ActivityLog.created_at == cursor_at, ActivityLog.id < cursor_id)
+        ))
+    elif page > 1:
+        query = query.offset((page - 1) * per_page)
+    
+    # One extra row tells whether another page follows
+    activities = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(activities) > per_page:
+        activities = activities[:per_page]
+        last = activities[-1]
+        next_cursor = f'{last.created_at.isoformat()}_{last.id}'
     
     return jsonify({
-        'activities': [a.to_dict() for a in pagination.items],
-        'total': pagination.total,
+        'activities': [a.to_dict() for a in activities],
+        'total': total,
         'page': page,
         'per_page': per_page,
-        'pages': pagination.pages
+        'pages': (total + per_page - 1) // per_page,
+        'next_cursor': next_cursor
     })
 
 @bp.route('/recent', methods=['GET'])
@@ -96,36 +136,11 @@ def get_users():
 
 @bp.route('/stats', methods=['GET'])
 def get_stats():
-    """Get activity statistics"""
+    """Get activity statistics (from the per-day counters)"""
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     week_ago = today - timedelta(days=7)
     
-    # Count activities by category for last 7 days
-    from sqlalchemy import func
-    
-    category_counts = db.session.query(
-        ActivityLog.category,
-        func.count(ActivityLog.id)
-    ).filter(
-        ActivityLog.created_at >= week_ago
-    ).group_by(ActivityLog.category).all()
-    
-    action_counts = db.session.query(
-        ActivityLog.action,
-        func.count(ActivityLog.id)
-    ).filter(
-        ActivityLog.created_at >= week_ago
-    ).group_by(ActivityLog.action).all()
-    
-    total_today = ActivityLog.query.filter(ActivityLog.created_at >= today).count()
-    total_week = ActivityLog.query.filter(ActivityLog.created_at >= week_ago).count()
-    
-    return jsonify({
-        'total_today': total_today,
-        'total_week': total_week,
-        'by_category': {c: count for c, count in category_counts},
-        'by_action': {a: count for a, count in action_counts}
-    })
+    return jsonify(activity_stats(today, week_ago))
 
 @bp.route('/clear', methods=['DELETE'])
 @superuser_required
@@ -138,14 +153,40 @@ def clear_old_activities():
     
     cutoff = datetime.utcnow() - timedelta(days=days)
     
-    deleted = ActivityLog.query.filter(ActivityLog.created_at < cutoff).delete()
-    db.session.commit()
+    # Chunked so a large backlog never holds the write lock in one transaction
+    _, deleted = purge_activity_logs(
+        cutoff, chunk_size=current_app.config.get('ACTIVITY_RETENTION_CHUNK_SIZE', 500))
     
     return jsonify({
         'message': f'Deleted {deleted} activity logs older than {days} days',
         'deleted_count': deleted
     })
 
+@bp.route('/retention', methods=['GET'])
+@superuser_required
+def get_retention_status():
+    """Get progress of the current or last retention/archival run"""
+    return jsonify(retention_status(current_app._get_current_object()))
+
+@bp.route('/retention/run', methods=['POST'])
+@superuser_required
+def run_retention_now():
+    """Start a retention run now (in the background when the scheduler is running)"""
+    app = current_app._get_current_object()
+    scheduler = app.extensions.get('activity_retention_scheduler')
+    if scheduler is not None:
+        scheduler.run_now()
+        return jsonify({'message': 'Retention run started', 'status': retention_status(app)}), 202
+
+    status = run_retention(app, wait_for_idle=False)
+    return jsonify({'message': 'Retention run finished', 'status': status})
+
+@bp.route('/writer-stats', methods=['GET'])
+@superuser_required
+def get_writer_stats():
+    """Get buffered activity writer metrics (queue depth, written and dropped entries)"""
+    return jsonify(get_activity_writer().stats())
+
 # ==================== Log Settings Endpoints ==================== #
 
 @bp.route('/settings', methods=['GET'])
@@ -223,6 +264,7 @@ def update_log_settings():
     
     settings.updated_by = session.get('username', 'system')
     db.session.commit()
+    invalidate_settings()
     
     return jsonify({
         'message': 'Log settings updated successfully',
@@ -231,125 +273,58 @@ def update_log_settings():
 
 @bp.route('/export', methods=['GET'])
 def export_logs():
-    """Export activity logs to file"""
+    """Export activity logs to file (streamed; optional ?compress=gzip|zstd).
+
+    Resume an interrupted export by repeating it with max_id set below the
+    last id received.
+    """
     settings = LogSettings.get_settings()
     export_format = request.args.get('format', settings.export_format)
+    compression = request.args.get('compress') or None
+    if compression and compression not in available_compressions():
+        return jsonify({'error': f'Unsupported compression: {compression}',
+                        'available': available_compressions()}), 400
     
     # Get filter parameters
-    category = request.args.get('category')
-    action = request.args.get('action')
+    start = end = None
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
-    
-    query = ActivityLog.query
-    
-    if category:
-        query = query.filter(ActivityLog.category == category)
-    if action:
-        query = query.filter(ActivityLog.action == action)
     if start_date:
         try:
             start = datetime.strptime(start_date, '%Y-%m-%d')
-            query = query.filter(ActivityLog.created_at >= start)
         except ValueError:
             pass
     if end_date:
         try:
             end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-            query = query.filter(ActivityLog.created_at < end)
         except ValueError:
             pass
     
-    logs = query.order_by(ActivityLog.created_at.desc()).all()
+    export = ActivityExport(
+        export_format,
+        category=request.args.get('category'),
+        action=request.args.get('action'),
+        start=start,
+        end=end,
+        min_id=request.args.get('min_id', type=int),
+        max_id=request.args.get('max_id', type=int),
+    )
     
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    
-    if export_format == 'csv':
-        return export_csv(logs, timestamp)
-    elif export_format == 'json':
-        return export_json(logs, timestamp)
-    else:  # txt
-        return export_txt(logs, timestamp)
-
-def export_csv(logs, timestamp):
-    """Export logs as CSV"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow(['Timestamp', 'User', 'Action', 'Category', 'Description', 'IP Address', 'Details'])
-    
-    # Data
-    for log in logs:
-        writer.writerow([
-            log.created_at.isoformat() if log.created_at else '',
-            log.username or '',
-            log.action or '',
-            log.category or '',
-            log.description or '',
-            log.ip_address or '',
-            log.details or ''
-        ])
-    
-    output.seek(0)
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'activity_logs_{timestamp}.csv'
-    )
-
-def export_json(logs, timestamp):
-    """Export logs as JSON"""
-    data = {
-        'exported_at': datetime.utcnow().isoformat(),
-        'total_records': len(logs),
-        'logs': [log.to_dict() for log in logs]
-    }
-    
-    output = json.dumps(data, indent=2, default=str)
-    
-    return send_file(
-        io.BytesIO(output.encode('utf-8')),
-        mimetype='application/json',
-        as_attachment=True,
-        download_name=f'activity_logs_{timestamp}.json'
-    )
-
-def export_txt(logs, timestamp):
-    """Export logs as plain text"""
-    lines = [
-        f"Activity Logs Export",
-        f"Exported: {datetime.utcnow().isoformat()}",
-        f"Total Records: {len(logs)}",
-        "=" * 80,
-        ""
-    ]
-    
-    for log in logs:
-        lines.append(f"[{log.created_at.isoformat() if log.created_at else 'N/A'}]")
-        lines.append(f"  User: {log.username or 'N/A'}")
-        lines.append(f"  Action: {log.action or 'N/A'}")
-        lines.append(f"  Category: {log.category or 'N/A'}")
-        lines.append(f"  Description: {log.description or 'N/A'}")
-        lines.append(f"  IP Address: {log.ip_address or 'N/A'}")
-        if log.details:
-            lines.append(f"  Details: {log.details}")
-        lines.append("-" * 40)
-    
-    output = '\n'.join(lines)
-    
-    return send_file(
-        io.BytesIO(output.encode('utf-8')),
-        mimetype='text/plain',
-        as_attachment=True,
-        download_name=f'activity_logs_{timestamp}.txt'
+    return Response(
+        stream_with_context(export.iter_bytes(compression)),
+        mimetype=export.mimetype(compression),
+        headers={
+            'Content-Disposition': f'attachment; filename={export.filename(timestamp, compression)}',
+            'X-Export-Max-Id': str(export.max_id),
+            'X-Export-Total': str(export.total),
+        }
     )
 
 @bp.route('/save-to-file', methods=['POST'])
 @superuser_required
 def save_logs_to_file():
-    """Save logs to configured file destination"""
+    """Save logs to configured file destination (optional {"compress": "gzip"|"zstd"})"""
     settings = LogSettings.get_settings()
     
     if not settings.file_logging_enabled:
@@ -358,65 +333,46 @@ def save_logs_to_file():
     if not settings.log_path:
         return jsonify({'error': 'Log path is not configured'}), 400
     
-    # Get logs to export
-    logs = ActivityLog.query.order_by(ActivityLog.created_at.desc()).all()
+    compression = (request.get_json(silent=True) or {}).get('compress') or None
+    if compression and compression not in available_compressions():
+        return jsonify({'error': f'Unsupported compression: {compression}',
+                        'available': available_compressions()}), 400
+    
+    # Logs to export (streamed to the destination in chunks)
+    export = ActivityExport(settings.export_format)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     try:
         if settings.log_destination_type == 'local':
-            return save_to_local(logs, settings, timestamp)
+            return save_to_local(export, settings, timestamp, compression)
         elif settings.log_destination_type == 'smb':
-            return save_to_smb(logs, settings, timestamp)
+            return save_to_smb(export, settings, timestamp)
         elif settings.log_destination_type == 'nfs':
-            return save_to_nfs(logs, settings, timestamp)
+            return save_to_nfs(export, settings, timestamp, compression)
         else:
             return jsonify({'error': 'Invalid destination type'}), 400
     except Exception as e:
         return jsonify({'error': f'Failed to save logs: {str(e)}'}), 500
 
-def save_to_local(logs, settings, timestamp):
+def save_to_local(export, settings, timestamp, compression=None):
     """Save logs to local file system"""
     try:
         # Ensure directory exists
         os.makedirs(settings.log_path, exist_ok=True)
         
-        filename = f'activity_logs_{timestamp}.{settings.export_format}'
-        filepath = os.path.join(settings.log_path, filename)
-        
-        if settings.export_format == 'csv':
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Timestamp', 'User', 'Action', 'Category', 'Description', 'IP Address', 'Details'])
-                for log in logs:
-                    writer.writerow([
-                        log.created_at.isoformat() if log.created_at else '',
-                        log.username or '', log.action or '', log.category or '',
-                        log.description or '', log.ip_address or '', log.details or ''
-                    ])
-        elif settings.export_format == 'json':
-            with open(filepath, 'w', encoding='utf-8') as f:
-                data = {'exported_at': datetime.utcnow().isoformat(), 'total_records': len(logs),
-                        'logs': [log.to_dict() for log in logs]}
-                json.dump(data, f, indent=2, default=str)
-        else:  # txt
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(f"Activity Logs Export\nExported: {datetime.utcnow().isoformat()}\n")
-                f.write(f"Total Records: {len(logs)}\n{'=' * 80}\n\n")
-                for log in logs:
-                    f.write(f"[{log.created_at.isoformat() if log.created_at else 'N/A'}]\n")
-                    f.write(f"  User: {log.username}\n  Action: {log.action}\n")
-                    f.write(f"  Category: {log.category}\n  Description: {log.description}\n")
-                    f.write(f"  IP: {log.ip_address}\n{'-' * 40}\n")
+        filepath = os.path.join(settings.log_path, export.filename(timestamp, compression))
+        size = export.write_to(filepath, compression)
         
         return jsonify({
             'message': f'Logs saved successfully to {filepath}',
             'filepath': filepath,
-            'records': len(logs)
+            'records': export.total,
+            'bytes': size
         })
     except Exception as e:
         return jsonify({'error': f'Failed to save to local: {str(e)}'}), 500
 
-def save_to_smb(logs, settings, timestamp):
+def save_to_smb(export, settings, timestamp):
     """Save logs to SMB share"""
     # Note: In production, you would use smbclient or pysmb library
     # For now, we return instructions for manual setup
@@ -424,10 +380,10 @@ def save_to_smb(logs, settings, timestamp):
         'message': 'SMB export requires additional configuration',
         'instructions': f'Mount SMB share //{settings.smb_server}/{settings.smb_share} and use local export',
         'smb_path': f'//{settings.smb_server}/{settings.smb_share}',
-        'records': len(logs)
+        'records': export.total
     })
 
-def save_to_nfs(logs, settings, timestamp):
+def save_to_nfs(export, settings, timestamp, compression=None):
     """Save logs to NFS share"""
     # Note: NFS should be mounted on the system level
     # We attempt to write to the mount point if it exists
@@ -435,13 +391,13 @@ def save_to_nfs(logs, settings, timestamp):
     
     if os.path.exists(nfs_path) and os.path.isdir(nfs_path):
         settings.log_path = nfs_path
-        return save_to_local(logs, settings, timestamp)
+        return save_to_local(export, settings, timestamp, compression)
     
     return jsonify({
         'message': 'NFS export requires mount configuration',
         'instructions': f'Mount NFS export {settings.nfs_server}:{settings.nfs_export} to {nfs_path}',
         'nfs_path': f'{settings.nfs_server}:{settings.nfs_export}',
-        'records': len(logs)
+        'records': export.total
     })
 
 @bp.route('/test-destination', methods=['POST'])
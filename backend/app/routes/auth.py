@@ -2,33 +2,16 @@ from flask import Blueprint, request, jsonify, session
 from app import db
 from app.models.user import User
 from app.models.activity_log import ActivityLog
-from app.models.log_settings import LogSettings
+from app.utils.activity_logger import log_activity as record_activity
+from app.utils.auth_context import get_auth_user, invalidate_user
 from functools import wraps
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
 def log_activity(action, category, description, details=None):
-    """Helper to log activities - checks settings before logging"""
-    import json
-    try:
-        settings = LogSettings.get_settings()
-        if not settings.should_log(action, category):
-            return
-    except:
-        pass  # If settings fail, log anyway
-    
-    log = ActivityLog(
-        action=action,
-        category=category,
-        description=description,
-        details=json.dumps(details) if details else None,
-        user_id=session.get('user_id'),
-        username=session.get('username', 'anonymous'),
-        ip_address=request.remote_addr
-    )
-    db.session.add(log)
-    db.session.commit()
+    """Helper to log activities (filtered by log settings, written asynchronously)"""
+    record_activity(action, category, description, details)
 
 def login_required(f):
     """Decorator to require login for a route"""
@@ -46,7 +29,7 @@ def superuser_required(f):
         if 'user_id' not in session:
             return jsonify({'error': 'Authentication required', 'authenticated': False}), 401
         
-        user = User.query.get(session['user_id'])
+        user = get_auth_user(session['user_id'])
         if not user or not user.is_superuser():
             return jsonify({'error': 'Superuser access required', 'authorized': False}), 403
         return f(*args, **kwargs)
@@ -59,7 +42,7 @@ def write_required(f):
         if 'user_id' not in session:
             return jsonify({'error': 'Authentication required', 'authenticated': False}), 401
         
-        user = User.query.get(session['user_id'])
+        user = get_auth_user(session['user_id'])
         if not user or not user.can_write():
             return jsonify({'error': 'Write access required. Viewer role is read-only.', 'authorized': False}), 403
         return f(*args, **kwargs)
@@ -96,6 +79,8 @@ def login():
     session['role'] = user.role
     session['last_activity'] = datetime.utcnow().isoformat()
     session.permanent = True
+    # Start every login from the current database row
+    invalidate_user(user.id)
     
     # Log successful login
     log_activity(
@@ -118,16 +103,13 @@ def logout():
     
     # Log logout before clearing session
     if user_id:
-        log = ActivityLog(
-            action=ActivityLog.ACTION_LOGOUT,
-            category=ActivityLog.CATEGORY_AUTH,
-            description=f'User {username} logged out',
+        record_activity(
+            ActivityLog.ACTION_LOGOUT,
+            ActivityLog.CATEGORY_AUTH,
+            f'User {username} logged out',
             user_id=user_id,
-            username=username,
-            ip_address=request.remote_addr
+            username=username
         )
-        db.session.add(log)
-        db.session.commit()
     
     session.clear()
     return jsonify({'message': 'Logged out successfully'})
@@ -138,14 +120,14 @@ def get_current_user_info():
     if 'user_id' not in session:
         return jsonify({'authenticated': False}), 401
     
-    user = User.query.get(session['user_id'])
+    user = get_auth_user(session['user_id'])
     if not user:
         session.clear()
         return jsonify({'authenticated': False}), 401
     
     return jsonify({
         'authenticated': True,
-        'user': user.to_dict()
+        'user': user.profile
     })
 
 @auth_bp.route('/change-password', methods=['POST'])
@@ -186,9 +168,9 @@ def change_password():
 @login_required
 def get_session_config():
     """Get the current user's session timeout setting"""
-    user = User.query.get(session['user_id'])
+    user = get_auth_user(session['user_id'])
     return jsonify({
-        'session_timeout': user.session_timeout if user.session_timeout is not None else User.DEFAULT_SESSION_TIMEOUT,
+        'session_timeout': user.session_timeout,
         'last_activity': session.get('last_activity')
     })
 
@@ -216,6 +198,7 @@ def update_session_config():
     user = User.query.get(session['user_id'])
     user.session_timeout = timeout
     db.session.commit()
+    invalidate_user(user.id)
 
     log_activity(
         ActivityLog.ACTION_UPDATE,
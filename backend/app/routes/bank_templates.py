@@ -1,8 +1,8 @@
 """
 API routes for bank statement templates.
 Endpoints:
-  GET    /api/bank-templates/            list templates for current user
-  POST   /api/bank-templates/            create a new template
+  GET    /api/bank-templates/            list the current user's templates and the shared ones
+  POST   /api/bank-templates/            create a new template (superusers may set is_shared)
   DELETE /api/bank-templates/<id>        delete a template
   POST   /api/bank-templates/detect      analyse a file and suggest a matching template
 """
@@ -11,6 +11,8 @@ from flask import Blueprint, request, jsonify, session
 from app import db
 from app.models.bank_template import BankTemplate
 from app.routes.auth import login_required, write_required
+from app.utils.auth_context import get_auth_user
+from app.utils.template_index import get_template_index, invalidate_templates, visible_templates
 import json
 import csv
 import io
@@ -24,8 +26,7 @@ bank_templates_bp = Blueprint('bank_templates', __name__, url_prefix='/api/bank-
 @login_required
 def get_templates():
     templates = (
-        BankTemplate.query
-        .filter_by(user_id=session['user_id'])
+        visible_templates(session['user_id'])
         .order_by(BankTemplate.name)
         .all()
     )
@@ -48,15 +49,20 @@ def create_template():
         return jsonify({'error': 'headers are required'}), 400
     if not mapping.get('date_col') or not mapping.get('description_col') or not mapping.get('amount_col'):
         return jsonify({'error': 'column_mapping must include date_col, description_col, and amount_col'}), 400
+    is_shared = bool(data.get('is_shared', False))
+    if is_shared and not get_auth_user(session['user_id']).is_superuser():
+        return jsonify({'error': 'Only superusers can share templates'}), 403
 
     template = BankTemplate(
         name=name,
         headers=json.dumps(headers),
         column_mapping=json.dumps(mapping),
         user_id=session['user_id'],
+        is_shared=is_shared,
     )
     db.session.add(template)
     db.session.commit()
+    invalidate_templates(None if is_shared else session['user_id'])
     return jsonify(template.to_dict()), 201
 
 
@@ -68,8 +74,10 @@ def delete_template(template_id):
     template = BankTemplate.query.filter_by(
         id=template_id, user_id=session['user_id']
     ).first_or_404()
+    is_shared = template.is_shared
     db.session.delete(template)
     db.session.commit()
+    invalidate_templates(None if is_shared else session['user_id'])
     return jsonify({'message': 'Template deleted'})
 
 
@@ -102,13 +110,8 @@ def detect_bank():
 
         headers = [h for h in headers if h]
 
-        templates = BankTemplate.query.filter_by(user_id=session['user_id']).all()
-        matches = []
-        for t in templates:
-            score = t.match_score(headers)
-            if score > 0:
-                matches.append({'template': t.to_dict(), 'score': round(score, 3)})
-        matches.sort(key=lambda x: x['score'], reverse=True)
+        matches = [{'template': template, 'score': score}
+                   for template, score in get_template_index(session['user_id']).matches(headers)]
 
         return jsonify({
             'file_headers': headers,
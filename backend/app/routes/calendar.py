@@ -13,7 +13,8 @@ from app.utils.badi_calendar import (
     get_all_months,
     get_badi_month_name,
     format_badi_date,
-    gregorian_year_to_badi_year
+    gregorian_year_to_badi_year,
+    get_naw_ruz
 )
 
 bp = Blueprint('calendar', __name__, url_prefix='/api/calendar')
@@ -140,3 +141,15 @@ def gregorian_year_to_badi():
         'gregorian_month': month,
         'badi_year': badi_year
     })
+
+@bp.route('/badi/naw-ruz', methods=['GET'])
+def get_naw_ruz_dates():
+    """Get Naw-Rúz dates for a range of Gregorian years (default: 50 years around today)."""
+    this_year = date.today().year
+    start = request.args.get('start', this_year - 25, type=int)
+    end = request.args.get('end', this_year + 25, type=int)
+    
+    if end < start or end - start > 500:
+        return jsonify({'error': 'Invalid year range'}), 400
+    
+    return jsonify({str(year): get_naw_ruz(year).isoformat() for year in range(start, end + 1)})
@@ -12,6 +12,7 @@ from app.utils.badi_calendar import (
     get_badi_year_date_range,
     get_current_badi_date
 )
+from app.utils.rollups import rollup, trailing_range
 
 reports_bp = Blueprint('reports', __name__, url_prefix='/api/reports')
 
@@ -184,6 +185,7 @@ def get_by_category():
     )
     
     query = Transaction.query.filter(
+        Transaction.user_id == session['user_id'],
         Transaction.date >= start_date,
         Transaction.date <= end_date,
         Transaction.type == transaction_type
@@ -264,16 +266,17 @@ def get_budget_analysis():
     )
     
     # Get all budgets for this period
-    budgets = Budget.query.filter_by(period=period, year=year).all()
+    budgets = Budget.query.filter_by(user_id=session['user_id'], period=period, year=year).all()
     if period == 'monthly':
         budgets = [b for b in budgets if b.month == month]
     
     results = []
     for budget in budgets:
         query = Transaction.query.filter(
+            Transaction.user_id == session['user_id'],
+            Transaction.category_id == budget.category_id,
             Transaction.date >= start_date,
-            Transaction.date <= end_date,
-            Transaction.category_id == budget.category_id
+            Transaction.date <= end_date
         )
         
         if not include_excluded:
@@ -313,38 +316,64 @@ def get_budget_analysis():
 @reports_bp.route('/trending', methods=['GET'])
 @login_required
 def get_trending():
-    """Get spending trends over time"""
-    months = request.args.get('months', 6, type=int)
+    """Get spending trends over the last N months (Gregorian or Badí')"""
+    months = max(1, min(request.args.get('months', 6, type=int), 240))
     transaction_type = request.args.get('type', 'expense')
     include_excluded = request.args.get('include_excluded', 'false').lower() == 'true'
+    calendar_type = request.args.get('calendar', 'gregorian')
+    if calendar_type not in ('gregorian', 'badi'):
+        return jsonify({'error': 'calendar must be gregorian or badi'}), 400
     
-    today = date.today()
-    trend_data = []
+    start, end = trailing_range(months, calendar_type)
+    periods = rollup(session['user_id'], start, end, calendar_type,
+                     include_excluded=include_excluded, transaction_type=transaction_type)
     
-    for i in range(months):
-        current_date = today - timedelta(days=30 * i)
-        start = date(current_date.year, current_date.month, 1)
-        last_day = calendar.monthrange(current_date.year, current_date.month)[1]
-        end = date(current_date.year, current_date.month, last_day)
-        
-        query = Transaction.query.filter(
-            Transaction.date >= start,
-            Transaction.date <= end,
-            Transaction.type == transaction_type
-        )
-        
-        if not include_excluded:
-            query = query.filter_by(is_excluded=False)
-        
-        amount = sum(t.amount for t in query.all())
-        
-        trend_data.append({
-            'month': start.strftime('%Y-%m'),
-            'amount': amount
-        })
+    trend_data = [{
+        'month': p['key'],
+        'label': p['label'],
+        'amount': p['income'] if transaction_type == 'income' else p['expense']
+    } for p in periods]
     
     return jsonify({
         'type': transaction_type,
         'months': months,
-        'data': trend_data[::-1]  # Reverse to show oldest first
+        'calendar_type': calendar_type,
+        'data': trend_data  # Oldest first
+    })
+
+@reports_bp.route('/rollup', methods=['GET'])
+@login_required
+def get_rollup():
+    """Get income/expense totals per month or year (Gregorian or Badí', Ayyám-i-Há as month 0).
+
+    Covers date_from..date_to when given, otherwise the last `periods` periods.
+    """
+    calendar_type = request.args.get('calendar', 'gregorian')
+    if calendar_type not in ('gregorian', 'badi'):
+        return jsonify({'error': 'calendar must be gregorian or badi'}), 400
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in ('month', 'year'):
+        return jsonify({'error': 'granularity must be month or year'}), 400
+    include_excluded = request.args.get('include_excluded', 'false').lower() == 'true'
+    transaction_type = request.args.get('type')
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+    
+    if date_from or date_to:
+        start, end = get_date_range('custom', date_from=date_from, date_to=date_to)
+        if end < start:
+            return jsonify({'error': 'date_to is before date_from'}), 400
+    else:
+        count = max(1, min(request.args.get('periods', 12, type=int), 240))
+        start, end = trailing_range(count, calendar_type, granularity)
+    
+    periods = rollup(session['user_id'], start, end, calendar_type, granularity,
+                     include_excluded=include_excluded, transaction_type=transaction_type)
+    
+    return jsonify({
+        'calendar_type': calendar_type,
+        'granularity': granularity,
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'periods': periods
     })
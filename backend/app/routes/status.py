@@ -2,17 +2,24 @@
 import os
 import io
 import json
+import tempfile
 from datetime import datetime
-from flask import Blueprint, jsonify, request, session, send_file, current_app
+from flask import Blueprint, Response, current_app, jsonify, request, send_file
 from app import db
 from app.models.api_status import ApiStatus
 from app.models.activity_log import ActivityLog
+from app.models.activity_daily_count import ActivityDailyCount
 from app.models.log_settings import LogSettings
+from app.utils.settings_cache import invalidate_settings
+from app.utils.activity_logger import log_activity as record_activity
 from app.models.user import User
 from app.models.category import Category
 from app.models.categorization_rule import CategorizationRule
 from app.models.budget import Budget
 from app.routes.auth import write_required
+from app.utils.database import BackupError, backup_format, backup_to_file, restore_from_file
+from app.utils.instrumentation import not_profiled
+from app.utils.sharding import each_database
 
 
 status_bp = Blueprint('status', __name__, url_prefix='/api/status')
@@ -22,14 +29,30 @@ status_bp = Blueprint('status', __name__, url_prefix='/api/status')
 @status_bp.route('/settings/reset', methods=['POST'])
 @write_required
 def reset_profile():
-    """Reset all settings and data except default admin user"""
-    User.query.filter(User.username != 'admin').delete()
-    Category.query.delete()
-    CategorizationRule.query.delete()
-    Budget.query.delete()
-    ActivityLog.query.delete()
-    LogSettings.query.delete()
+    """Reset all settings and data except default admin user.
+
+    Installation-wide: every user's budgets go, in every shard when
+    DB_SHARDING=user, and the removed users' shards are deleted.
+    """
+    shards = current_app.extensions.get('shards')
+    removed_shards = [key for (key,) in db.session.query(User.shard_key).filter(User.username != 'admin')]
+    for user_id in each_database():
+        Budget.query.delete()
+        if user_id is None:
+            # Central tables, written through the central connection only: a
+            # shard connection writing to them would wait on its lock
+            User.query.filter(User.username != 'admin').delete()
+            Category.query.delete()
+            CategorizationRule.query.delete()
+            ActivityLog.query.delete()
+            ActivityDailyCount.query.delete()
+            LogSettings.query.delete()
     db.session.commit()
+    invalidate_settings()
+    if shards is not None:
+        for shard_key in removed_shards:
+            if shard_key:
+                shards.drop(shard_key)
     return jsonify({
         'success': True,
         'message': 'Profile reset to default. Only admin user remains.'
@@ -40,32 +63,55 @@ def reset_profile():
 @status_bp.route('/settings/db/backup', methods=['GET'])
 @write_required
 def backup_database():
-    """Download the full SQLite database file"""
-    db_path = os.path.join(
-        current_app.root_path, '..', 'data', 'expense_tracker.db'
-    )
-    db_path = os.path.abspath(db_path)
-    if not os.path.exists(db_path):
-        return jsonify({'error': 'Database file not found'}), 404
-    return send_file(
-        db_path,
+    """Download an online backup of the database (SQLite file or pg_dump archive).
+
+    With DB_SHARDING=user it is a ZIP of the central database and every shard.
+    """
+    shards = current_app.extensions.get('shards')
+    suffix, mimetype = backup_format(db.engine) if shards is None else ('.zip', 'application/zip')
+    fd, backup_path = tempfile.mkstemp(prefix='backup_', suffix=suffix)
+    os.close(fd)
+    try:
+        if shards is None:
+            backup_to_file(db.engine, backup_path)
+        else:
+            shards.backup_to_file(backup_path)
+    except BackupError as e:
+        os.remove(backup_path)
+        return jsonify({'error': str(e)}), 500
+
+    response = send_file(
+        backup_path,
         as_attachment=True,
-        download_name='expense_tracker.db',
-        mimetype='application/octet-stream'
+        download_name=f'expense_tracker{suffix}',
+        mimetype=mimetype
     )
+    response.call_on_close(lambda: os.remove(backup_path))
+    return response
 # --- DATABASE RESTORE ---
 @status_bp.route('/settings/db/restore', methods=['POST'])
 @write_required
 def restore_database():
-    """Restore the full SQLite database file (overwrites current DB)"""
+    """Restore the full database from a backup (overwrites current data, and all shards with DB_SHARDING=user)"""
     if 'file' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
     file = request.files['file']
-    db_path = os.path.join(
-        current_app.root_path, '..', 'data', 'expense_tracker.db'
-    )
-    db_path = os.path.abspath(db_path)
-    file.save(db_path)
+    shards = current_app.extensions.get('shards')
+    suffix = backup_format(db.engine)[0] if shards is None else '.zip'
+    fd, restore_path = tempfile.mkstemp(prefix='restore_', suffix=suffix)
+    os.close(fd)
+    try:
+        file.save(restore_path)
+        db.session.remove()
+        if shards is None:
+            restore_from_file(db.engine, restore_path)
+        else:
+            shards.restore_from_file(restore_path)
+    except BackupError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        os.remove(restore_path)
+    invalidate_settings()
     return jsonify({
         'success': True,
         'message': 'Database restored. Please restart the app.'
@@ -74,25 +120,8 @@ def restore_database():
 
 
 def log_activity(action, description, details=None):
-    """Helper to log settings activities - checks settings before logging"""
-    try:
-        settings = LogSettings.get_settings()
-        if not settings.should_log(action, ActivityLog.CATEGORY_SETTINGS):
-            return
-    except Exception:
-        pass
-
-    log = ActivityLog(
-        action=action,
-        category=ActivityLog.CATEGORY_SETTINGS,
-        description=description,
-        details=json.dumps(details) if details else None,
-        user_id=session.get('user_id'),
-        username=session.get('username', 'anonymous'),
-        ip_address=request.remote_addr
-    )
-    db.session.add(log)
-    db.session.commit()
+    """Helper to log settings activities (filtered by log settings, written asynchronously)"""
+    record_activity(action, ActivityLog.CATEGORY_SETTINGS, description, details)
 
 
 
@@ -216,6 +245,7 @@ def restore_settings():
             db.session.add(budget)
 
     db.session.commit()
+    invalidate_settings()
     return jsonify({'success': True, 'message': 'Settings restored'})
 
 @status_bp.route('/', methods=['GET'])
@@ -225,6 +255,18 @@ def get_status():
     status = get_or_create_api_status()
     return jsonify(status.to_dict())
 
+@status_bp.route('/metrics', methods=['GET'])
+@not_profiled
+def get_metrics():
+    """Request and query metrics in Prometheus text format (INSTRUMENTATION_ENABLED)"""
+    instrumentation = current_app.extensions.get('instrumentation')
+    if instrumentation is None:
+        return jsonify({'error': 'Instrumentation is disabled (set INSTRUMENTATION_ENABLED=true)'}), 404
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Invalid metrics token'}), 401
+    return Response(instrumentation.render(), mimetype='text/plain; version=0.0.4')
+
 @status_bp.route('/toggle', methods=['POST'])
 @write_required
 def toggle_api():
@@ -238,6 +280,7 @@ def toggle_api():
     status.last_toggled_by = data.get('toggled_by', 'user')
     
     db.session.commit()
+    invalidate_settings()
     
     # Log the toggle
     new_state = 'enabled' if status.is_enabled else 'disabled'
@@ -267,6 +310,7 @@ def set_status():
     status.last_toggled_by = data.get('toggled_by', 'user')
     
     db.session.commit()
+    invalidate_settings()
     
     return jsonify({
         'message': f'API is now {status.to_dict()["status"]}',
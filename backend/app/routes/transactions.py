@@ -3,34 +3,17 @@ from app import db
 from app.models.transaction import Transaction
 from app.models.category import Category
 from app.models.activity_log import ActivityLog
-from app.models.log_settings import LogSettings
+from app.utils.activity_logger import log_activity as record_activity
 from app.routes.auth import write_required, login_required
+from app.utils.bulk_delete import delete_transactions_by_ids, delete_transactions_where
 from datetime import datetime, date, timedelta
 from sqlalchemy import func, and_, or_
-import json
 
 transactions_bp = Blueprint('transactions', __name__, url_prefix='/api/transactions')
 
 def log_activity(action, description, details=None):
-    """Helper to log transaction activities - checks settings before logging"""
-    try:
-        settings = LogSettings.get_settings()
-        if not settings.should_log(action, ActivityLog.CATEGORY_TRANSACTION):
-            return
-    except:
-        pass
-    
-    log = ActivityLog(
-        action=action,
-        category=ActivityLog.CATEGORY_TRANSACTION,
-        description=description,
-        details=json.dumps(details) if details else None,
-        user_id=session.get('user_id'),
-        username=session.get('username', 'anonymous'),
-        ip_address=request.remote_addr
-    )
-    db.session.add(log)
-    db.session.commit()
+    """Helper to log transaction activities (filtered by log settings, written asynchronously)"""
+    record_activity(action, ActivityLog.CATEGORY_TRANSACTION, description, details)
 
 @transactions_bp.route('/', methods=['GET'])
 @login_required
@@ -77,6 +60,35 @@ def get_transactions():
         print(f"Error in get_transactions: {e}")  # Debug log
         return jsonify({'error': 'Internal server error'}), 500
 
+@transactions_bp.route('/search', methods=['GET'])
+@login_required
+def search_transactions():
+    """Full-text search over description, notes and bank source, best match first"""
+    from app.utils.search import search_transaction_ids
+
+    q = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+
+    if not q:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+
+    ids, total = search_transaction_ids(
+        db.session.connection(), session['user_id'], q,
+        limit=per_page, offset=(page - 1) * per_page
+    )
+    # Preserve relevance order from the search index
+    by_id = {t.id: t for t in Transaction.query.filter(Transaction.id.in_(ids)).all()} if ids else {}
+
+    return jsonify({
+        'transactions': [by_id[i].to_dict() for i in ids if i in by_id],
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'query': q
+    })
+
 @transactions_bp.route('/<int:id>', methods=['GET'])
 @login_required
 def get_transaction(id):
@@ -281,20 +293,11 @@ def bulk_delete():
     if not transaction_ids:
         return jsonify({'error': 'Missing transaction_ids'}), 400
     
-    transactions = Transaction.query.filter(
-        Transaction.id.in_(transaction_ids),
-        Transaction.user_id == session['user_id']
-    ).all()
+    deleted_count = delete_transactions_by_ids(session['user_id'], transaction_ids)
     
-    if not transactions:
+    if not deleted_count:
         return jsonify({'error': 'No transactions found'}), 404
     
-    deleted_count = len(transactions)
-    for trans in transactions:
-        db.session.delete(trans)
-    
-    db.session.commit()
-    
     return jsonify({
         'message': f'{deleted_count} transaction(s) deleted',
         'deleted_count': deleted_count
@@ -304,7 +307,7 @@ def bulk_delete():
 @write_required
 def bulk_delete_preview():
     """Preview which transactions will be deleted from a file upload"""
-    from app.utils.file_processor import process_delete_file
+    from app.utils.file_processor import match_delete_file
     
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
@@ -314,21 +317,25 @@ def bulk_delete_preview():
         return jsonify({'error': 'No file selected'}), 400
     
     try:
-        # Process the file to get transaction IDs to delete
-        transaction_ids = process_delete_file(file)
+        # Process the file to get transaction IDs to delete, plus the statement
+        # rows that matched several transactions or none
+        matches = match_delete_file(file, session['user_id'])
+        transaction_ids = matches['transaction_ids']
         
-        if not transaction_ids:
+        if not transaction_ids and not matches['ambiguous']:
             return jsonify({'error': 'No valid transaction IDs found in file'}), 400
         
         # Get the transactions that would be deleted for current user
         transactions = Transaction.query.filter(
             Transaction.id.in_(transaction_ids),
             Transaction.user_id == session['user_id']
-        ).all()
+        ).all() if transaction_ids else []
         
         return jsonify({
             'count': len(transactions),
-            'transactions': [t.to_dict() for t in transactions]
+            'transactions': [t.to_dict() for t in transactions],
+            'ambiguous': matches['ambiguous'],
+            'unmatched_rows': matches['unmatched']
         })
     
     except Exception as e:
@@ -349,19 +356,13 @@ def bulk_delete_by_file():
     
     try:
         # Process the file to get transaction IDs to delete
-        transaction_ids = process_delete_file(file)
+        transaction_ids = process_delete_file(file, session['user_id'])
         
         if not transaction_ids:
             return jsonify({'error': 'No valid transaction IDs found in file'}), 400
         
-        # Delete the transactions
-        transactions = Transaction.query.filter(Transaction.id.in_(transaction_ids)).all()
-        deleted_count = len(transactions)
-        
-        for trans in transactions:
-            db.session.delete(trans)
-        
-        db.session.commit()
+        # Delete the transactions (only the current user's)
+        deleted_count = delete_transactions_by_ids(session['user_id'], transaction_ids)
         
         return jsonify({
             'message': f'{deleted_count} transaction(s) deleted',
@@ -374,11 +375,9 @@ def bulk_delete_by_file():
 @transactions_bp.route('/clear/all', methods=['DELETE'])
 @write_required
 def clear_all_transactions():
-    """Delete all transactions"""
+    """Delete all of the current user's transactions"""
     try:
-        count = Transaction.query.count()
-        Transaction.query.delete()
-        db.session.commit()
+        count = delete_transactions_where(session['user_id'])
         
         # Log the activity
         log_activity(
@@ -407,13 +406,7 @@ def clear_transactions_by_date():
     try:
         parsed_date = datetime.strptime(target_date, '%Y-%m-%d').date()
         
-        transactions = Transaction.query.filter(Transaction.date == parsed_date).all()
-        count = len(transactions)
-        
-        for t in transactions:
-            db.session.delete(t)
-        
-        db.session.commit()
+        count = delete_transactions_where(session['user_id'], Transaction.date == parsed_date)
         
         # Log the activity
         log_activity(
@@ -450,16 +443,11 @@ def clear_transactions_by_period():
         if parsed_start > parsed_end:
             return jsonify({'error': 'start_date must be before or equal to end_date'}), 400
         
-        transactions = Transaction.query.filter(
+        count = delete_transactions_where(
+            session['user_id'],
             Transaction.date >= parsed_start,
             Transaction.date <= parsed_end
-        ).all()
-        count = len(transactions)
-        
-        for t in transactions:
-            db.session.delete(t)
-        
-        db.session.commit()
+        )
         
         # Log the activity
         log_activity(
@@ -481,6 +469,7 @@ def clear_transactions_by_period():
         return jsonify({'error': str(e)}), 500
 
 @transactions_bp.route('/clear/preview', methods=['GET'])
+@login_required
 def preview_clear_transactions():
     """Preview how many transactions would be deleted"""
     clear_type = request.args.get('type', 'all')  # 'all', 'date', or 'period'
@@ -490,14 +479,17 @@ def preview_clear_transactions():
     
     try:
         if clear_type == 'all':
-            count = Transaction.query.count()
+            count = Transaction.query.filter(Transaction.user_id == session['user_id']).count()
             return jsonify({'count': count, 'type': 'all'})
         
         elif clear_type == 'date':
             if not target_date:
                 return jsonify({'error': 'Date parameter is required'}), 400
             parsed_date = datetime.strptime(target_date, '%Y-%m-%d').date()
-            count = Transaction.query.filter(Transaction.date == parsed_date).count()
+            count = Transaction.query.filter(
+                Transaction.user_id == session['user_id'],
+                Transaction.date == parsed_date
+            ).count()
             return jsonify({'count': count, 'type': 'date', 'date': target_date})
         
         elif clear_type == 'period':
@@ -506,6 +498,7 @@ def preview_clear_transactions():
             parsed_start = datetime.strptime(start_date, '%Y-%m-%d').date()
             parsed_end = datetime.strptime(end_date, '%Y-%m-%d').date()
             count = Transaction.query.filter(
+                Transaction.user_id == session['user_id'],
                 Transaction.date >= parsed_start,
                 Transaction.date <= parsed_end
             ).count()
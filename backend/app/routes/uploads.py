@@ -4,38 +4,27 @@ from app.models.transaction import Transaction
 from app.models.category import Category
 from app.models.upload import Upload
 from app.models.activity_log import ActivityLog
-from app.models.log_settings import LogSettings
+from app.utils.activity_logger import log_activity as record_activity
 from app.models.bank_template import BankTemplate
 from app.routes.auth import write_required, login_required
-from app.utils.file_processor import process_excel_file, process_csv_file
+from app.utils.file_processor import CategorizerSnapshot, process_excel_file, process_csv_file
+from app.utils.ingest_pool import get_ingest_pool
+from app.utils.template_index import get_template_index, visible_templates
 from datetime import datetime
 import os
 import io
 import csv
-import json
+import zipfile
 
 uploads_bp = Blueprint('uploads', __name__, url_prefix='/api/uploads')
 
+ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
+# Bytes copied at a time from a ZIP member to its scratch file
+ZIP_COPY_CHUNK = 1024 * 1024
+
 def log_activity(action, description, details=None):
-    """Helper to log upload activities - checks settings before logging"""
-    try:
-        settings = LogSettings.get_settings()
-        if not settings.should_log(action, ActivityLog.CATEGORY_UPLOAD):
-            return
-    except:
-        pass
-    
-    log = ActivityLog(
-        action=action,
-        category=ActivityLog.CATEGORY_UPLOAD,
-        description=description,
-        details=json.dumps(details) if details else None,
-        user_id=session.get('user_id'),
-        username=session.get('username', 'anonymous'),
-        ip_address=request.remote_addr
-    )
-    db.session.add(log)
-    db.session.commit()
+    """Helper to log upload activities (filtered by log settings, written asynchronously)"""
+    record_activity(action, ActivityLog.CATEGORY_UPLOAD, description, details)
 
 @uploads_bp.route('/', methods=['GET'])
 @login_required
@@ -135,6 +124,75 @@ def delete_upload(upload_id):
         'deleted_transactions': transaction_count
     })
 
+def _read_headers(filepath, file_ext):
+    """Non-empty column headers of a statement file."""
+    if file_ext == 'csv':
+        with open(filepath, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            file_headers = [h.strip() for h in (next(reader, []))]
+    else:
+        import pandas as pd
+        df_tmp = pd.read_excel(filepath, nrows=0)
+        file_headers = [str(c).strip() for c in df_tmp.columns]
+    return [h for h in file_headers if h]
+
+
+def _store_upload(filename, original_filename, file_size, file_ext, transactions_data, bank_source, user_id):
+    """Add an Upload and its parsed transactions to the session (not committed)."""
+    upload_record = Upload(
+        filename=filename,
+        original_filename=original_filename,
+        file_size=file_size,
+        file_type=file_ext,
+        transaction_count=0,
+        user_id=user_id,  # Add user isolation
+        status='processing'
+    )
+    db.session.add(upload_record)
+    db.session.flush()  # Get the ID
+    
+    # Save transactions to database
+    created_count = 0
+    for trans_data in transactions_data:
+        # Use the category_id directly from file processor
+        category_id = trans_data.get('category_id')
+        
+        # If no category_id, try to find or create default
+        if not category_id:
+            category = Category.query.filter_by(name='Uncategorized', user_id=user_id).first()
+            if not category:
+                category = Category(
+                    name='Uncategorized',
+                    type='expense',
+                    color='#95a5a6',
+                    icon='question',
+                    user_id=user_id  # Add user isolation
+                )
+                db.session.add(category)
+                db.session.flush()
+            category_id = category.id
+        
+        transaction = Transaction(
+            description=trans_data['description'],
+            amount=float(trans_data['amount']),
+            type=trans_data['type'],
+            date=trans_data['date'],
+            category_id=category_id,
+            source='upload',
+            upload_id=upload_record.id,  # Link to upload record
+            bank_source=bank_source,
+            user_id=user_id,  # Add user isolation
+            notes=trans_data.get('notes', '')
+        )
+        
+        db.session.add(transaction)
+        created_count += 1
+    
+    # Update upload record with transaction count
+    upload_record.transaction_count = created_count
+    upload_record.status = 'completed'
+    return upload_record, created_count
+
 @uploads_bp.route('/upload', methods=['POST'])
 @write_required
 def upload_file():
@@ -148,8 +206,7 @@ def upload_file():
         return jsonify({'error': 'No file selected'}), 400
     
     # Validate file extension
-    allowed_extensions = {'csv', 'xlsx', 'xls'}
-    if not '.' in file.filename or file.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
+    if not '.' in file.filename or file.filename.rsplit('.', 1)[1].lower() not in ALLOWED_EXTENSIONS:
         return jsonify({'error': 'Invalid file type. Allowed: CSV, XLSX, XLS'}), 400
     
     try:
@@ -172,74 +229,24 @@ def upload_file():
         bank_source  = (request.form.get('bank_source') or '').strip() or None
         column_mapping = None
         if template_id:
-            tmpl = BankTemplate.query.filter_by(id=template_id, user_id=session['user_id']).first()
+            tmpl = visible_templates(session['user_id']).filter(BankTemplate.id == template_id).first()
             if tmpl:
                 column_mapping = tmpl.get_mapping()
                 if not bank_source:
                     bank_source = tmpl.name
 
-        if file_ext == 'csv':
+        pool = get_ingest_pool(current_app)
+        if pool is not None:
+            transactions_data = pool.parse_file(filepath, file_ext, column_mapping,
+                                                CategorizerSnapshot.load(session['user_id']))
+        elif file_ext == 'csv':
             transactions_data = process_csv_file(filepath, user_id=session['user_id'], column_mapping=column_mapping)
         else:  # xlsx or xls
             transactions_data = process_excel_file(filepath, user_id=session['user_id'], column_mapping=column_mapping)
         
-        # Get uploaded_by from request (if provided)
-        uploaded_by = request.form.get('uploaded_by', 'system')
-        
-        # Create Upload record first
-        upload_record = Upload(
-            filename=filename,
-            original_filename=file.filename,
-            file_size=file_size,
-            file_type=file_ext,
-            transaction_count=0,
-            user_id=session['user_id'],  # Add user isolation
-            status='processing'
+        upload_record, created_count = _store_upload(
+            filename, file.filename, file_size, file_ext, transactions_data, bank_source, session['user_id']
         )
-        db.session.add(upload_record)
-        db.session.flush()  # Get the ID
-        
-        # Save transactions to database
-        created_count = 0
-        for trans_data in transactions_data:
-            # Use the category_id directly from file processor
-            category_id = trans_data.get('category_id')
-            
-            # If no category_id, try to find or create default
-            if not category_id:
-                category = Category.query.filter_by(name='Uncategorized', user_id=session['user_id']).first()
-                if not category:
-                    category = Category(
-                        name='Uncategorized',
-                        type='expense',
-                        color='#95a5a6',
-                        icon='question',
-                        user_id=session['user_id']  # Add user isolation
-                    )
-                    db.session.add(category)
-                    db.session.flush()
-                category_id = category.id
-            
-            transaction = Transaction(
-                description=trans_data['description'],
-                amount=float(trans_data['amount']),
-                type=trans_data['type'],
-                date=trans_data['date'],
-                category_id=category_id,
-                source='upload',
-                upload_id=upload_record.id,  # Link to upload record
-                bank_source=bank_source,
-                user_id=session['user_id'],  # Add user isolation
-                notes=trans_data.get('notes', '')
-            )
-            
-            db.session.add(transaction)
-            created_count += 1
-        
-        # Update upload record with transaction count
-        upload_record.transaction_count = created_count
-        upload_record.status = 'completed'
-        
         db.session.commit()
         
         # Log the upload
@@ -263,6 +270,179 @@ def upload_file():
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+@uploads_bp.route('/batch', methods=['POST'])
+@write_required
+def upload_batch():
+    """Upload several statement files, or ZIP archives of them, at once.
+
+    Each file gets the bank template that best matches its headers, is
+    parsed (in the ingest pool when INGEST_WORKERS is set) and is committed
+    as its own Upload. A file that fails does not affect the others; the
+    response lists the outcome of every file in upload order.
+    """
+    files = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+    if not files:
+        return jsonify({'error': 'No file provided'}), 400
+
+    user_id = session['user_id']
+    template_index = get_template_index(user_id)
+    categorizer = CategorizerSnapshot.load(user_id)
+    results = []
+    staged = []
+
+    def jobs():
+        for entry in _stage_batch(files, template_index, results):
+            staged.append(entry)
+            yield entry['path'], entry['file_type'], entry['column_mapping']
+
+    pool = get_ingest_pool(current_app)
+    # At most one staged file per worker waits to be stored, so scratch
+    # copies of a large ZIP never pile up in UPLOAD_FOLDER
+    parsed = (pool.parse(jobs(), categorizer, max_pending=pool.workers) if pool is not None
+              else _parse_in_thread(jobs(), categorizer))
+    try:
+        # Files are stored one at a time, in the order their parsing finishes
+        for index, transactions_data, error in parsed:
+            entry = staged[index]
+            try:
+                _store_batch_entry(entry, transactions_data, error, user_id)
+            finally:
+                _remove_scratch(entry['path'])
+    finally:
+        # Backstop for entries still staged when the loop failed
+        for entry in staged:
+            _remove_scratch(entry['path'])
+
+    completed = [r for r in results if r['status'] == 'completed']
+    return jsonify({
+        'message': f'{len(completed)} of {len(results)} file(s) processed',
+        'files': results,
+        'files_completed': len(completed),
+        'transactions_created': sum(r['transactions_created'] for r in completed),
+    }), 201 if completed else 400
+
+
+def _store_batch_entry(entry, transactions_data, error, user_id):
+    """Commit one parsed file of a batch as its own Upload and record the outcome."""
+    result = entry['result']
+    if error is not None:
+        result.update(status='failed', error=str(error))
+        return
+    try:
+        upload_record, created_count = _store_upload(
+            entry['filename'], result['filename'], entry['file_size'], entry['file_type'],
+            transactions_data, entry['bank_source'], user_id
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        result.update(status='failed', error=str(e))
+        return
+    result.update(status='completed', upload_id=upload_record.id, transactions_created=created_count)
+    log_activity(
+        ActivityLog.ACTION_UPLOAD,
+        f"Uploaded file: {result['filename']} ({created_count} transactions)",
+        {'upload_id': upload_record.id, 'filename': result['filename'],
+         'transaction_count': created_count, 'batch': True}
+    )
+
+
+def _remove_scratch(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _stage_batch(files, template_index, results):
+    """Write each statement of a batch to a scratch file and detect its template.
+
+    ZIP archives are read member by member, straight from the request
+    stream. Nothing is extracted ahead of time: the next member is written
+    out only when the parser asks for the next entry. Appends a result for
+    every file to `results` and yields the entries to parse.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    max_files = current_app.config['UPLOAD_BATCH_MAX_FILES']
+    zip_budget = current_app.config['UPLOAD_ZIP_MAX_BYTES']
+    count = 0
+
+    def stage(name, archive, write):
+        nonlocal count
+        result = {'filename': name, 'status': 'skipped', 'template': None, 'transactions_created': 0}
+        if archive:
+            result['archive'] = archive
+        results.append(result)
+        file_ext = name.rsplit('.', 1)[1].lower() if '.' in name else ''
+        if file_ext not in ALLOWED_EXTENSIONS:
+            result['error'] = 'Unsupported file type. Allowed: CSV, XLSX, XLS'
+            return None
+        count += 1
+        if count > max_files:
+            result['error'] = f'Too many files in one batch (limit {max_files})'
+            return None
+
+        filename = f"{datetime.now().timestamp()}_{count}_{name}"
+        path = os.path.join(upload_folder, filename)
+        try:
+            write(path)
+            column_mapping, bank_source = None, None
+            template, score = template_index.best(_read_headers(path, file_ext))
+            if template:
+                column_mapping, bank_source = template['column_mapping'], template['name']
+                result.update(template=template['name'], template_score=score)
+        except Exception as e:
+            result.update(status='failed', error=str(e))
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+        result['status'] = 'processing'
+        return {'result': result, 'path': path, 'filename': filename, 'file_type': file_ext,
+                'file_size': os.path.getsize(path), 'column_mapping': column_mapping,
+                'bank_source': bank_source}
+
+    for file in files:
+        name = os.path.basename(file.filename)
+        if not name.lower().endswith('.zip'):
+            entry = stage(name, None, file.save)
+            if entry:
+                yield entry
+            continue
+
+        try:
+            archive = zipfile.ZipFile(file.stream)
+        except zipfile.BadZipFile:
+            results.append({'filename': name, 'status': 'failed', 'template': None,
+                            'transactions_created': 0, 'error': 'Not a valid ZIP archive'})
+            continue
+        with archive:
+            for member in archive.infolist():
+                member_name = os.path.basename(member.filename)
+                if member.is_dir() or not member_name or member_name.startswith('.') \
+                        or member.filename.startswith('__MACOSX/'):
+                    continue
+
+                def extract(path, member=member):
+                    nonlocal zip_budget
+                    with archive.open(member) as source, open(path, 'wb') as target:
+                        while chunk := source.read(ZIP_COPY_CHUNK):
+                            zip_budget -= len(chunk)
+                            if zip_budget < 0:
+                                raise ValueError('ZIP contents exceed the size limit')
+                            target.write(chunk)
+
+                entry = stage(member_name, name, extract)
+                if entry:
+                    yield entry
+
+
+def _parse_in_thread(jobs, categorizer):
+    """IngestPool.parse() without worker processes."""
+    for index, (path, file_type, column_mapping) in enumerate(jobs):
+        process = process_csv_file if file_type == 'csv' else process_excel_file
+        try:
+            yield index, process(path, column_mapping=column_mapping, categorizer=categorizer), None
+        except Exception as e:
+            yield index, None, e
+
 @uploads_bp.route('/preview', methods=['POST'])
 @login_required
 def preview_file():
@@ -292,25 +472,10 @@ def preview_file():
         detected_bank = None
         file_headers = []
         try:
-            if file_ext == 'csv':
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    reader = csv.reader(f)
-                    file_headers = [h.strip() for h in (next(reader, []))]
-            else:
-                import pandas as pd
-                df_tmp = pd.read_excel(filepath, nrows=0)
-                file_headers = [str(c).strip() for c in df_tmp.columns]
-            file_headers = [h for h in file_headers if h]
-
-            templates = BankTemplate.query.filter_by(user_id=session['user_id']).all()
-            matches = []
-            for t in templates:
-                score = t.match_score(file_headers)
-                if score > 0:
-                    matches.append({'template': t.to_dict(), 'score': round(score, 3)})
-            matches.sort(key=lambda x: x['score'], reverse=True)
-            if matches:
-                detected_bank = matches[0]
+            file_headers = _read_headers(filepath, file_ext)
+            template, score = get_template_index(session['user_id']).best(file_headers)
+            if template:
+                detected_bank = {'template': template, 'score': score}
         except Exception:
             pass  # detection failure is non-fatal
 
@@ -1,33 +1,16 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, current_app, request, jsonify, session
 from app import db
 from app.models.user import User
 from app.models.activity_log import ActivityLog
-from app.models.log_settings import LogSettings
+from app.utils.activity_logger import log_activity as record_activity
 from app.routes.auth import superuser_required, login_required
-import json
+from app.utils.auth_context import get_auth_user, invalidate_user
 
 users_bp = Blueprint('users', __name__, url_prefix='/api/users')
 
 def log_activity(action, description, details=None):
-    """Helper to log user management activities - checks settings before logging"""
-    try:
-        settings = LogSettings.get_settings()
-        if not settings.should_log(action, ActivityLog.CATEGORY_USER):
-            return
-    except:
-        pass
-    
-    log = ActivityLog(
-        action=action,
-        category=ActivityLog.CATEGORY_USER,
-        description=description,
-        details=json.dumps(details) if details else None,
-        user_id=session.get('user_id'),
-        username=session.get('username', 'anonymous'),
-        ip_address=request.remote_addr
-    )
-    db.session.add(log)
-    db.session.commit()
+    """Helper to log user management activities (filtered by log settings, written asynchronously)"""
+    record_activity(action, ActivityLog.CATEGORY_USER, description, details)
 
 @users_bp.route('/', methods=['GET'])
 @login_required
@@ -35,14 +18,14 @@ def get_users():
     """Get all users (superuser only sees all, standard users see only themselves)"""
     from flask import session
     
-    current_user = User.query.get(session['user_id'])
+    current_user = get_auth_user(session['user_id'])
     
     if current_user.is_superuser():
         users = User.query.order_by(User.created_at).all()
         return jsonify([u.to_dict() for u in users])
     else:
         # Standard users can only see their own info
-        return jsonify([current_user.to_dict()])
+        return jsonify([current_user.profile])
 
 @users_bp.route('/<int:id>', methods=['GET'])
 @login_required
@@ -50,7 +33,7 @@ def get_user(id):
     """Get a specific user"""
     from flask import session
     
-    current_user = User.query.get(session['user_id'])
+    current_user = get_auth_user(session['user_id'])
     
     # Standard users can only view themselves
     if not current_user.is_superuser() and current_user.id != id:
@@ -172,6 +155,7 @@ def update_user(id):
             return jsonify({'error': 'Session timeout must be an integer'}), 400
     
     db.session.commit()
+    invalidate_user(id)
     
     # Log user update
     log_activity(
@@ -199,8 +183,13 @@ def delete_user(id):
         return jsonify({'error': 'Cannot delete your own account'}), 400
     
     username = user.username
+    shard_key = user.shard_key
     db.session.delete(user)
     db.session.commit()
+    invalidate_user(id)
+    shards = current_app.extensions.get('shards')
+    if shards is not None and shard_key:
+        shards.drop(shard_key)
     
     # Log user deletion
     log_activity(
@@ -215,10 +204,10 @@ def delete_user(id):
 @login_required
 def get_me():
     """Get the currently logged-in user's own profile (also serves as a session ping)"""
-    user = User.query.get(session['user_id'])
+    user = get_auth_user(session['user_id'])
     if not user:
         return jsonify({'error': 'User not found'}), 404
-    return jsonify(user.to_dict())
+    return jsonify(user.profile)
 
 @users_bp.route('/init', methods=['POST'])
 def init_default_admin():
@@ -0,0 +1,166 @@
+"""
+Incrementally maintained per-day activity counts.
+
+activity_daily_counts holds one row per (UTC day, category, action). The
+activity writer adds to it in the same transaction that inserts a batch of
+log entries, and retention/clear subtract what they delete. /api/activity/stats
+and the activity viewer's total then read a few dozen counter rows instead of
+counting a week (or all) of logs on every page view.
+
+Filters the counters cannot answer (username) fall back to a COUNT(*) whose
+result is cached per app for ACTIVITY_COUNT_CACHE_SECONDS.
+
+rebuild_counters() recomputes the table from activity_logs; schema migration
+4 runs it when the table is empty but logs exist (first deploy, or a restored backup
+that predates it).
+"""
+
+import threading
+import time
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import delete, exists, func, insert, select, update
+
+from app import db
+from app.models.activity_daily_count import ActivityDailyCount
+from app.models.activity_log import ActivityLog
+
+COUNT_CACHE_MAX_ENTRIES = 256
+
+_counts = ActivityDailyCount.__table__
+_lock = threading.Lock()
+
+
+def _deltas(rows, sign):
+    """Group rows (dicts or Row objects) into {(day, category, action): n}."""
+    deltas = Counter()
+    for row in rows:
+        if isinstance(row, dict):
+            created_at, category, action = row.get('created_at'), row['category'], row['action']
+        else:
+            created_at, category, action = row.created_at, row.category, row.action
+        if created_at is not None:
+            deltas[(created_at.date(), category, action)] += sign
+    return deltas
+
+
+def bump_counters(conn, rows, sign=1):
+    """Add (sign=1) or subtract (sign=-1) rows from the counters on `conn`.
+
+    Runs inside the caller's transaction so counters and logs commit together.
+    """
+    deltas = _deltas(rows, sign)
+    if not deltas:
+        return
+    # Sorted so concurrent writers lock counter rows in the same order
+    values = [{'day': day, 'category': category, 'action': action, 'count': n}
+              for (day, category, action), n in sorted(deltas.items())]
+
+    dialect = conn.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(_counts)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['day', 'category', 'action'],
+            set_={'count': _counts.c.count + stmt.excluded['count']},
+        )
+        conn.execute(stmt, values)
+    else:
+        for value in values:
+            updated = conn.execute(
+                update(_counts)
+                .where(_counts.c.day == value['day'], _counts.c.category == value['category'],
+                       _counts.c.action == value['action'])
+                .values(count=_counts.c.count + value['count'])
+            ).rowcount
+            if not updated:
+                conn.execute(insert(_counts), value)
+
+    if sign < 0:
+        conn.execute(delete(_counts).where(
+            _counts.c.count <= 0, _counts.c.day.in_({day for day, _, _ in deltas})))
+
+
+def rebuild_counters(conn):
+    """Recompute every counter from activity_logs (caller commits)."""
+    day = func.date(ActivityLog.created_at)
+    conn.execute(delete(_counts))
+    conn.execute(insert(_counts).from_select(
+        ['day', 'category', 'action', 'count'],
+        select(day, ActivityLog.category, ActivityLog.action, func.count())
+        .where(ActivityLog.created_at.isnot(None))
+        .group_by(day, ActivityLog.category, ActivityLog.action),
+    ))
+
+
+def ensure_counters(conn):
+    """Backfill the counters if logs exist but none were counted. Returns True if rebuilt."""
+    if conn.execute(select(exists().where(_counts.c.day.isnot(None)))).scalar():
+        return False
+    if not conn.execute(select(exists().where(ActivityLog.id.isnot(None)))).scalar():
+        return False
+    rebuild_counters(conn)
+    return True
+
+
+def counted_total(category=None, action=None, start=None, end=None):
+    """Number of logs matching the filters, read from the counters.
+
+    `start`/`end` must fall on day boundaries (end exclusive).
+    """
+    criteria = []
+    if category:
+        criteria.append(_counts.c.category == category)
+    if action:
+        criteria.append(_counts.c.action == action)
+    if start:
+        criteria.append(_counts.c.day >= start.date())
+    if end:
+        criteria.append(_counts.c.day < end.date())
+    return db.session.execute(
+        select(func.coalesce(func.sum(_counts.c.count), 0)).where(*criteria)
+    ).scalar()
+
+
+def cached_count(key, query):
+    """COUNT(*) of `query`, cached per app under `key` for a few seconds."""
+    cache = current_app.extensions.setdefault('activity_count_cache', {})
+    ttl = current_app.config.get('ACTIVITY_COUNT_CACHE_SECONDS', 30)
+    now = time.monotonic()
+    entry = cache.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    total = query.order_by(None).count()
+    with _lock:
+        if len(cache) >= COUNT_CACHE_MAX_ENTRIES:
+            cache.clear()
+        cache[key] = (now + ttl, total)
+    return total
+
+
+def activity_stats(today, week_ago):
+    """Totals for today and the last week plus per-category/action counts."""
+    rows = db.session.execute(
+        select(_counts.c.day, _counts.c.category, _counts.c.action, _counts.c.count)
+        .where(_counts.c.day >= week_ago.date())
+    ).all()
+
+    by_category, by_action = Counter(), Counter()
+    total_today = total_week = 0
+    for day, category, action, count in rows:
+        total_week += count
+        if day >= today.date():
+            total_today += count
+        by_category[category] += count
+        by_action[action] += count
+    return {
+        'total_today': total_today,
+        'total_week': total_week,
+        'by_category': dict(by_category),
+        'by_action': dict(by_action),
+    }
@@ -0,0 +1,194 @@
+"""
+Streaming export of activity_logs.
+
+Rows are read newest first in keyset chunks of EXPORT_CHUNK_SIZE
+(`WHERE id < last_id ORDER BY id DESC LIMIT n`), each on its own short-lived
+connection, and formatted chunk by chunk, so memory use stays flat and no
+read transaction is held open while a slow client downloads. Output can be
+compressed on the fly with gzip or, if the optional `zstandard` package is
+installed, zstd.
+
+An export covers a fixed id range: the newest id is captured when it starts
+(max_id) and entries logged afterwards are left out. Every row carries its
+id, so an interrupted download can be resumed by requesting the same filters
+with max_id set to one below the last id received.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models.activity_log import ActivityLog
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = ('csv', 'json', 'txt')
+COMPRESSIONS = {
+    # name: (file extension, mimetype)
+    'gzip': ('.gz', 'application/gzip'),
+    'zstd': ('.zst', 'application/zstd'),
+}
+MIMETYPES = {'csv': 'text/csv', 'json': 'application/json', 'txt': 'text/plain'}
+
+CSV_HEADER = ['ID', 'Timestamp', 'User', 'Action', 'Category', 'Description', 'IP Address', 'Details']
+_COLUMNS = ('id', 'action', 'category', 'description', 'details',
+            'user_id', 'username', 'ip_address', 'created_at')
+
+
+def available_compressions():
+    """Compression names usable on this install."""
+    return [name for name in COMPRESSIONS if name != 'zstd' or zstandard is not None]
+
+
+class ActivityExport:
+    """One export: filters, a fixed id range and the chosen output format."""
+
+    def __init__(self, export_format='csv', category=None, action=None, start=None, end=None,
+                 min_id=None, max_id=None, chunk_size=None):
+        if export_format not in EXPORT_FORMATS:
+            export_format = 'txt'
+        self.format = export_format
+        self.min_id = min_id
+        self.chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+
+        self.criteria = []
+        if category:
+            self.criteria.append(ActivityLog.category == category)
+        if action:
+            self.criteria.append(ActivityLog.action == action)
+        if start:
+            self.criteria.append(ActivityLog.created_at >= start)
+        if end:
+            self.criteria.append(ActivityLog.created_at < end)
+        if min_id is not None:
+            self.criteria.append(ActivityLog.id >= min_id)
+
+        with db.engine.connect() as conn:
+            newest = conn.execute(select(func.max(ActivityLog.id))).scalar() or 0
+            self.max_id = newest if max_id is None else min(max_id, newest)
+            self.total = conn.execute(
+                select(func.count()).select_from(ActivityLog)
+                .where(ActivityLog.id <= self.max_id, *self.criteria)
+            ).scalar()
+
+    def chunks(self):
+        """Yield lists of rows, newest first, one keyset query per chunk."""
+        upper = self.max_id
+        columns = [getattr(ActivityLog, c) for c in _COLUMNS]
+        while True:
+            with db.engine.connect() as conn:
+                rows = conn.execute(
+                    select(*columns)
+                    .where(ActivityLog.id <= upper, *self.criteria)
+                    .order_by(ActivityLog.id.desc())
+                    .limit(self.chunk_size)
+                ).all()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < self.chunk_size:
+                return
+            upper = rows[-1].id - 1
+
+    # ── formatting ──────────────────────────────────────────────────────────
+
+    def iter_text(self):
+        """Yield the export as text pieces (about one per chunk)."""
+        return getattr(self, f'_iter_{self.format}')()
+
+    def _iter_csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_HEADER)
+        for rows in self.chunks():
+            writer.writerows(
+                [row.id, row.created_at.isoformat() if row.created_at else '',
+                 row.username or '', row.action or '', row.category or '',
+                 row.description or '', row.ip_address or '', row.details or '']
+                for row in rows
+            )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def _iter_json(self):
+        yield ('{\n'
+               f'  "exported_at": {json.dumps(datetime.utcnow().isoformat())},\n'
+               f'  "total_records": {self.total},\n'
+               f'  "max_id": {self.max_id},\n'
+               '  "logs": [')
+        separator = '\n    '
+        for rows in self.chunks():
+            pieces = []
+            for row in rows:
+                record = {c: getattr(row, c) for c in _COLUMNS}
+                if row.created_at:
+                    record['created_at'] = row.created_at.isoformat()
+                pieces.append(separator + json.dumps(record, default=str))
+                separator = ',\n    '
+            yield ''.join(pieces)
+        yield '\n  ]\n}\n'
+
+    def _iter_txt(self):
+        yield (f"Activity Logs Export\n"
+               f"Exported: {datetime.utcnow().isoformat()}\n"
+               f"Total Records: {self.total}\n"
+               f"{'=' * 80}\n\n")
+        for rows in self.chunks():
+            lines = []
+            for row in rows:
+                lines.append(f"[{row.created_at.isoformat() if row.created_at else 'N/A'}] #{row.id}")
+                lines.append(f"  User: {row.username or 'N/A'}")
+                lines.append(f"  Action: {row.action or 'N/A'}")
+                lines.append(f"  Category: {row.category or 'N/A'}")
+                lines.append(f"  Description: {row.description or 'N/A'}")
+                lines.append(f"  IP Address: {row.ip_address or 'N/A'}")
+                if row.details:
+                    lines.append(f"  Details: {row.details}")
+                lines.append("-" * 40)
+            yield '\n'.join(lines) + '\n'
+
+    def iter_bytes(self, compression=None):
+        """Yield the encoded export, compressed with `compression` if given."""
+        pieces = (text.encode('utf-8') for text in self.iter_text())
+        if compression == 'gzip':
+            return _compress(pieces, zlib.compressobj(6, zlib.DEFLATED, 31))
+        if compression == 'zstd':
+            return _compress(pieces, zstandard.ZstdCompressor().compressobj())
+        return pieces
+
+    def filename(self, timestamp, compression=None):
+        suffix = COMPRESSIONS[compression][0] if compression else ''
+        return f'activity_logs_{timestamp}.{self.format}{suffix}'
+
+    def mimetype(self, compression=None):
+        return COMPRESSIONS[compression][1] if compression else MIMETYPES[self.format]
+
+    def write_to(self, path, compression=None):
+        """Stream the export into a file; returns the number of bytes written."""
+        written = 0
+        with open(path, 'wb') as f:
+            for piece in self.iter_bytes(compression):
+                f.write(piece)
+                written += len(piece)
+        return written
+
+
+def _compress(pieces, compressor):
+    for piece in pieces:
+        out = compressor.compress(piece)
+        if out:
+            yield out
+    yield compressor.flush()
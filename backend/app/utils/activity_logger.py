@@ -1,38 +1,57 @@
 """
 Activity Logger utility for tracking user actions.
+
+Every route's log_activity helper delegates here. Entries are checked against
+the cached log settings and handed to the buffered writer in
+app/utils/activity_writer.py, so logging never adds a commit to the request.
 """
 
-from flask import request, session
+from datetime import datetime
+
+from flask import has_request_context, request, session
 import json
 
-def log_activity(action, category, description, details=None):
+_UNSET = object()
+
+
+def log_activity(action, category, description, details=None, user_id=_UNSET, username=None):
     """
     Log an activity with current user context.
-    
+
     Args:
         action: The type of action (e.g., 'create', 'delete', 'update')
         category: The category of the action (e.g., 'transaction', 'user', 'settings')
         description: Human-readable description of the action
         details: Optional dict with additional details (will be JSON serialized)
+        user_id, username: Override the session user (e.g. while logging out)
+
+    Returns True if the entry was queued, False if it was filtered out by the
+    log settings or dropped because the buffer is full.
     """
-    from app.models.activity_log import ActivityLog
-    
+    from app.utils.activity_writer import get_activity_writer
+    from app.utils.settings_cache import get_log_policy
+
+    try:
+        if not get_log_policy().should_log(action, category):
+            return False
+    except Exception:
+        pass  # If settings fail, log anyway
+
     # Get user info from session
-    user_id = session.get('user_id')
-    username = session.get('username', 'system')
-    
-    # Get IP address
-    ip_address = request.remote_addr if request else None
-    
-    # Serialize details to JSON if provided
-    details_json = json.dumps(details) if details else None
-    
-    return ActivityLog.log(
-        action=action,
-        category=category,
-        description=description,
-        details=details_json,
-        user_id=user_id,
-        username=username,
-        ip_address=ip_address
-    )
+    in_request = has_request_context()
+    if user_id is _UNSET:
+        user_id = session.get('user_id') if in_request else None
+    if username is None:
+        username = session.get('username', 'anonymous') if in_request else 'system'
+
+    return get_activity_writer().submit({
+        'action': action,
+        'category': category,
+        'description': description,
+        # Serialize details to JSON if provided
+        'details': json.dumps(details) if details else None,
+        'user_id': user_id,
+        'username': username,
+        'ip_address': request.remote_addr if in_request else None,
+        'created_at': datetime.utcnow(),
+    })
@@ -0,0 +1,248 @@
+"""
+Retention for activity_logs.
+
+LogSettings.retention_days and auto_cleanup are enforced by a background
+thread started with the app. Every ACTIVITY_RETENTION_INTERVAL_SECONDS it
+removes entries older than the retention period in chunks of
+ACTIVITY_RETENTION_CHUNK_SIZE rows. Each chunk is its own short transaction,
+and the job pauses while the worker is serving requests (a chunk only runs
+once no request has started for ACTIVITY_RETENTION_IDLE_SECONDS), so it
+never holds the write lock for long.
+
+Before a chunk is deleted its rows are appended to gzip-compressed JSON Lines
+files in ACTIVITY_ARCHIVE_DIR, one per month (activity_YYYY-MM.jsonl.gz).
+Appending adds a new gzip member, which gzip.open() reads transparently. A
+crash between archiving and deleting can leave a chunk archived twice but
+never loses it.
+
+Only one worker process runs the job at a time (an flock on
+ACTIVITY_ARCHIVE_DIR/.retention.lock); the others skip that round. Progress
+of the current or last run is available from retention_status().
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from app import db
+from app.models.activity_log import ActivityLog
+from app.models.log_settings import LogSettings
+from app.utils.activity_counters import bump_counters
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+ARCHIVE_COLUMNS = ('id', 'action', 'category', 'description', 'details',
+                   'user_id', 'username', 'ip_address', 'created_at')
+
+
+def _status(app):
+    return app.extensions.setdefault('activity_retention', {
+        'running': False,
+        'started_at': None,
+        'finished_at': None,
+        'cutoff': None,
+        'remaining': None,
+        'archived': 0,
+        'deleted': 0,
+        'last_error': None,
+        'skipped': None,
+    })
+
+
+def retention_status(app):
+    """Return a copy of the progress of the current or last retention run."""
+    return dict(_status(app))
+
+
+def note_request(app):
+    """Record request activity so the retention job can wait for idle time."""
+    app.extensions['activity_retention_last_request'] = time.monotonic()
+
+
+def _wait_for_idle(app, stop_event):
+    idle = app.config.get('ACTIVITY_RETENTION_IDLE_SECONDS', 2.0)
+    while True:
+        last = app.extensions.get('activity_retention_last_request', 0.0)
+        remaining = idle - (time.monotonic() - last)
+        if remaining <= 0:
+            return True
+        if stop_event is not None and stop_event.wait(remaining):
+            return False
+        if stop_event is None:
+            time.sleep(remaining)
+
+
+class _ProcessLock:
+    """Non-blocking exclusive flock shared by all workers on this host."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'a')
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self.file.close()
+            self.file = None
+            return False
+
+    def release(self):
+        if self.file is not None:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+
+
+def archive_rows(archive_dir, rows):
+    """Append rows (dicts) to their month's gzip JSONL archive; return files touched."""
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row['created_at'][:7], []).append(row)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    paths = []
+    for month, month_rows in sorted(by_month.items()):
+        path = os.path.join(archive_dir, f'activity_{month}.jsonl.gz')
+        with open(path, 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as gz:
+                for row in month_rows:
+                    gz.write(json.dumps(row, default=str).encode('utf-8') + b'\n')
+            raw.flush()
+            os.fsync(raw.fileno())
+        paths.append(path)
+    return paths
+
+
+def purge_activity_logs(cutoff, chunk_size=500, archive_dir=None, progress=None,
+                        before_chunk=None):
+    """Delete activity logs created before `cutoff`, chunk by chunk.
+
+    When archive_dir is given each chunk is archived before it is deleted.
+    `before_chunk` is called before each chunk and may return False to stop
+    early. Returns (archived, deleted).
+    """
+    archived = deleted = 0
+    while True:
+        if before_chunk is not None and before_chunk() is False:
+            break
+        rows = db.session.execute(
+            select(*[getattr(ActivityLog, c) for c in ARCHIVE_COLUMNS])
+            .where(ActivityLog.created_at < cutoff)
+            .order_by(ActivityLog.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+
+        ids = [row.id for row in rows]
+        if archive_dir:
+            archive_rows(archive_dir, [
+                {c: (getattr(row, c).isoformat() if c == 'created_at' else getattr(row, c))
+                 for c in ARCHIVE_COLUMNS}
+                for row in rows
+            ])
+            archived += len(rows)
+
+        deleted += db.session.execute(
+            delete(ActivityLog).where(ActivityLog.id.in_(ids))
+        ).rowcount
+        bump_counters(db.session.connection(), rows, sign=-1)
+        db.session.commit()
+
+        if progress is not None:
+            progress(archived, deleted)
+        if len(rows) < chunk_size:
+            break
+    return archived, deleted
+
+
+def run_retention(app, stop_event=None, wait_for_idle=True):
+    """Apply the configured retention once. Returns the final status dict."""
+    status = _status(app)
+    lock = _ProcessLock(os.path.join(app.config['ACTIVITY_ARCHIVE_DIR'], '.retention.lock'))
+    if status['running'] or not lock.acquire():
+        status['skipped'] = 'another run is in progress'
+        return dict(status)
+
+    try:
+        settings = LogSettings.query.first()
+        if settings is not None and not settings.auto_cleanup:
+            status['skipped'] = 'auto_cleanup is disabled'
+            return dict(status)
+        retention_days = settings.retention_days if settings and settings.retention_days else 90
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+        status.update(running=True, started_at=datetime.utcnow().isoformat(), finished_at=None,
+                      cutoff=cutoff.isoformat(), archived=0, deleted=0, last_error=None,
+                      skipped=None)
+        total = ActivityLog.query.filter(ActivityLog.created_at < cutoff).count()
+        status['remaining'] = total
+
+        def progress(archived, deleted):
+            status.update(archived=archived, deleted=deleted, remaining=max(total - deleted, 0))
+
+        def before_chunk():
+            if stop_event is not None and stop_event.is_set():
+                return False
+            return _wait_for_idle(app, stop_event) if wait_for_idle else True
+
+        archive_dir = app.config['ACTIVITY_ARCHIVE_DIR'] if app.config.get('ACTIVITY_ARCHIVE_ENABLED', True) else None
+        purge_activity_logs(cutoff, chunk_size=app.config.get('ACTIVITY_RETENTION_CHUNK_SIZE', 500),
+                            archive_dir=archive_dir, progress=progress, before_chunk=before_chunk)
+    except Exception as e:
+        db.session.rollback()
+        status['last_error'] = str(e)
+        print(f"Activity log retention failed: {e}")
+    finally:
+        status['running'] = False
+        status['finished_at'] = datetime.utcnow().isoformat()
+        lock.release()
+    return dict(status)
+
+
+class RetentionScheduler:
+    """Background thread that runs run_retention() periodically."""
+
+    def __init__(self, app):
+        self.app = app
+        self.stop_event = threading.Event()
+        self.trigger = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='activity-retention', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run_now(self):
+        self.trigger.set()
+
+    def stop(self):
+        self.stop_event.set()
+        self.trigger.set()
+        self.thread.join(timeout=10)
+
+    def _run(self):
+        interval = self.app.config.get('ACTIVITY_RETENTION_INTERVAL_SECONDS', 3600)
+        # Let startup settle before the first round
+        self.trigger.wait(min(interval, 60))
+        while not self.stop_event.is_set():
+            self.trigger.clear()
+            with self.app.app_context():
+                run_retention(self.app, stop_event=self.stop_event)
+                db.session.remove()
+            self.trigger.wait(interval)
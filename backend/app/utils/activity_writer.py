@@ -0,0 +1,180 @@
+"""
+Buffered, asynchronous writer for activity_logs.
+
+Request handlers hand entries to the writer, which puts them on a bounded
+in-process queue and returns immediately. A background thread inserts them
+in batches (one executemany INSERT per batch, plus the matching per-day counter
+updates) whenever ACTIVITY_LOG_BATCH_SIZE
+entries are waiting or ACTIVITY_LOG_FLUSH_SECONDS have passed, so audit
+logging no longer adds a second commit to every mutating request.
+
+When the queue is full (ACTIVITY_LOG_BUFFER_SIZE) new entries are dropped
+rather than blocking the request; the count is reported by stats(). The
+queue is drained at interpreter exit, and flush() drains it on demand (the
+activity viewer calls it so users see their own recent actions).
+
+With ACTIVITY_LOG_ASYNC disabled entries are written synchronously, one
+INSERT per call, without the background thread.
+"""
+
+import atexit
+import os
+import queue
+import threading
+
+from flask import current_app
+
+from app import db
+from app.models.activity_log import ActivityLog
+from app.utils.activity_counters import bump_counters
+
+
+class ActivityLogWriter:
+    """Queue plus background flusher for one database engine."""
+
+    def __init__(self, engine, buffer_size=10000, batch_size=200, flush_interval=1.0, enabled=True):
+        self.engine = engine
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+
+        self._queue = queue.Queue(maxsize=buffer_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._pid = None
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_error = None
+
+    # ── producer side ───────────────────────────────────────────────────────
+
+    def submit(self, entry):
+        """Queue one entry (a dict of activity_logs column values)."""
+        if not self.enabled:
+            self._write([entry])
+            return True
+
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        """Write everything queued so far before returning."""
+        with self._flush_lock:
+            while True:
+                batch = self._take(self.batch_size)
+                if not batch:
+                    return
+                self._write(batch)
+
+    def close(self):
+        """Stop the background thread and drain the queue."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=10)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'async': self.enabled,
+                'queued': self._queue.qsize(),
+                'buffer_size': self.buffer_size,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'last_error': self.last_error,
+            }
+
+    # ── consumer side ───────────────────────────────────────────────────────
+
+    def _ensure_thread(self):
+        # Threads do not survive fork (e.g. gunicorn --preload): restart per process
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Entries queued by the parent belong to the parent
+                self._queue = queue.Queue(maxsize=self.buffer_size)
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # _write records failures; never let the thread die
+                pass
+
+    def _take(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(ActivityLog.__table__.insert(), batch)
+                bump_counters(conn, batch)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+                self.last_error = str(e)
+            print(f"Activity log write failed ({len(batch)} entries): {e}")
+            return
+        with self._lock:
+            self.written += len(batch)
+
+
+def get_activity_writer():
+    """Return the current app's writer, creating it on first use."""
+    writer = current_app.extensions.get('activity_writer')
+    if writer is None:
+        config = current_app.config
+        writer = ActivityLogWriter(
+            db.engine,
+            buffer_size=config.get('ACTIVITY_LOG_BUFFER_SIZE', 10000),
+            batch_size=config.get('ACTIVITY_LOG_BATCH_SIZE', 200),
+            flush_interval=config.get('ACTIVITY_LOG_FLUSH_SECONDS', 1.0),
+            enabled=config.get('ACTIVITY_LOG_ASYNC', True),
+        )
+        writer = current_app.extensions.setdefault('activity_writer', writer)
+        if writer.enabled:
+            atexit.register(writer.close)
+    return writer
+
+
+def flush_activity_log():
+    """Write any queued activity entries now (no-op if nothing was logged)."""
+    writer = current_app.extensions.get('activity_writer')
+    if writer is not None:
+        writer.flush()
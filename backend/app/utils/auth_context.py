@@ -0,0 +1,88 @@
+"""
+Request-scoped authentication context.
+
+The logged-in user's authorization data (role, session timeout and the public
+profile returned by /api/users/me) is loaded at most once per request and
+kept on flask.g, so the auth middleware, the permission decorators and the
+route itself share one lookup. Behind that sits a small per-process cache
+with a short TTL (AUTH_CACHE_TTL seconds, default 30), so most requests do
+not query the users table at all.
+
+Endpoints that change a user's role or session timeout, or delete a user,
+call invalidate_user(); other workers pick the change up when their entry
+expires.
+"""
+
+import threading
+import time
+
+from flask import current_app, g
+
+from app import db
+
+_lock = threading.Lock()
+
+
+def _cache():
+    # One cache per app, so separate app instances never share entries
+    return current_app.extensions.setdefault('auth_user_cache', {})
+
+
+class AuthUser:
+    """Immutable snapshot of the fields authorization checks need."""
+
+    __slots__ = ('id', 'username', 'role', 'session_timeout', 'profile')
+
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role
+        self.session_timeout = (user.session_timeout if user.session_timeout is not None
+                                else user.DEFAULT_SESSION_TIMEOUT)
+        self.profile = user.to_dict()
+
+    def is_superuser(self):
+        return self.role == 'superuser'
+
+    def is_viewer(self):
+        return self.role == 'viewer'
+
+    def can_write(self):
+        return self.role in ['superuser', 'standard']
+
+
+def get_auth_user(user_id):
+    """Return the AuthUser for `user_id`, or None if the user does not exist."""
+    cached = g.get('auth_user')
+    if cached is not None and cached.id == user_id:
+        return cached
+
+    now = time.monotonic()
+    cache = _cache()
+    with _lock:
+        entry = cache.get(user_id)
+    if entry and entry[0] > now:
+        auth_user = entry[1]
+    else:
+        from app.models.user import User
+        user = db.session.get(User, user_id)
+        if not user:
+            invalidate_user(user_id)
+            return None
+        auth_user = AuthUser(user)
+        ttl = current_app.config.get('AUTH_CACHE_TTL', 30)
+        if ttl > 0:
+            with _lock:
+                cache[user_id] = (now + ttl, auth_user)
+
+    g.auth_user = auth_user
+    return auth_user
+
+
+def invalidate_user(user_id):
+    """Drop any cached auth data for `user_id` (call after role/timeout changes or deletion)."""
+    with _lock:
+        _cache().pop(user_id, None)
+    cached = g.get('auth_user')
+    if cached is not None and cached.id == user_id:
+        g.pop('auth_user')
@@ -4,11 +4,18 @@ Badí' (Bahá'í) Calendar Utility
 The Bahá'í calendar consists of 19 months of 19 days each (361 days),
 plus 4-5 intercalary days (Ayyám-i-Há) between the 18th and 19th months.
 
-The Bahá'í year begins on Naw-Rúz (March 20 or 21, depending on the spring equinox).
+The Bahá'í year begins on Naw-Rúz (March 20 or 21, the day of the spring equinox in Tehran).
 Year 1 of the Bahá'í Era began on March 21, 1844.
+
+Conversions read a precomputed day table (BadiTable) covering a configurable
+span of Gregorian years, 1900-2200 by default; gregorian_to_badi_array
+converts a whole column of dates at once.
 """
 
+import math
+import threading
 from datetime import date, timedelta
+from functools import lru_cache
 from typing import Tuple, Optional
 
 # Bahá'í months with their names and meanings
@@ -38,47 +45,220 @@ BADI_MONTHS = [
 # Map month number to index in BADI_MONTHS
 MONTH_INDEX = {m["number"]: i for i, m in enumerate(BADI_MONTHS)}
 
+# Naw-Rúz from 172 BE (2015) on is the day, reckoned from sunset to sunset in
+# Tehran, in which the March equinox falls; before that it was fixed on March 21.
+ASTRONOMICAL_NAW_RUZ_FROM = 2015
+TEHRAN_LATITUDE = 35.6944
+TEHRAN_LONGITUDE = 51.4215
+TEHRAN_UTC_OFFSET_HOURS = 3.5
+
+# Naw-Rúz for 172-221 BE (2015-2064) as published by the Bahá'í World Centre:
+# the March day minus 20, one digit per year. The computation below agrees
+# except in 2026, where the equinox falls within a minute of sunset.
+PUBLISHED_NAW_RUZ_FROM = 2015
+PUBLISHED_NAW_RUZ = '10011001100110001000100010001000100010001000000000'
+
+# Gregorian years covered by the precomputed day table (see configure_badi_table)
+DEFAULT_TABLE_SPAN = (1900, 2200)
+
+# Periodic terms (A, B, C) for the March equinox, Meeus, Astronomical Algorithms ch. 27
+_EQUINOX_TERMS = (
+    (485, 324.96, 1934.136), (203, 337.23, 32964.467), (199, 342.08, 20.186),
+    (182, 27.85, 445267.112), (156, 73.14, 45036.886), (136, 171.52, 22518.443),
+    (77, 222.54, 65928.934), (74, 296.72, 3034.906), (70, 243.58, 9037.513),
+    (58, 119.81, 33718.147), (52, 297.17, 150.678), (50, 21.02, 2281.232),
+    (45, 247.54, 29929.562), (44, 325.15, 31555.956), (29, 60.93, 4443.417),
+    (18, 155.12, 67555.328), (17, 288.79, 4562.452), (16, 198.04, 62894.029),
+    (14, 199.76, 31436.921), (12, 95.39, 14577.848), (12, 287.11, 31931.756),
+    (12, 320.81, 34777.259), (9, 227.73, 1222.114), (8, 15.45, 16859.074),
+)
+
+# Julian Day at 00:00 UT of proleptic Gregorian ordinal 0
+_JD_ORDINAL_OFFSET = 1721424.5
+
+
+def _march_equinox_jd(gregorian_year: int) -> float:
+    """Julian Day (UT) of the March equinox."""
+    y = (gregorian_year - 2000) / 1000
+    jde0 = (2451623.80984 + 365242.37404 * y + 0.05169 * y ** 2
+            - 0.00411 * y ** 3 - 0.00057 * y ** 4)
+    t = (jde0 - 2451545.0) / 36525
+    w = math.radians(35999.373 * t - 2.47)
+    delta_lambda = 1 + 0.0334 * math.cos(w) + 0.0007 * math.cos(2 * w)
+    s = sum(a * math.cos(math.radians(b + c * t)) for a, b, c in _EQUINOX_TERMS)
+    jde = jde0 + 0.00001 * s / delta_lambda
+    return jde - _delta_t_seconds(gregorian_year) / 86400
+
+
+def _delta_t_seconds(gregorian_year: int) -> float:
+    """TT - UT (Espenak & Meeus polynomial approximations)."""
+    if gregorian_year < 2050:
+        t = gregorian_year - 2000
+        return 62.92 + 0.32217 * t + 0.005589 * t * t
+    u = (gregorian_year - 1820) / 100
+    if gregorian_year < 2150:
+        return -20 + 32 * u * u - 0.5628 * (2150 - gregorian_year)
+    return -20 + 32 * u * u
+
+
+def _sunset_ut_hours(day: date, latitude: float, longitude: float) -> float:
+    """Hours after 00:00 UT of `day` at which the sun sets (NOAA solar equations)."""
+    t = (day.toordinal() + _JD_ORDINAL_OFFSET + 0.5 - 2451545.0) / 36525
+    mean_longitude = (280.46646 + t * (36000.76983 + 0.0003032 * t)) % 360
+    anomaly = math.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+    eccentricity = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+    center = (math.sin(anomaly) * (1.914602 - t * (0.004817 + 0.000014 * t))
+              + math.sin(2 * anomaly) * (0.019993 - 0.000101 * t)
+              + math.sin(3 * anomaly) * 0.000289)
+    omega = math.radians(125.04 - 1934.136 * t)
+    apparent_longitude = math.radians(mean_longitude + center - 0.00569 - 0.00478 * math.sin(omega))
+    obliquity = math.radians(
+        23 + (26 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60) / 60
+        + 0.00256 * math.cos(omega))
+    declination = math.asin(math.sin(obliquity) * math.sin(apparent_longitude))
+
+    y = math.tan(obliquity / 2) ** 2
+    l0 = math.radians(mean_longitude)
+    equation_of_time = 4 * math.degrees(
+        y * math.sin(2 * l0) - 2 * eccentricity * math.sin(anomaly)
+        + 4 * eccentricity * y * math.sin(anomaly) * math.cos(2 * l0)
+        - 0.5 * y * y * math.sin(4 * l0) - 1.25 * eccentricity ** 2 * math.sin(2 * anomaly))
+
+    lat = math.radians(latitude)
+    hour_angle = math.degrees(math.acos(
+        math.cos(math.radians(90.833)) / (math.cos(lat) * math.cos(declination))
+        - math.tan(lat) * math.tan(declination)))
+    return (720 - 4 * (longitude - hour_angle) - equation_of_time) / 60
+
+
+def _astronomical_naw_ruz(gregorian_year: int) -> date:
+    """Tehran day (sunset to sunset) containing the March equinox."""
+    equinox = _march_equinox_jd(gregorian_year)
+    # Tehran civil date of the equinox
+    local = equinox + TEHRAN_UTC_OFFSET_HOURS / 24
+    day = date.fromordinal(int(math.floor(local - _JD_ORDINAL_OFFSET)))
+    hours = (equinox - day.toordinal() - _JD_ORDINAL_OFFSET) * 24
+    # After sunset the equinox belongs to the next Badí' day
+    if hours >= _sunset_ut_hours(day, TEHRAN_LATITUDE, TEHRAN_LONGITUDE):
+        day += timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def _compute_naw_ruz(gregorian_year: int) -> date:
+    if gregorian_year < ASTRONOMICAL_NAW_RUZ_FROM:
+        return date(gregorian_year, 3, 21)
+    published = gregorian_year - PUBLISHED_NAW_RUZ_FROM
+    if published < len(PUBLISHED_NAW_RUZ):
+        return date(gregorian_year, 3, 20 + int(PUBLISHED_NAW_RUZ[published]))
+    return _astronomical_naw_ruz(gregorian_year)
+
+
 def get_naw_ruz(gregorian_year: int) -> date:
     """
     Get the date of Naw-Rúz for a given Gregorian year.
-    Naw-Rúz falls on March 20 or 21, determined by the spring equinox in Tehran.
-    For simplicity, we use March 20 for years 2015 onwards (when the new calculation began),
-    and March 21 for earlier years.
-    """
-    # From 2015 onwards, Naw-Rúz is calculated based on the equinox in Tehran
-    # This is a simplified calculation - actual dates may vary slightly
-    if gregorian_year >= 2015:
-        # Most years it's March 20, but some years it's March 21
-        # This is a simplified approximation
-        return date(gregorian_year, 3, 20)
-    else:
-        return date(gregorian_year, 3, 21)
+    From 2015 it is the day of the March equinox in Tehran (March 20 or 21);
+    earlier years use March 21.
+    """
+    table = badi_table()
+    if table.naw_ruz_start <= gregorian_year < table.naw_ruz_start + len(table.naw_ruz):
+        return date.fromordinal(table.naw_ruz[gregorian_year - table.naw_ruz_start])
+    return _compute_naw_ruz(gregorian_year)
+
+def ayyam_i_ha_days(badi_year: int) -> int:
+    """Number of intercalary days (4 or 5): the year's length minus 19 x 19."""
+    gregorian_year = badi_year + 1843
+    return (get_naw_ruz(gregorian_year + 1) - get_naw_ruz(gregorian_year)).days - 361
 
 def is_leap_year_badi(badi_year: int) -> bool:
     """
     Determine if a Bahá'í year is a leap year (has 5 Ayyám-i-Há days instead of 4).
-    This corresponds to when the Gregorian year containing most of the Bahá'í year is a leap year.
     """
-    # The Bahá'í year starts in March, so year X corresponds mostly to Gregorian year (X + 1843)
-    gregorian_year = badi_year + 1843
-    # Check if the following Gregorian year is a leap year (since Ayyám-i-Há is in February)
-    next_year = gregorian_year + 1
-    return (next_year % 4 == 0 and next_year % 100 != 0) or (next_year % 400 == 0)
+    return ayyam_i_ha_days(badi_year) == 5
 
-def gregorian_to_badi(gregorian_date: date) -> Tuple[int, int, int]:
-    """
-    Convert a Gregorian date to a Badí' date.
-    Returns (year, month, day) where month 0 = Ayyám-i-Há.
+
+class BadiTable:
+    """Precomputed Badí' (year, month, day) for every day of a Gregorian year span.
+
+    Lookups are array indexing by date ordinal; dates outside the span fall
+    back to computing Naw-Rúz directly.
     """
+
+    def __init__(self, start_year: int, end_year: int):
+        # numpy is only needed once the table is first used
+        import numpy as np
+
+        self.start_year, self.end_year = start_year, end_year
+        # Naw-Rúz of the year before the span up to the year after it
+        self.naw_ruz_start = start_year - 1
+        self.naw_ruz = [_compute_naw_ruz(y).toordinal() for y in range(start_year - 1, end_year + 2)]
+
+        self.first_ordinal = date(start_year, 1, 1).toordinal()
+        ordinals = np.arange(self.first_ordinal, date(end_year, 12, 31).toordinal() + 1)
+        naw_ruz = np.array(self.naw_ruz)
+        k = np.searchsorted(naw_ruz, ordinals, side='right') - 1
+        day_of_year = ordinals - naw_ruz[k] + 1
+        ayyam = naw_ruz[k + 1] - naw_ruz[k] - 361
+
+        self.years = (k + self.naw_ruz_start - 1843).astype(np.int16)
+        in_months = day_of_year <= 342
+        in_ayyam = ~in_months & (day_of_year <= 342 + ayyam)
+        self.months = np.where(in_months, (day_of_year - 1) // 19 + 1,
+                               np.where(in_ayyam, 0, 19)).astype(np.int8)
+        self.days = np.where(in_months, (day_of_year - 1) % 19 + 1,
+                             np.where(in_ayyam, day_of_year - 342,
+                                      day_of_year - 342 - ayyam)).astype(np.int8)
+
+    def __len__(self):
+        return len(self.years)
+
+    def lookup(self, ordinal: int) -> Optional[Tuple[int, int, int]]:
+        index = ordinal - self.first_ordinal
+        if 0 <= index < len(self.years):
+            return (self.years.item(index), self.months.item(index), self.days.item(index))
+        return None
+
+
+_table_span = DEFAULT_TABLE_SPAN
+_table = None
+_table_lock = threading.Lock()
+
+
+def configure_badi_table(start_year: int, end_year: int):
+    """Set the Gregorian year span of the lookup table (built on first use)."""
+    global _table_span, _table
+    if end_year < start_year:
+        raise ValueError(f"Invalid Badí' table span: {start_year}-{end_year}")
+    with _table_lock:
+        if (start_year, end_year) != _table_span:
+            _table_span = (start_year, end_year)
+            _table = None
+
+
+def badi_table() -> BadiTable:
+    """Return the lookup table, building it on first use."""
+    global _table
+    table = _table
+    if table is None:
+        with _table_lock:
+            if _table is None:
+                _table = BadiTable(*_table_span)
+            table = _table
+    return table
+
+
+def _gregorian_to_badi_direct(gregorian_date: date) -> Tuple[int, int, int]:
+    """gregorian_to_badi without the table (dates outside its span)."""
     # Find the Bahá'í year
-    naw_ruz_this_year = get_naw_ruz(gregorian_date.year)
+    naw_ruz_this_year = _compute_naw_ruz(gregorian_date.year)
     
     if gregorian_date >= naw_ruz_this_year:
         badi_year = gregorian_date.year - 1843
         start_of_year = naw_ruz_this_year
     else:
         badi_year = gregorian_date.year - 1844
-        start_of_year = get_naw_ruz(gregorian_date.year - 1)
+        start_of_year = _compute_naw_ruz(gregorian_date.year - 1)
+    ayyam_days = (_compute_naw_ruz(badi_year + 1844) - start_of_year).days - 361
     
     # Calculate day of the Bahá'í year (1-indexed)
     day_of_year = (gregorian_date - start_of_year).days + 1
@@ -87,17 +267,58 @@ def gregorian_to_badi(gregorian_date: date) -> Tuple[int, int, int]:
     if day_of_year <= 342:  # First 18 months (18 * 19 = 342 days)
         month = ((day_of_year - 1) // 19) + 1
         day = ((day_of_year - 1) % 19) + 1
-    elif day_of_year <= 342 + (5 if is_leap_year_badi(badi_year) else 4):
+    elif day_of_year <= 342 + ayyam_days:
         # Ayyám-i-Há
         month = 0
         day = day_of_year - 342
     else:
         # Month of 'Alá' (19th month)
         month = 19
-        day = day_of_year - 342 - (5 if is_leap_year_badi(badi_year) else 4)
+        day = day_of_year - 342 - ayyam_days
     
     return (badi_year, month, day)
 
+def gregorian_to_badi(gregorian_date: date) -> Tuple[int, int, int]:
+    """
+    Convert a Gregorian date to a Badí' date.
+    Returns (year, month, day) where month 0 = Ayyám-i-Há.
+    """
+    result = badi_table().lookup(gregorian_date.toordinal())
+    if result is None:
+        result = _gregorian_to_badi_direct(gregorian_date)
+    return result
+
+def gregorian_to_badi_array(dates):
+    """
+    Convert a column of Gregorian dates (datetime64 array, pandas Series or
+    sequence of dates) to Badí' dates in one pass.
+    Returns (years, months, days) as NumPy int arrays; NaT entries are 0.
+    """
+    import numpy as np
+
+    values = np.asarray(dates)
+    if values.dtype.kind != 'M':
+        values = values.astype('datetime64[D]')
+    values = values.astype('datetime64[D]')
+    missing = np.isnat(values)
+
+    table = badi_table()
+    # Days since 1970-01-01 to table rows
+    index = values.astype(np.int64) - (table.first_ordinal - date(1970, 1, 1).toordinal())
+    inside = ~missing & (index >= 0) & (index < len(table))
+
+    years = np.zeros(values.shape, dtype=np.int32)
+    months = np.zeros(values.shape, dtype=np.int32)
+    days = np.zeros(values.shape, dtype=np.int32)
+    years[inside] = table.years[index[inside]]
+    months[inside] = table.months[index[inside]]
+    days[inside] = table.days[index[inside]]
+
+    for i in np.flatnonzero(~missing & ~inside):
+        years.flat[i], months.flat[i], days.flat[i] = _gregorian_to_badi_direct(
+            values.flat[i].astype(object))
+    return years, months, days
+
 def badi_to_gregorian(badi_year: int, badi_month: int, badi_day: int) -> date:
     """
     Convert a Badí' date to a Gregorian date.
@@ -114,8 +335,7 @@ def badi_to_gregorian(badi_year: int, badi_month: int, badi_day: int) -> date:
         day_of_year = 342 + badi_day
     elif badi_month == 19:
         # Month of 'Alá' (19th month)
-        ayyam_days = 5 if is_leap_year_badi(badi_year) else 4
-        day_of_year = 342 + ayyam_days + badi_day
+        day_of_year = 342 + ayyam_i_ha_days(badi_year) + badi_day
     else:
         raise ValueError(f"Invalid Badí' month: {badi_month}")
     
@@ -132,8 +352,7 @@ def get_badi_month_date_range(badi_year: int, badi_month: int) -> Tuple[date, da
     elif badi_month == 0:
         # Ayyám-i-Há
         start = badi_to_gregorian(badi_year, 0, 1)
-        days = 5 if is_leap_year_badi(badi_year) else 4
-        end = badi_to_gregorian(badi_year, 0, days)
+        end = badi_to_gregorian(badi_year, 0, ayyam_i_ha_days(badi_year))
     elif badi_month == 19:
         start = badi_to_gregorian(badi_year, 19, 1)
         end = badi_to_gregorian(badi_year, 19, 19)
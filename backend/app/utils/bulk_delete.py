@@ -0,0 +1,64 @@
+"""
+Set-based deletion of a user's transactions.
+
+Deletes run as `DELETE ... WHERE id IN (...)` in fixed-size chunks, each
+committed on its own, so memory use does not grow with the number of rows
+and the database write lock is released between chunks instead of being held
+for the whole operation. Rows are never loaded as ORM objects.
+
+Rows that depend on a transaction (excluded_expenses) are removed in the same
+chunk. The full-text search index is maintained by its own triggers.
+"""
+
+from sqlalchemy import delete, select
+
+from app import db
+from app.models.excluded_expense import ExcludedExpense
+from app.models.transaction import Transaction
+
+# Stays well below SQLite's bound-parameter limit
+DELETE_CHUNK_SIZE = 500
+
+
+def _delete_chunk(user_id, ids):
+    owned = (Transaction.id.in_(ids), Transaction.user_id == user_id)
+    db.session.execute(
+        delete(ExcludedExpense).where(
+            ExcludedExpense.transaction_id.in_(select(Transaction.id).where(*owned))
+        )
+    )
+    result = db.session.execute(delete(Transaction).where(*owned))
+    db.session.commit()
+    return result.rowcount
+
+
+def delete_transactions_by_ids(user_id, transaction_ids, chunk_size=None):
+    """Delete the given transactions owned by `user_id`; return how many were deleted."""
+    chunk_size = chunk_size or DELETE_CHUNK_SIZE
+    ids = sorted({int(i) for i in transaction_ids})
+    deleted = 0
+    for start in range(0, len(ids), chunk_size):
+        deleted += _delete_chunk(user_id, ids[start:start + chunk_size])
+    return deleted
+
+
+def delete_transactions_where(user_id, *criteria, chunk_size=None):
+    """Delete a user's transactions matching `criteria`; return how many were deleted.
+
+    Each round selects the next chunk of ids through the (user_id, date)
+    index and deletes it, so only one chunk of ids is in memory at a time.
+    """
+    chunk_size = chunk_size or DELETE_CHUNK_SIZE
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = db.session.execute(
+            select(Transaction.id)
+            .where(Transaction.user_id == user_id, Transaction.id > last_id, *criteria)
+            .order_by(Transaction.id)
+            .limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            return deleted
+        deleted += _delete_chunk(user_id, ids)
+        last_id = ids[-1]
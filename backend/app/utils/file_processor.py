@@ -1,7 +1,24 @@
-import pandas as pd
-from datetime import datetime
 import csv
 
+from app.utils.row_parsers import compile_csv_parser, parse_excel_frame
+
+# pandas is imported inside the functions that need it: loading it costs
+# every worker ~0.3 s and tens of MB at boot, and only uploads use it.
+
+# Keyword fallback of categorize_transaction, tried in order when no rule matches
+FALLBACK_CATEGORY_KEYWORDS = {
+    'Groceries': ['grocery', 'supermarket', 'food', 'market', 'frys', 'walmart', 'safeway', 'whole foods'],
+    'Restaurants & Dining': ['restaurant', 'cafe', 'pizza', 'burger', 'coffee', 'mcd', 'chipotle', 'chick-fil'],
+    'Transportation': ['uber', 'taxi', 'gas', 'fuel', 'parking', 'transit', 'amtrak', 'lyft', 'shell', 'chevron', 'speedway'],
+    'Utilities': ['electric', 'water', 'gas bill', 'internet', 'phone', 'comcast', 'verizon', 'at&t', 'utility', 'city of'],
+    'Entertainment/Subscriptions': ['movie', 'concert', 'game', 'entertainment', 'netflix', 'hulu', 'disney', 'steam', 'playstation', 'xbox', 'nintendo'],
+    'Shopping/Retail': ['amazon', 'walmart', 'target', 'mall', 'store', 'shop', 'ebay', 'etsy', 'best buy'],
+    'Health & Pharmacy': ['doctor', 'hospital', 'pharmacy', 'medicine', 'cvs', 'walgreens', 'dental', 'clinic', 'health'],
+    'Insurance': ['insurance', 'aarp', 'geico', 'state farm'],
+    'Housing': ['rent', 'mortgage', 'landlord', 'property'],
+    'Income': ['salary', 'wages', 'paycheck', 'payroll'],
+}
+
 def detect_transaction_type(description, amount):
     """Detect if transaction is income or expense"""
     if amount < 0:
@@ -52,21 +69,7 @@ def categorize_transaction(description, category_id=None, user_id=None):
     # Fallback: Hardcoded rules if no database rules match
     description_lower = description.lower()
     
-    # Try to find category by name
-    category_map = {
-        'Groceries': ['grocery', 'supermarket', 'food', 'market', 'frys', 'walmart', 'safeway', 'whole foods'],
-        'Restaurants & Dining': ['restaurant', 'cafe', 'pizza', 'burger', 'coffee', 'mcd', 'chipotle', 'chick-fil'],
-        'Transportation': ['uber', 'taxi', 'gas', 'fuel', 'parking', 'transit', 'amtrak', 'lyft', 'shell', 'chevron', 'speedway'],
-        'Utilities': ['electric', 'water', 'gas bill', 'internet', 'phone', 'comcast', 'verizon', 'at&t', 'utility', 'city of'],
-        'Entertainment/Subscriptions': ['movie', 'concert', 'game', 'entertainment', 'netflix', 'hulu', 'disney', 'steam', 'playstation', 'xbox', 'nintendo'],
-        'Shopping/Retail': ['amazon', 'walmart', 'target', 'mall', 'store', 'shop', 'ebay', 'etsy', 'best buy'],
-        'Health & Pharmacy': ['doctor', 'hospital', 'pharmacy', 'medicine', 'cvs', 'walgreens', 'dental', 'clinic', 'health'],
-        'Insurance': ['insurance', 'aarp', 'geico', 'state farm'],
-        'Housing': ['rent', 'mortgage', 'landlord', 'property'],
-        'Income': ['salary', 'wages', 'paycheck', 'payroll'],
-    }
-    
-    for category_name, keywords in category_map.items():
+    for category_name, keywords in FALLBACK_CATEGORY_KEYWORDS.items():
         if any(word in description_lower for word in keywords):
             if user_id:
                 # Try user-specific category first, then fall back to system category
@@ -88,226 +91,122 @@ def categorize_transaction(description, category_id=None, user_id=None):
     return default_category.id if default_category else None
 
 
-def _parse_date(date_str):
-    """Try multiple date formats and return a date object, or None."""
-    for fmt in ('%Y-%m-%d', '%m/%d/%Y', '%m-%d-%Y', '%d/%m/%Y', '%Y/%m/%d'):
-        try:
-            return datetime.strptime(date_str.strip(), fmt).date()
-        except:
-            pass
-    return None
+class CategorizerSnapshot:
+    """categorize_transaction() and the template category lookup for one user,
+    read from the database once.
 
+    Holds only plain data: parsing a file then runs no query per row, and
+    the snapshot can be sent to ingest worker processes (app/utils/ingest_pool.py).
+    """
 
-def process_csv_file(filepath, limit=None, user_id=None, column_mapping=None):
+    def __init__(self, rules, fallback, uncategorized_id, own_categories, categories_by_name):
+        self.rules = rules                            # [(keywords, category_id)] in match order
+        self.fallback = fallback                      # same, from FALLBACK_CATEGORY_KEYWORDS
+        self.uncategorized_id = uncategorized_id
+        self.own_categories = own_categories          # exact name -> id, this user's
+        self.categories_by_name = categories_by_name  # lower-cased name -> id, any user's
+
+    @classmethod
+    def load(cls, user_id=None):
+        from app import db
+        from app.models.categorization_rule import CategorizationRule
+        from app.models.category import Category
+
+        active = CategorizationRule.query.filter_by(is_active=True)
+        by_priority = CategorizationRule.priority.desc()
+        if user_id:
+            rules = (active.filter_by(user_id=user_id).order_by(by_priority).all()
+                     + active.filter(CategorizationRule.user_id.is_(None)).order_by(by_priority).all())
+        else:
+            rules = active.order_by(by_priority).all()
+
+        categories = db.session.query(Category.id, Category.name, Category.user_id).order_by(Category.id).all()
+        first_by_name = {}
+        by_owner = {}
+        categories_by_name = {}
+        for category_id, name, owner in categories:
+            first_by_name.setdefault(name, category_id)
+            by_owner.setdefault((name, owner), category_id)
+            categories_by_name.setdefault(name.lower(), category_id)
+
+        def named(name):
+            if user_id:
+                return by_owner.get((name, user_id)) or by_owner.get((name, None))
+            return first_by_name.get(name)
+
+        fallback = [(keywords, named(name)) for name, keywords in FALLBACK_CATEGORY_KEYWORDS.items()
+                    if named(name)]
+        own_categories = {name: category_id for (name, owner), category_id in by_owner.items()
+                          if owner == user_id}
+        return cls([(rule.get_keywords_list(), rule.category_id) for rule in rules], fallback,
+                   named('Uncategorized'), own_categories, categories_by_name)
+
+    def categorize(self, description):
+        """Same result as categorize_transaction(description, user_id=...)."""
+        description_lower = description.lower()
+        for keywords, category_id in self.rules:
+            if any(keyword in description_lower for keyword in keywords):
+                return category_id
+        for keywords, category_id in self.fallback:
+            if any(keyword in description_lower for keyword in keywords):
+                return category_id
+        return self.uncategorized_id
+
+    def template_category(self, name):
+        """Id of the category a template's category column names, or None."""
+        name = name.strip()
+        return self.own_categories.get(name) or self.categories_by_name.get(name.lower())
+
+
+def process_csv_file(filepath, limit=None, user_id=None, column_mapping=None, categorizer=None):
     """Process CSV file and extract transactions.
 
     column_mapping (optional) is a dict with keys:
         date_col, description_col, amount_col, category_col (optional)
     When provided, those exact column names are used and all other columns
     are collected into the transaction notes.
-    """
-    transactions = []
 
+    categorizer (optional) is a CategorizerSnapshot; by default one is
+    loaded for user_id.
+    """
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-
-            for i, row in enumerate(reader):
-                if limit and i >= limit:
-                    break
-
-                if column_mapping:
-                    date_str   = row.get(column_mapping['date_col'], '')
-                    desc       = row.get(column_mapping['description_col'], '')
-                    amount_str = row.get(column_mapping['amount_col'], '')
-                    cat_str    = row.get(column_mapping.get('category_col', ''), '') if column_mapping.get('category_col') else ''
-                    # Collect extra columns into notes
-                    known = {column_mapping['date_col'], column_mapping['description_col'], column_mapping['amount_col']}
-                    if column_mapping.get('category_col'):
-                        known.add(column_mapping['category_col'])
-                    notes = ' | '.join(f"{k}: {v}" for k, v in row.items() if k not in known and str(v).strip())
-                else:
-                    date_str   = (row.get('Date') or row.get('date') or row.get('Transaction Date')
-                                  or row.get('Post Date') or row.get('Posted Date') or '')
-                    desc       = (row.get('Description') or row.get('description')
-                                  or row.get('Memo') or row.get('Payee') or row.get('payee') or '')
-                    amount_str = (row.get('Amount') or row.get('amount')
-                                  or row.get('Debit') or '')
-                    cat_str    = row.get('Category') or row.get('category') or ''
-                    notes      = ''
-
-                if not all([date_str, desc, amount_str]):
-                    continue
-
-                transaction_date = _parse_date(str(date_str))
-                if transaction_date is None:
-                    continue
-
-                try:
-                    amount = float(str(amount_str).replace('$', '').replace(',', ''))
-                except (ValueError, TypeError):
-                    continue
-
-                trans_type = detect_transaction_type(desc, amount)
-                amount = abs(amount)
-
-                # Category: honour CSV value from template if present, else auto-detect
-                category_id = None
-                if cat_str and column_mapping:
-                    from app.models.category import Category
-                    cat = Category.query.filter_by(name=cat_str.strip(), user_id=user_id).first()
-                    if not cat:
-                        cat = Category.query.filter(Category.name.ilike(cat_str.strip())).first()
-                    if cat:
-                        category_id = cat.id
-                if not category_id:
-                    category_id = categorize_transaction(desc, user_id=user_id)
-
-                transactions.append({
-                    'date': transaction_date,
-                    'description': desc.strip(),
-                    'amount': amount,
-                    'type': trans_type,
-                    'category_id': category_id,
-                    'notes': notes,
-                })
-
-        return transactions
-
+            return parse_csv_rows(f, limit=limit, user_id=user_id, column_mapping=column_mapping,
+                                  categorizer=categorizer)
     except Exception as e:
         raise Exception(f"Error processing CSV: {str(e)}")
 
-def process_excel_file(filepath, limit=None, user_id=None, column_mapping=None):
+
+def parse_csv_rows(f, limit=None, user_id=None, column_mapping=None, categorizer=None):
+    """Transactions from an open CSV text stream (see process_csv_file)."""
+    if categorizer is None:
+        categorizer = CategorizerSnapshot.load(user_id)
+
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return []
+    return compile_csv_parser(column_mapping, header).parse(reader, categorizer, limit=limit)
+
+
+def process_excel_file(filepath, limit=None, user_id=None, column_mapping=None, categorizer=None):
     """Process Excel file and extract transactions.
 
-    column_mapping (optional) has the same shape as for process_csv_file.
+    column_mapping and categorizer (optional) are as for process_csv_file.
     """
-    transactions = []
-    
+    import pandas as pd
+
+    if categorizer is None:
+        categorizer = CategorizerSnapshot.load(user_id)
+
     try:
         df = pd.read_excel(filepath)
-        
-        for i, row in df.iterrows():
-            if limit and i >= limit:
-                break
-            
-            # Initialize values
-            date_val = None
-            desc_val = None
-            amount_val = None
-            
-            # Map columns with exact name matching (highest priority)
-            column_map = {col.lower(): col for col in df.columns}
-
-            cat_val = None
-            notes_str = ''
-
-            if column_mapping:
-                date_val   = row.get(column_mapping['date_col'])
-                desc_val   = row.get(column_mapping['description_col'])
-                amount_val = row.get(column_mapping['amount_col'])
-                if column_mapping.get('category_col'):
-                    cat_val = row.get(column_mapping['category_col'])
-                known = {column_mapping['date_col'], column_mapping['description_col'], column_mapping['amount_col']}
-                if column_mapping.get('category_col'):
-                    known.add(column_mapping['category_col'])
-                notes_str = ' | '.join(
-                    f"{k}: {v}" for k, v in row.items()
-                    if k not in known and not pd.isna(v) and str(v).strip()
-                )
-            else:
-                # Try exact matches first
-                if 'posted date' in column_map:
-                    date_val = row[column_map['posted date']]
-                elif 'post date' in column_map:
-                    date_val = row[column_map['post date']]
-                elif 'date' in column_map:
-                    date_val = row[column_map['date']]
-                elif 'transaction date' in column_map:
-                    date_val = row[column_map['transaction date']]
-
-                # Payee is the best description match
-                if 'payee' in column_map:
-                    desc_val = row[column_map['payee']]
-                elif 'description' in column_map:
-                    desc_val = row[column_map['description']]
-                elif 'memo' in column_map:
-                    desc_val = row[column_map['memo']]
-
-                # Amount
-                if 'amount' in column_map:
-                    amount_val = row[column_map['amount']]
-                elif 'debit' in column_map:
-                    amount_val = row[column_map['debit']]
-                elif 'credit' in column_map:
-                    amount_val = row[column_map['credit']]
-            
-            # Skip if missing required fields or if they are NaN
-            if date_val is None or desc_val is None or amount_val is None:
-                continue
-            
-            # Skip NaN values
-            if pd.isna(date_val) or pd.isna(desc_val) or pd.isna(amount_val):
-                continue
-            
-            try:
-                # Parse date
-                if isinstance(date_val, str):
-                    try:
-                        transaction_date = datetime.strptime(date_val, '%Y-%m-%d').date()
-                    except:
-                        try:
-                            transaction_date = datetime.strptime(date_val, '%m/%d/%Y').date()
-                        except:
-                            continue
-                else:
-                    transaction_date = pd.to_datetime(date_val).date()
-            except:
-                continue
-            
-            # Parse amount - handle NaN and convert to float
-            try:
-                if isinstance(amount_val, str):
-                    amount = float(amount_val.replace('$', '').replace(',', ''))
-                else:
-                    amount = float(amount_val)
-            except (ValueError, TypeError):
-                continue
-            
-            # Skip zero amounts
-            if amount == 0:
-                continue
-            
-            trans_type = detect_transaction_type(str(desc_val), amount)
-            amount = abs(amount)
-
-            # Category from template column if present, else auto-detect
-            category_id = None
-            if cat_val is not None and not pd.isna(cat_val) and str(cat_val).strip():
-                from app.models.category import Category
-                cat = Category.query.filter_by(name=str(cat_val).strip(), user_id=user_id).first()
-                if not cat:
-                    cat = Category.query.filter(Category.name.ilike(str(cat_val).strip())).first()
-                if cat:
-                    category_id = cat.id
-            if not category_id:
-                category_id = categorize_transaction(str(desc_val), user_id=user_id)
-
-            transactions.append({
-                'date': transaction_date,
-                'description': str(desc_val).strip(),
-                'amount': amount,
-                'type': trans_type,
-                'category_id': category_id,
-                'notes': notes_str,
-            })
-
-        return transactions
+        return parse_excel_frame(df, categorizer, column_mapping=column_mapping, limit=limit)
 
     except Exception as e:
         raise Exception(f"Error processing Excel: {str(e)}")
 
-def process_delete_file(file):
+def process_delete_file(file, user_id):
     """
     Process a file containing transactions to delete.
     Supports two formats:
@@ -315,8 +214,19 @@ def process_delete_file(file):
     2. Bank statement format: Matches by description/payee and amount (e.g., 2025_JAN_FIN.xlsx)
     
     For bank statement format, looks for columns: Payee/Description, Amount/Transaction Amount
+    and optionally Date. Returns the list of matched transaction IDs.
+    """
+    return match_delete_file(file, user_id)['transaction_ids']
+
+def match_delete_file(file, user_id):
     """
-    from app.models.transaction import Transaction
+    Like process_delete_file, but also reports statement rows that could not
+    be matched or matched more than one transaction. Returns a dict with
+    'transaction_ids', 'ambiguous' and 'unmatched' (row numbers are 1-based
+    data rows of the file).
+    """
+    import pandas as pd
+    from app.utils.reconcile import reconcile
     
     try:
         transaction_ids = []
@@ -340,19 +250,16 @@ def process_delete_file(file):
         
         # If ID column found, use that
         if id_column is not None:
-            for idx, val in df[id_column].items():
-                try:
-                    if pd.notna(val):
-                        transaction_ids.append(int(val))
-                except (ValueError, TypeError):
-                    continue
+            ids = pd.to_numeric(df[id_column], errors='coerce').dropna()
+            transaction_ids = [int(v) for v in ids]
             
             if transaction_ids:
-                return transaction_ids
+                return {'transaction_ids': transaction_ids, 'ambiguous': [], 'unmatched': []}
         
         # Otherwise, try bank statement format matching
         payee_column = None
         amount_column = None
+        date_column = None
         
         # Find payee/description column
         for col_name in ['Payee', 'Description', 'payee', 'description', 'PAYEE', 'DESCRIPTION', 'Merchant', 'merchant']:
@@ -366,61 +273,49 @@ def process_delete_file(file):
                 amount_column = col_name
                 break
         
-        # If we have both payee and amount columns, try to match transactions
-        if payee_column and amount_column:
-            for idx, row in df.iterrows():
-                try:
-                    payee = str(row[payee_column]).strip()
-                    amount_str = str(row[amount_column]).strip()
-                    
-                    # Handle negative amounts (expenses)
-                    amount = float(amount_str.replace('$', '').replace(',', ''))
-                    amount = abs(amount)  # Always use absolute value for matching
-                    
-                    if pd.notna(payee) and payee and amount > 0:
-                        # Find matching transaction
-                        matching_trans = Transaction.query.filter(
-                            Transaction.description.ilike(f'%{payee}%'),
-                            Transaction.amount == amount
-                        ).first()
-                        
-                        if matching_trans:
-                            transaction_ids.append(matching_trans.id)
-                
-                except (ValueError, TypeError, AttributeError):
-                    continue
-            
-            if transaction_ids:
-                return transaction_ids
+        # Find date column (optional, narrows the candidate window)
+        for col_name in ['Date', 'date', 'Transaction Date', 'Posted Date', 'Posting Date', 'DATE']:
+            if col_name in df.columns:
+                date_column = col_name
+                break
         
-        # If we only have amount column, try matching by amount alone
-        if amount_column and not transaction_ids:
-            for idx, row in df.iterrows():
-                try:
-                    amount_str = str(row[amount_column]).strip()
-                    amount = float(amount_str.replace('$', '').replace(',', ''))
-                    amount = abs(amount)
-                    
-                    if amount > 0:
-                        matching_trans = Transaction.query.filter(
-                            Transaction.amount == amount
-                        ).first()
-                        
-                        if matching_trans:
-                            transaction_ids.append(matching_trans.id)
-                
-                except (ValueError, TypeError):
-                    continue
+        # Match statement rows against the user's transactions in one pass;
+        # without a payee column rows are matched by amount (and date) alone
+        if amount_column:
+            amounts = pd.to_numeric(
+                df[amount_column].astype(str)
+                .str.replace(r'[$,\s]', '', regex=True)
+                .str.replace(r'^\((.*)\)$', r'-\1', regex=True),
+                errors='coerce'
+            ).abs()
+            payees = df[payee_column].where(df[payee_column].notna(), '').astype(str).str.strip() \
+                if payee_column else pd.Series('', index=df.index)
+            dates = pd.to_datetime(df[date_column], errors='coerce', format='mixed').dt.date \
+                if date_column else pd.Series(None, index=df.index)
             
-            if transaction_ids:
-                return transaction_ids
-        
-        if not transaction_ids:
-            raise ValueError("No valid transaction IDs or matching transactions found in file. "
-                           "File should contain 'ID' column or 'Payee' + 'Amount' columns for bank statement format.")
+            rows = [
+                {
+                    'amount': float(amount) if pd.notna(amount) and amount > 0 else None,
+                    'payee': payee,
+                    'date': d if pd.notna(d) else None,
+                }
+                for amount, payee, d in zip(amounts, payees, dates)
+            ]
+            matches = reconcile(user_id, rows)
+            transaction_ids = [m['transaction_id'] for m in matches['matched']]
+            
+            if transaction_ids or matches['ambiguous']:
+                return {
+                    'transaction_ids': transaction_ids,
+                    'ambiguous': [
+                        {'row': a['row'] + 1, 'candidate_ids': a['candidate_ids']}
+                        for a in matches['ambiguous']
+                    ],
+                    'unmatched': [i + 1 for i in matches['unmatched']],
+                }
         
-        return transaction_ids
+        raise ValueError("No valid transaction IDs or matching transactions found in file. "
+                         "File should contain 'ID' column or 'Payee' + 'Amount' columns for bank statement format.")
     
     except Exception as e:
         raise Exception(f"Error processing delete file: {str(e)}")
-
@@ -0,0 +1,184 @@
+"""
+Process pool for parsing uploaded statements (INGEST_WORKERS > 0).
+
+Parsing and categorizing rows is pure Python work that holds the GIL, so
+inside one gunicorn thread a batch of statements is parsed on one core.
+IngestPool spreads the work over worker processes:
+
+- each Excel file is one task;
+- a CSV file larger than INGEST_SPLIT_BYTES is cut into byte ranges at
+  record boundaries, one task per range, and the parts are joined again in
+  file order.
+
+Workers receive a file path, the template's column mapping and a
+CategorizerSnapshot, and send the parsed rows back over the pool's pipes.
+They never open the database. The thread that submitted the files writes
+every row through its own session, so SQLite still has a single writer.
+
+The pool uses the spawn start method. A forked child would inherit the
+parent's pooled database connections and the locks held by its other
+threads.
+"""
+
+import atexit
+import io
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from app.utils.file_processor import parse_csv_rows, process_excel_file
+
+_lock = threading.Lock()
+
+
+def csv_ranges(path, parts, min_bytes):
+    """Split a CSV file into at most `parts` byte ranges of whole records.
+
+    Returns (header, ranges): the raw header line and the [(start, end)]
+    offsets of the data after it. Each range is at least `min_bytes` long,
+    except the last one. A newline only ends a record when an even number of
+    quote characters precede it, so quoted fields may contain line breaks.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    header_end = _record_end(data, 0)
+    body = len(data) - header_end
+    count = max(1, min(parts, body // max(min_bytes, 1)))
+
+    ranges = []
+    start = header_end
+    for i in range(1, count):
+        end = _record_end(data, max(header_end + body * i // count, start))
+        if end >= len(data):
+            break
+        if end > start:
+            ranges.append((start, end))
+            start = end
+    if start < len(data):
+        ranges.append((start, len(data)))
+    return data[:header_end], ranges
+
+
+def _record_end(data, pos):
+    """Offset just past the first record-ending newline at or after `pos`."""
+    quotes = data.count(b'"', 0, pos)
+    while True:
+        newline = data.find(b'\n', pos)
+        if newline < 0:
+            return len(data)
+        quotes += data.count(b'"', pos, newline)
+        if quotes % 2 == 0:
+            return newline + 1
+        pos = newline + 1
+
+
+def _parse_csv_range(path, header, start, end, column_mapping, categorizer):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    try:
+        stream = io.TextIOWrapper(io.BytesIO(header + data), encoding='utf-8')
+        return parse_csv_rows(stream, column_mapping=column_mapping, categorizer=categorizer)
+    except Exception as e:
+        raise Exception(f"Error processing CSV: {str(e)}")
+
+
+def _parse_excel(path, column_mapping, categorizer):
+    return process_excel_file(path, column_mapping=column_mapping, categorizer=categorizer)
+
+
+class IngestPool:
+    """Worker processes that parse statement files (app.extensions['ingest_pool'])."""
+
+    def __init__(self, workers, split_bytes):
+        self.workers = workers
+        self.split_bytes = split_bytes
+        self._executor = ProcessPoolExecutor(max_workers=workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+
+    def parse(self, files, categorizer, max_pending=None):
+        """Parse [(path, file_type, column_mapping)] in the worker processes.
+
+        Yields (index, transactions, error) for each file as soon as all of
+        its parts are done, so the caller can store one file while the
+        others are still being parsed. `error` is the exception a part
+        raised, with `transactions` None.
+
+        With `max_pending`, at most that many files are submitted and not yet
+        yielded. The next file is taken from `files` only after an earlier
+        one was yielded, so a lazy `files` does not run ahead of the caller.
+        """
+        files = iter(files)
+        index = -1
+        exhausted = False
+        parts = {}          # index -> futures of the file's parts
+        remaining = {}      # index -> parts still running
+        waiting = {}        # future -> index
+        while True:
+            while not exhausted and (max_pending is None or len(parts) < max_pending):
+                job = next(files, None)
+                if job is None:
+                    exhausted = True
+                    break
+                index += 1
+                path, file_type, column_mapping = job
+                try:
+                    if file_type == 'csv':
+                        header, ranges = csv_ranges(path, self.workers, self.split_bytes)
+                        futures = [self._executor.submit(_parse_csv_range, path, header, start, end,
+                                                         column_mapping, categorizer)
+                                   for start, end in ranges]
+                    else:
+                        futures = [self._executor.submit(_parse_excel, path, column_mapping, categorizer)]
+                except Exception as e:
+                    yield index, None, e
+                    continue
+                if not futures:
+                    yield index, [], None
+                    continue
+                parts[index] = futures
+                remaining[index] = len(futures)
+                for future in futures:
+                    waiting[future] = index
+            if not waiting:
+                return
+
+            done, _ = wait(waiting, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished = waiting.pop(future)
+                remaining[finished] -= 1
+                if remaining[finished]:
+                    continue
+                del remaining[finished]
+                transactions = []
+                try:
+                    for part in parts.pop(finished):
+                        transactions.extend(part.result())
+                except Exception as e:
+                    yield finished, None, e
+                else:
+                    yield finished, transactions, None
+
+    def parse_file(self, path, file_type, column_mapping, categorizer):
+        """Transactions of one file; raises what parsing raised."""
+        for _, transactions, error in self.parse([(path, file_type, column_mapping)], categorizer):
+            if error is not None:
+                raise error
+            return transactions
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def get_ingest_pool(app):
+    """The app's ingest pool, started on first use; None when INGEST_WORKERS is 0."""
+    pool = app.extensions.get('ingest_pool')
+    if pool is not None or not app.config['INGEST_WORKERS']:
+        return pool
+    with _lock:
+        pool = app.extensions.get('ingest_pool')
+        if pool is None:
+            pool = IngestPool(app.config['INGEST_WORKERS'], app.config['INGEST_SPLIT_BYTES'])
+            app.extensions['ingest_pool'] = pool
+            atexit.register(pool.close)
+    return pool
@@ -0,0 +1,305 @@
+"""
+Opt-in request profiling and query counting (INSTRUMENTATION_ENABLED).
+
+Flask before/after request hooks time each /api request, and SQLAlchemy
+before/after_cursor_execute events time every statement the request thread
+issues. Each request records its wall time, time spent in the database,
+query count and rows fetched. Rows are counted as they are fetched, through
+a thin proxy around the DBAPI cursor, because drivers report no rowcount for
+SELECTs. Queries on other threads, such as the activity-log writer, are not
+attributed to any request.
+
+Totals are aggregated per (method, endpoint) and served in Prometheus text
+format at /api/status/metrics, together with the activity-log writer's
+counters and the connection pool gauges. The numbers are per worker process:
+with several gunicorn workers, each scrape sees the worker that answered it.
+
+Two problems are logged through app.logger:
+
+* N+1 patterns. When one statement (the same SQL text with different bound
+  parameters) runs N_PLUS_ONE_THRESHOLD or more times in one request, it is
+  usually a per-row lazy load or lookup inside a loop. The statement is
+  logged and counted per endpoint.
+* Slow requests. Requests slower than SLOW_REQUEST_MS are logged with their
+  top statements by total database time.
+"""
+
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TOP_QUERIES = 3
+METRIC_PREFIX = 'expense_tracker'
+
+
+class RequestProfile:
+    """What one request spent in the database, statement by statement."""
+
+    __slots__ = ('started', 'queries', 'db_time', 'rows', 'statements')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        # statement text -> [executions, total seconds]
+        self.statements = {}
+
+    def record(self, statement, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def repeated(self, threshold):
+        """Statements run at least `threshold` times, most frequent first."""
+        return sorted(((count, sql) for sql, (count, _) in self.statements.items() if count >= threshold),
+                      reverse=True)
+
+    def top_queries(self, limit=TOP_QUERIES):
+        """(total seconds, executions, statement) of the costliest statements."""
+        return sorted(((total, count, sql) for sql, (count, total) in self.statements.items()),
+                      reverse=True)[:limit]
+
+
+class _CountingCursor:
+    """DBAPI cursor proxy that adds the rows fetched through it to a profile."""
+
+    __slots__ = ('_cursor', '_profile')
+
+    def __init__(self, cursor, profile):
+        self._cursor = cursor
+        self._profile = profile
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._profile.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._profile.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._profile.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class EndpointStats:
+    __slots__ = ('requests', 'errors', 'wall_time', 'db_time', 'queries', 'rows',
+                 'n_plus_one', 'slow', 'buckets')
+
+    def __init__(self):
+        self.requests = self.errors = self.queries = self.rows = self.n_plus_one = self.slow = 0
+        self.wall_time = self.db_time = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+
+class Instrumentation:
+    """Per-app aggregation of request profiles (app.extensions['instrumentation'])."""
+
+    def __init__(self, app):
+        self.app = app
+        self.slow_request_ms = app.config.get('SLOW_REQUEST_MS', 500)
+        self.n_plus_one_threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 10)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        # (method, endpoint) -> EndpointStats
+        self._endpoints = {}
+
+    # ── database side ───────────────────────────────────────────────────────
+
+    def watch(self, engine):
+        """Count the queries `engine` runs during profiled requests."""
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _start_query(conn, cursor, statement, parameters, context, executemany):
+            if has_request_context() and 'request_profile' in g:
+                conn.info.setdefault('instrumentation_started', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _end_query(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info.get('instrumentation_started')
+            if not started or not has_request_context():
+                return
+            profile = g.get('request_profile')
+            elapsed = time.perf_counter() - started.pop()
+            if profile is None:
+                return
+            profile.record(statement, elapsed)
+            if context is not None and cursor.description is not None:
+                # The result reads rows through context.cursor after this event
+                context.cursor = _CountingCursor(cursor, profile)
+
+    # ── request side ────────────────────────────────────────────────────────
+
+    def finish(self, profile, endpoint, method, status):
+        wall = time.perf_counter() - profile.started
+        repeated = profile.repeated(self.n_plus_one_threshold)
+        slow = wall * 1000 >= self.slow_request_ms
+
+        with self._lock:
+            stats = self._endpoints.get((method, endpoint))
+            if stats is None:
+                stats = self._endpoints[(method, endpoint)] = EndpointStats()
+            stats.requests += 1
+            stats.errors += status >= 500
+            stats.wall_time += wall
+            stats.db_time += profile.db_time
+            stats.queries += profile.queries
+            stats.rows += profile.rows
+            stats.n_plus_one += bool(repeated)
+            stats.slow += slow
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if wall <= bound:
+                    stats.buckets[i] += 1
+                    break
+
+        logger = self.app.logger
+        for count, sql in repeated:
+            logger.warning('Possible N+1 in %s %s: statement ran %d times: %s',
+                           method, endpoint, count, _shorten(sql))
+        if slow:
+            top = '; '.join(f'{total * 1000:.1f} ms x{count}: {_shorten(sql)}'
+                            for total, count, sql in profile.top_queries())
+            logger.warning('Slow request %s %s (%s): %.0f ms, db %.0f ms, %d queries, %d rows. Top queries: %s',
+                           method, request.path, endpoint, wall * 1000, profile.db_time * 1000,
+                           profile.queries, profile.rows, top or 'none')
+
+    # ── exposition ──────────────────────────────────────────────────────────
+
+    def snapshot(self):
+        with self._lock:
+            return {key: _copy(stats) for key, stats in self._endpoints.items()}
+
+    def render(self):
+        """All metrics in Prometheus text exposition format."""
+        from flask import current_app
+        from app import db
+
+        endpoints = sorted(self.snapshot().items())
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{name} {kind}')
+            for suffix, labels, value in samples:
+                lines.append(f'{METRIC_PREFIX}_{name}{suffix}{_labels(labels)} {_number(value)}')
+
+        def per_endpoint(attribute):
+            return [('', {'method': m, 'endpoint': e}, getattr(s, attribute)) for (m, e), s in endpoints]
+
+        histogram = []
+        for (method, endpoint), stats in endpoints:
+            labels = {'method': method, 'endpoint': endpoint}
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                cumulative += count
+                histogram.append(('_bucket', {**labels, 'le': _number(bound)}, cumulative))
+            histogram.append(('_bucket', {**labels, 'le': '+Inf'}, stats.requests))
+            histogram.append(('_sum', labels, stats.wall_time))
+            histogram.append(('_count', labels, stats.requests))
+
+        family('request_duration_seconds', 'histogram', 'Request wall time.', histogram)
+        family('request_errors_total', 'counter', 'Requests answered with a 5xx status.', per_endpoint('errors'))
+        family('request_db_seconds_total', 'counter', 'Time spent executing SQL statements.', per_endpoint('db_time'))
+        family('request_queries_total', 'counter', 'SQL statements executed.', per_endpoint('queries'))
+        family('request_rows_total', 'counter', 'Rows fetched from the database.', per_endpoint('rows'))
+        family('request_n_plus_one_total', 'counter',
+               f'Requests that ran one statement {self.n_plus_one_threshold}+ times.', per_endpoint('n_plus_one'))
+        family('request_slow_total', 'counter',
+               f'Requests slower than {self.slow_request_ms} ms.', per_endpoint('slow'))
+
+        writer = current_app.extensions.get('activity_writer')
+        if writer is not None:
+            stats = writer.stats()
+            family('activity_log_queued', 'gauge', 'Activity entries waiting to be written.',
+                   [('', {}, stats['queued'])])
+            for key in ('written', 'dropped', 'failed'):
+                family(f'activity_log_{key}_total', 'counter', f'Activity entries {key}.',
+                       [('', {}, stats[key])])
+
+        pool = db.engine.pool
+        if hasattr(pool, 'checkedout'):
+            family('db_pool_checked_out', 'gauge', 'Database connections in use.',
+                   [('', {}, pool.checkedout())])
+            family('db_pool_size', 'gauge', 'Configured connection pool size.', [('', {}, pool.size())])
+
+        family('process_start_time_seconds', 'gauge', 'Start time of this worker (Unix time).',
+               [('', {}, self.started)])
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(stats):
+    copy = EndpointStats()
+    for attribute in EndpointStats.__slots__:
+        value = getattr(stats, attribute)
+        setattr(copy, attribute, list(value) if isinstance(value, list) else value)
+    return copy
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def _shorten(sql, limit=300):
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= limit else sql[:limit] + '...'
+
+
+def not_profiled(view):
+    """Mark a view the request hooks leave alone (the metrics endpoint itself)."""
+    view.not_profiled = True
+    return view
+
+
+def init_instrumentation(app, engine):
+    """Hook request and cursor events of `app` and its `engine`."""
+    instrumentation = Instrumentation(app)
+    app.extensions['instrumentation'] = instrumentation
+
+    @app.before_request
+    def start_request_profile():
+        view = current_app.view_functions.get(request.endpoint)
+        if request.path.startswith('/api') and not getattr(view, 'not_profiled', False):
+            g.request_profile = RequestProfile()
+
+    @app.after_request
+    def finish_request_profile(response):
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            instrumentation.finish(profile, request.endpoint or 'unmatched', request.method,
+                                   response.status_code)
+        return response
+
+    instrumentation.watch(engine)
+    return instrumentation
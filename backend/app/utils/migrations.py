@@ -0,0 +1,326 @@
+"""
+Versioned schema migrations.
+
+Each change db.create_all() cannot make to an existing database (new columns,
+indexes, backfills) is a numbered function registered with @migration. The
+schema_version table records which versions a database has. upgrade()
+creates any missing tables from the models, then applies the pending
+migrations in order and records each version as it completes. It runs once
+per deploy (prestart.py, or `python migrate.py upgrade`), so workers only
+read the current version at boot instead of introspecting the schema.
+
+Migrations must be safe to re-run: an interrupted one is simply run again,
+and a database created by create_all() already has the columns most of them
+add. The MigrationContext helpers check before changing anything and commit
+after each step.
+
+Large tables are changed without holding long locks:
+
+* create_index() uses CREATE INDEX CONCURRENTLY on PostgreSQL, so reads and
+  writes continue during the build. An invalid index left by an interrupted
+  build is dropped and rebuilt. SQLite has no online index build; in WAL
+  mode readers carry on while it runs.
+* backfill() updates rows in id ranges of MIGRATION_BATCH_SIZE and commits
+  after each range, instead of one UPDATE over the whole table.
+
+On PostgreSQL an advisory lock serializes concurrent upgrade() calls. On
+SQLite a second caller re-runs the (idempotent) migrations and skips
+recording versions that are already present.
+
+To change the schema, add a model column (new databases get it from
+create_all) and a migration with the next version number that adds it to
+existing ones.
+"""
+
+import time
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app import db
+from app.models.schema_version import SchemaVersion
+from app.utils.database import index_names, table_columns
+
+DEFAULT_BATCH_SIZE = 5000
+
+# pg_advisory_lock key held while upgrade() runs
+ADVISORY_LOCK_KEY = 7_041_001
+
+MIGRATIONS = []
+
+
+class Migration:
+    def __init__(self, version, description, upgrade):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+
+    def __repr__(self):
+        return f'<Migration {self.version}: {self.description}>'
+
+
+def migration(version, description):
+    """Register the decorated function as schema migration `version`."""
+    def register(upgrade_fn):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f'Migration {version} must be numbered after {MIGRATIONS[-1].version}')
+        MIGRATIONS.append(Migration(version, description, upgrade_fn))
+        return upgrade_fn
+    return register
+
+
+class MigrationContext:
+    """A connection plus the idempotent helpers each migration works through."""
+
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE, log=print):
+        self.conn = conn
+        self.dialect = conn.dialect.name
+        self.batch_size = batch_size
+        self.log = log
+
+    def execute(self, sql, params=None):
+        return self.conn.execute(text(sql), params or {})
+
+    def commit(self):
+        self.conn.commit()
+
+    def columns(self, table):
+        """Column names of `table`, or None if it does not exist."""
+        return table_columns(self.conn, table)
+
+    def add_column(self, table, column, ddl):
+        """Add a column unless present. Returns True if it was added."""
+        columns = self.columns(table)
+        if columns is None or column in columns:
+            return False
+        self.execute(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}')
+        self.commit()
+        self.log(f'  added {table}.{column}')
+        return True
+
+    def create_index(self, name, table, columns, using=None):
+        """Create an index if missing, without blocking writes on PostgreSQL.
+
+        `columns` is a sequence of column names or a raw SQL expression list.
+        Returns True if the index was built.
+        """
+        if self.columns(table) is None:
+            return False
+        if not isinstance(columns, str):
+            columns = ', '.join(columns)
+        method = f' USING {using}' if using else ''
+
+        if self.dialect != 'postgresql':
+            if name in index_names(self.conn, {table}):
+                return False
+            self.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table}{method} ({columns})')
+            self.commit()
+            self.log(f'  created index {name}')
+            return True
+
+        valid = self.execute(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND pg_table_is_visible(c.oid)", {'name': name}
+        ).scalar()
+        # CONCURRENTLY waits out open transactions, including this connection's
+        self.commit()
+        if valid:
+            return False
+        with self.conn.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as online:
+            if valid is False:
+                # Left behind by an interrupted concurrent build
+                online.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {name}'))
+            online.execute(text(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table}{method} ({columns})'))
+        self.log(f'  created index {name} (concurrently)')
+        return True
+
+    def backfill(self, table, assignments, where=None, params=None, batch_size=None):
+        """UPDATE `table` SET `assignments` [WHERE `where`] one id range at a time.
+
+        Each range of `batch_size` ids is its own short transaction, so writers
+        are never blocked for longer than one batch. Returns the rows updated.
+        """
+        batch_size = batch_size or self.batch_size
+        params = dict(params or {})
+        condition = f' AND ({where})' if where else ''
+        low, high = self.execute(
+            f'SELECT MIN(id), MAX(id) FROM {table} WHERE 1 = 1{condition}', params
+        ).one()
+        self.commit()
+
+        updated = 0
+        while low is not None and low <= high:
+            result = self.execute(
+                f'UPDATE {table} SET {assignments} '
+                f'WHERE id >= :batch_low AND id < :batch_high{condition}',
+                {**params, 'batch_low': low, 'batch_high': low + batch_size},
+            )
+            updated += result.rowcount
+            self.commit()
+            low += batch_size
+        if updated:
+            self.log(f'  backfilled {updated} {table} row(s)')
+        return updated
+
+
+# ── runner ─────────────────────────────────────────────────────────────────────
+
+def applied_versions(conn):
+    """{version: applied_at} for this database (empty if never migrated)."""
+    table = SchemaVersion.__table__
+    try:
+        return dict(conn.execute(select(table.c.version, table.c.applied_at)).all())
+    except SQLAlchemyError:
+        # No schema_version table yet
+        conn.rollback()
+        return {}
+
+
+def current_version(engine):
+    """Highest applied migration version (0 if none)."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+    except SQLAlchemyError:
+        return 0
+
+
+def status(app):
+    """[(migration, applied_at or None)] for every known migration."""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            applied = applied_versions(conn)
+    return [(m, applied.get(m.version)) for m in MIGRATIONS]
+
+
+def upgrade(app, target=None, batch_size=None, log=print):
+    """Create missing tables and apply pending migrations up to `target`.
+
+    Returns the list of versions applied.
+    """
+    batch_size = batch_size or app.config.get('MIGRATION_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    applied = []
+    with app.app_context():
+        db.create_all()
+        with db.engine.connect() as conn:
+            locked = conn.dialect.name == 'postgresql'
+            if locked:
+                conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+                conn.commit()
+            try:
+                done = applied_versions(conn)
+                conn.commit()
+                context = MigrationContext(conn, batch_size, log)
+                for step in MIGRATIONS:
+                    if step.version in done or (target is not None and step.version > target):
+                        continue
+                    started = time.perf_counter()
+                    log(f'Applying migration {step.version}: {step.description}')
+                    step.upgrade(context)
+                    conn.commit()
+                    try:
+                        conn.execute(insert(SchemaVersion.__table__).values(
+                            version=step.version, description=step.description,
+                            applied_at=datetime.utcnow()))
+                        conn.commit()
+                    except IntegrityError:
+                        # Recorded meanwhile by another process
+                        conn.rollback()
+                    applied.append(step.version)
+                    log(f'✓ Migration {step.version} applied in {time.perf_counter() - started:.1f}s')
+            finally:
+                if locked:
+                    conn.rollback()
+                    conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': ADVISORY_LOCK_KEY})
+                    conn.commit()
+    return applied
+
+
+# ── migrations ─────────────────────────────────────────────────────────────────
+
+# Columns added to existing tables over time, in the order the standalone
+# migrate_add_*.py scripts this module replaces and the old startup checks
+# introduced them.
+# (table, column, column DDL)
+LEGACY_COLUMNS = [
+    ('categories', 'parent_id', 'INTEGER REFERENCES categories(id)'),
+    ('categories', 'is_default', 'BOOLEAN DEFAULT FALSE'),
+    ('users', 'calendar_preference', "VARCHAR(20) NOT NULL DEFAULT 'both'"),
+    ('users', 'session_timeout', 'INTEGER NOT NULL DEFAULT 15'),
+    ('transactions', 'upload_id', 'INTEGER REFERENCES uploads(id)'),
+    ('transactions', 'bank_source', 'VARCHAR(100)'),
+    ('budget_plan_items', 'group_name', 'VARCHAR(150)'),
+    ('budget_plan_items', 'consolidated_category_ids', 'TEXT'),
+]
+
+# Tables that gained an owner column for user isolation, and which of their
+# existing rows are assigned to the first user (default categories stay shared)
+USER_OWNED_TABLES = [
+    ('transactions', None),
+    ('categories', 'is_default IS NULL OR is_default = :false'),
+    ('budgets', None),
+    ('categorization_rules', None),
+    ('uploads', None),
+    ('excluded_expenses', None),
+]
+
+
+@migration(1, 'Columns from the standalone migrate_add_* scripts and user isolation')
+def _legacy_columns(ctx):
+    for table, column, ddl in LEGACY_COLUMNS:
+        added = ctx.add_column(table, column, ddl)
+        if added and (table, column) == ('categories', 'is_default'):
+            ctx.backfill('categories', 'is_default = :true', "name = 'Other'", {'true': True})
+
+    owner = ctx.execute('SELECT MIN(id) FROM users').scalar()
+    ctx.commit()
+    for table, where in USER_OWNED_TABLES:
+        if ctx.add_column(table, 'user_id', 'INTEGER REFERENCES users(id)') and owner is not None:
+            condition = 'user_id IS NULL' + (f' AND ({where})' if where else '')
+            ctx.backfill(table, 'user_id = :owner', condition, {'owner': owner, 'false': False})
+
+
+def create_managed_indexes(ctx):
+    """Build every index in MANAGED_INDEXES that does not exist yet."""
+    from app import MANAGED_INDEXES
+    for name, table, columns in MANAGED_INDEXES:
+        ctx.create_index(name, table, columns)
+
+
+@migration(2, 'Secondary indexes for the hot access paths')
+def _managed_indexes(ctx):
+    create_managed_indexes(ctx)
+
+
+@migration(3, 'Transaction full-text search index')
+def _search_index(ctx):
+    from app.utils.search import PG_DOCUMENT, PG_SEARCH_INDEX, ensure_search_index
+    if ctx.dialect == 'postgresql':
+        ctx.create_index(PG_SEARCH_INDEX, 'transactions', f'({PG_DOCUMENT})', using='GIN')
+    elif ensure_search_index(ctx.conn):
+        ctx.commit()
+        ctx.log('  created transaction search index')
+
+
+@migration(4, 'Backfill per-day activity counters')
+def _activity_counters(ctx):
+    from app.utils.activity_counters import ensure_counters
+    if ensure_counters(ctx.conn):
+        ctx.commit()
+        ctx.log('  built activity_daily_counts from activity_logs')
+
+
+@migration(5, 'Shared bank templates')
+def _shared_bank_templates(ctx):
+    ctx.add_column('bank_templates', 'is_shared', 'BOOLEAN NOT NULL DEFAULT FALSE')
+
+
+@migration(6, 'Shard keys for users')
+def _user_shard_keys(ctx):
+    ctx.add_column('users', 'shard_key', 'VARCHAR(32)')
+    # Existing users keep the user_<id>.db shard they may already have
+    ctx.backfill('users', 'shard_key = CAST(id AS VARCHAR(32))', 'shard_key IS NULL')
+
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
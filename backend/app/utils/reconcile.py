@@ -0,0 +1,109 @@
+"""
+Reconcile bank-statement rows against a user's stored transactions.
+
+Used by delete-by-file when the uploaded statement has no transaction ids.
+All candidate transactions inside the statement's amount (and, when the
+statement has dates, date) window are loaded with a single query and indexed
+in a dict keyed by the amount in cents; each statement row is then matched in
+memory:
+
+  - candidates must have the same amount;
+  - when the row has a payee, every payee word must be a prefix of a word in
+    the candidate's description (case-insensitive, store numbers ignored);
+  - when the row has a date, a candidate on that date beats one that is not.
+
+A row whose best candidates are all alike (same description and date) is
+matched to the lowest id; if they differ the row is ambiguous. Each
+transaction is matched at most once, so duplicate statement lines consume
+duplicate transactions.
+"""
+
+import re
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from app import db
+from app.models.transaction import Transaction
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Statement and posting dates can differ by a few days at the window edges
+DATE_SLACK = timedelta(days=3)
+
+
+def normalize_tokens(text):
+    """Lower-cased words of `text`, without purely numeric ones (card/store numbers)."""
+    words = [w.lower() for w in _WORD_RE.findall(text or '')]
+    return [w for w in words if not w.isdigit()] or words
+
+
+def amount_key(amount):
+    """Hash key for an amount: absolute value in whole cents."""
+    return int(round(abs(amount) * 100))
+
+
+def _payee_matches(payee_tokens, description_tokens):
+    return all(any(d.startswith(p) for d in description_tokens) for p in payee_tokens)
+
+
+def reconcile(user_id, rows):
+    """Match statement rows against the user's transactions.
+
+    `rows` is a list of dicts with 'amount' and optional 'payee' and 'date'.
+    Returns a dict with:
+      matched     [{'row': i, 'transaction_id': id}]
+      ambiguous   [{'row': i, 'candidate_ids': [...]}]
+      unmatched   [i, ...]
+    where i is the row's position in `rows`.
+    """
+    result = {'matched': [], 'ambiguous': [], 'unmatched': []}
+    priced = [r for r in rows if r.get('amount')]
+    if not priced:
+        result['unmatched'] = list(range(len(rows)))
+        return result
+
+    amounts = [abs(r['amount']) for r in priced]
+    criteria = [
+        Transaction.user_id == user_id,
+        # Half a cent of slack either side absorbs float representation
+        Transaction.amount.between(min(amounts) - 0.005, max(amounts) + 0.005),
+    ]
+    dates = [r.get('date') for r in priced]
+    if all(dates):
+        criteria.append(Transaction.date.between(min(dates) - DATE_SLACK, max(dates) + DATE_SLACK))
+
+    index = {}
+    for tid, description, amount, tdate in db.session.execute(
+        select(Transaction.id, Transaction.description, Transaction.amount, Transaction.date)
+        .where(*criteria)
+        .order_by(Transaction.id)
+    ):
+        index.setdefault(amount_key(amount), []).append(
+            (tid, normalize_tokens(description), tdate, description)
+        )
+
+    used = set()
+    for position, row in enumerate(rows):
+        if not row.get('amount'):
+            result['unmatched'].append(position)
+            continue
+        candidates = [c for c in index.get(amount_key(row['amount']), []) if c[0] not in used]
+
+        payee_tokens = normalize_tokens(row.get('payee'))
+        if payee_tokens:
+            candidates = [c for c in candidates if _payee_matches(payee_tokens, c[1])]
+
+        if row.get('date'):
+            same_day = [c for c in candidates if c[2] == row['date']]
+            candidates = same_day or candidates
+
+        if not candidates:
+            result['unmatched'].append(position)
+        elif len({(c[3], c[2]) for c in candidates}) == 1:
+            used.add(candidates[0][0])
+            result['matched'].append({'row': position, 'transaction_id': candidates[0][0]})
+        else:
+            result['ambiguous'].append({'row': position, 'candidate_ids': [c[0] for c in candidates]})
+
+    return result
@@ -0,0 +1,166 @@
+"""
+Per-period rollups of transaction amounts in the Gregorian or Badí' calendar.
+
+Amounts are summed per (day, type) in a single GROUP BY query over the
+user's date range. The daily rows are then mapped to their calendar period
+with NumPy: gregorian_to_badi_array for Badí' months. Each row gets a period
+code, which is located in the ordered list of periods with searchsorted, and
+the amounts are accumulated with np.add.at. A multi-month Badí' trend
+therefore costs the same one query as a Gregorian one.
+
+Ayyám-i-Há is a period of its own (month 0), placed between Mulk (18) and
+'Alá' (19).
+"""
+
+import calendar
+from datetime import date
+
+from sqlalchemy import func
+
+from app import db
+from app.models.transaction import Transaction
+from app.utils.badi_calendar import (
+    get_badi_month_date_range,
+    get_badi_month_name,
+    get_badi_year_date_range,
+    gregorian_to_badi,
+    gregorian_to_badi_array,
+)
+
+# Badí' months in calendar order
+BADI_MONTH_ORDER = list(range(1, 19)) + [0, 19]
+_BADI_POSITION = {month: i for i, month in enumerate(BADI_MONTH_ORDER)}
+
+
+def _code(year, month, calendar_type):
+    """Sortable integer for a period; month is None for whole years."""
+    if month is None:
+        return year
+    if calendar_type == 'badi':
+        return year * 32 + _BADI_POSITION[month]
+    return year * 32 + month
+
+
+def period_of(day, calendar_type='gregorian', granularity='month'):
+    """(year, month) of the period containing `day` (month is None for years)."""
+    if calendar_type == 'badi':
+        year, month, _ = gregorian_to_badi(day)
+    else:
+        year, month = day.year, day.month
+    return (year, None) if granularity == 'year' else (year, month)
+
+
+def shift_period(period, steps, calendar_type='gregorian'):
+    """Move a (year, month) period forward or back by `steps` periods."""
+    year, month = period
+    if month is None:
+        return (year + steps, None)
+    if calendar_type == 'badi':
+        index = year * len(BADI_MONTH_ORDER) + _BADI_POSITION[month] + steps
+        return (index // len(BADI_MONTH_ORDER), BADI_MONTH_ORDER[index % len(BADI_MONTH_ORDER)])
+    index = year * 12 + (month - 1) + steps
+    return (index // 12, index % 12 + 1)
+
+
+def period_bounds(period, calendar_type='gregorian'):
+    """First and last Gregorian day of a period."""
+    year, month = period
+    if calendar_type == 'badi':
+        if month is None:
+            return get_badi_year_date_range(year)
+        return get_badi_month_date_range(year, month)
+    if month is None:
+        return date(year, 1, 1), date(year, 12, 31)
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def period_label(period, calendar_type='gregorian'):
+    year, month = period
+    if calendar_type == 'badi':
+        if month is None:
+            return f'{year} BE'
+        return f"{get_badi_month_name(month)['name']} {year}"
+    return str(year) if month is None else f'{year}-{month:02d}'
+
+
+def periods_between(start, end, calendar_type='gregorian', granularity='month'):
+    """Ordered list of the periods overlapping [start, end]."""
+    periods = [period_of(start, calendar_type, granularity)]
+    last = period_of(end, calendar_type, granularity)
+    while periods[-1] != last:
+        periods.append(shift_period(periods[-1], 1, calendar_type))
+    return periods
+
+
+def trailing_range(count, calendar_type='gregorian', granularity='month', today=None):
+    """Date range of the last `count` periods, ending with the current one."""
+    current = period_of(today or date.today(), calendar_type, granularity)
+    first = shift_period(current, -(max(count, 1) - 1), calendar_type)
+    return period_bounds(first, calendar_type)[0], period_bounds(current, calendar_type)[1]
+
+
+def daily_totals(user_id, start, end, include_excluded=False, transaction_type=None):
+    """(date, type, amount, count) per day and type, from one GROUP BY query."""
+    query = db.session.query(
+        Transaction.date, Transaction.type,
+        func.sum(Transaction.amount), func.count(Transaction.id)
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.date >= start,
+        Transaction.date <= end
+    )
+    if transaction_type:
+        query = query.filter(Transaction.type == transaction_type)
+    if not include_excluded:
+        query = query.filter(Transaction.is_excluded.is_(False))
+    return query.group_by(Transaction.date, Transaction.type).all()
+
+
+def rollup(user_id, start, end, calendar_type='gregorian', granularity='month',
+           include_excluded=False, transaction_type=None):
+    """Income, expense, net and transaction count for every period in [start, end]."""
+    import numpy as np
+
+    periods = periods_between(start, end, calendar_type, granularity)
+    period_codes = np.array([_code(y, m, calendar_type) for y, m in periods], dtype=np.int64)
+
+    income = np.zeros(len(periods))
+    expense = np.zeros(len(periods))
+    counts = np.zeros(len(periods), dtype=np.int64)
+
+    rows = daily_totals(user_id, start, end, include_excluded, transaction_type)
+    if rows:
+        days, types, amounts, row_counts = zip(*rows)
+        days = np.array(days, dtype='datetime64[D]')
+        if calendar_type == 'badi':
+            years, months, _ = gregorian_to_badi_array(days)
+            positions = np.array([_BADI_POSITION[m] for m in range(20)])[months]
+        else:
+            month_index = days.astype('datetime64[M]').astype(np.int64)
+            years, positions = month_index // 12 + 1970, month_index % 12 + 1
+        codes = years if granularity == 'year' else years * 32 + positions
+        index = np.searchsorted(period_codes, codes)
+
+        amounts = np.array(amounts, dtype=float)
+        types = np.array(types)
+        np.add.at(income, index, np.where(types == 'income', amounts, 0))
+        np.add.at(expense, index, np.where(types == 'expense', amounts, 0))
+        np.add.at(counts, index, np.array(row_counts, dtype=np.int64))
+
+    results = []
+    for i, period in enumerate(periods):
+        period_start, period_end = period_bounds(period, calendar_type)
+        year, month = period
+        results.append({
+            'key': str(year) if month is None else f'{year}-{month:02d}',
+            'year': year,
+            'month': month,
+            'label': period_label(period, calendar_type),
+            'start_date': period_start.isoformat(),
+            'end_date': period_end.isoformat(),
+            'income': round(float(income[i]), 2),
+            'expense': round(float(expense[i]), 2),
+            'net': round(float(income[i] - expense[i]), 2),
+            'transaction_count': int(counts[i]),
+        })
+    return results
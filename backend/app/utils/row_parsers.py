@@ -0,0 +1,350 @@
+"""
+Statement row parsers compiled from a bank template's column mapping.
+
+parse_csv_rows used to re-read the column mapping, rebuild the set of known
+columns and look every field up by name for each row of a file.
+compile_csv_parser() does that work once per header row:
+
+- the position of the date, description, amount and category columns
+  (for a file without a template, the fallback columns in the order they
+  are tried);
+- the (name, position) pairs of the columns that go into the notes;
+- the order of DATE_FORMATS, with the format of the file's first date
+  moved to the front (see _date_formats for why no result changes).
+
+Compiled parsers are cached by (mapping, header row). The mapping's content
+is the template version, so a year of statements from one bank compiles
+once. Within a file, each distinct date string and description is parsed
+or categorized once.
+
+parse_excel_frame() is the Excel counterpart. It works on whole columns of
+the DataFrame instead of walking df.iterrows(). It finds missing values
+column-wise, converts a datetime column in one step and other columns once
+per distinct value, and only builds the transaction dicts in a Python loop.
+"""
+
+import json
+from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m-%d-%Y', '%d/%m/%Y', '%Y/%m/%d')
+
+# Columns read, first non-empty one wins, when a CSV file has no template
+FALLBACK_CSV_COLUMNS = (
+    ('Date', 'date', 'Transaction Date', 'Post Date', 'Posted Date'),
+    ('Description', 'description', 'Memo', 'Payee', 'payee'),
+    ('Amount', 'amount', 'Debit'),
+)
+
+# Same for Excel files, matched against lower-cased headers
+FALLBACK_EXCEL_COLUMNS = (
+    ('posted date', 'post date', 'date', 'transaction date'),
+    ('payee', 'description', 'memo'),
+    ('amount', 'debit', 'credit'),
+)
+
+
+def parse_date(date_str, formats=DATE_FORMATS):
+    """The date of `date_str` in the first of `formats` that fits, or None."""
+    date_str = date_str.strip()
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def _date_formats(sample):
+    """DATE_FORMATS with the format `sample` is in moved to the front, or None.
+
+    Trying that format first changes no result: no format before it accepts a
+    string it accepts (the separators or the position of the four-digit year
+    differ). The exception is '%m/%d/%Y' before '%d/%m/%Y', so a day-first
+    sample keeps the original order.
+    """
+    sample = sample.strip()
+    for position, fmt in enumerate(DATE_FORMATS):
+        try:
+            datetime.strptime(sample, fmt)
+        except ValueError:
+            continue
+        if fmt == '%d/%m/%Y':
+            return DATE_FORMATS
+        return (fmt,) + DATE_FORMATS[:position] + DATE_FORMATS[position + 1:]
+    return None
+
+
+def _memoized(func):
+    cache = {}
+
+    def call(key):
+        try:
+            return cache[key]
+        except KeyError:
+            value = cache[key] = func(key)
+            return value
+    return call
+
+
+def _empty(row):
+    return ''
+
+
+def _field(positions, names):
+    """row -> the value of the first of `names` that is non-empty, else ''."""
+    indices = [positions[name] for name in names if name in positions]
+    if not indices:
+        return _empty
+    if len(indices) == 1:
+        return itemgetter(indices[0])
+
+    def first(row):
+        for index in indices:
+            if row[index]:
+                return row[index]
+        return ''
+    return first
+
+
+class CsvRowParser:
+    """One CSV layout (template mapping + header row), resolved once.
+
+    parse() gives the same transactions as reading the rows through
+    csv.DictReader and looking the mapped columns up by name.
+    """
+
+    def __init__(self, column_mapping, header):
+        self.width = len(header)
+        # As DictReader builds its dicts: a repeated name keeps its first
+        # place and its last value
+        positions = {}
+        for index, name in enumerate(header):
+            positions[name] = index
+
+        if column_mapping:
+            names = (column_mapping['date_col'], column_mapping['description_col'],
+                     column_mapping['amount_col'])
+            category_col = column_mapping.get('category_col')
+            known = set(names) | ({category_col} if category_col else set())
+            self.date, self.description, self.amount = (_field(positions, (name,)) for name in names)
+            self.category = _field(positions, (category_col,)) if category_col else _empty
+            self.notes = tuple((name, index) for name, index in positions.items() if name not in known)
+        else:
+            self.date, self.description, self.amount = (_field(positions, names)
+                                                        for names in FALLBACK_CSV_COLUMNS)
+            # Without a template the category column is not trusted
+            self.category = _empty
+            self.notes = None
+        # Set from the first date that parses, then kept with the cached parser
+        self.formats = None
+
+    def _parse_date(self, date_str):
+        formats = self.formats
+        if formats is None:
+            formats = _date_formats(date_str)
+            if formats is None:
+                return None
+            self.formats = formats
+        return parse_date(date_str, formats)
+
+    def _ragged(self, row):
+        """A row with more or fewer fields than the header, and its notes.
+
+        DictReader reads missing fields as None and keeps surplus ones as a
+        list under the key None.
+        """
+        surplus = row[self.width:]
+        row = row[:self.width] + [None] * (self.width - len(row))
+        if self.notes is None:
+            return row, ''
+        notes = [f'{name}: {row[index]}' for name, index in self.notes if str(row[index]).strip()]
+        if surplus:
+            notes.append(f'None: {surplus}')
+        return row, ' | '.join(notes)
+
+    def parse(self, rows, categorizer, limit=None):
+        """Transactions from csv.reader rows that follow the header."""
+        get_date, get_description, get_amount, get_category = (
+            self.date, self.description, self.amount, self.category)
+        notes_columns = self.notes or ()
+        width = self.width
+        dates = _memoized(self._parse_date)
+        categorize = _memoized(categorizer.categorize)
+        template_category = _memoized(categorizer.template_category)
+
+        transactions = []
+        count = 0
+        for row in rows:
+            if not row:
+                continue                        # DictReader skips blank lines
+            if limit and count >= limit:
+                break
+            count += 1
+            if len(row) == width:
+                notes = None
+            else:
+                row, notes = self._ragged(row)
+
+            date_str, desc, amount_str = get_date(row), get_description(row), get_amount(row)
+            if not (date_str and desc and amount_str):
+                continue
+            transaction_date = dates(date_str)
+            if transaction_date is None:
+                continue
+            try:
+                amount = float(amount_str.replace('$', '').replace(',', ''))
+            except ValueError:
+                continue
+
+            cat_str = get_category(row)
+            category_id = template_category(cat_str) if cat_str else None
+            if not category_id:
+                category_id = categorize(desc)
+            if notes is None:
+                notes = ' | '.join([f'{name}: {row[index]}' for name, index in notes_columns
+                                    if row[index].strip()])
+
+            transactions.append({
+                'date': transaction_date,
+                'description': desc.strip(),
+                'amount': abs(amount),
+                'type': 'expense' if amount < 0 else 'income',
+                'category_id': category_id,
+                'notes': notes,
+            })
+
+        return transactions
+
+
+@lru_cache(maxsize=256)
+def _compile_csv(mapping_key, header):
+    return CsvRowParser(json.loads(mapping_key), header)
+
+
+def compile_csv_parser(column_mapping, header):
+    """The CsvRowParser for a template mapping (or None) and a header row."""
+    return _compile_csv(json.dumps(column_mapping or None, sort_keys=True), tuple(header))
+
+
+def _excel_date(value):
+    """process_excel_file's date rule: two formats for text, pandas for the rest."""
+    import pandas as pd
+
+    if isinstance(value, str):
+        for fmt in ('%Y-%m-%d', '%m/%d/%Y'):
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                pass
+        return None
+    try:
+        return pd.to_datetime(value).date()
+    except Exception:
+        return None
+
+
+def _excel_amount(value):
+    try:
+        if isinstance(value, str):
+            return float(value.replace('$', '').replace(',', ''))
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _by_value(column, convert):
+    """convert() of each value of `column`, computed once per distinct value; NaN where it gives None."""
+    import pandas as pd
+
+    lookup = {}
+    for value in pd.unique(column.dropna()):
+        result = convert(value)
+        if result is not None:
+            lookup[value] = result
+    return column.map(lookup)
+
+
+def parse_excel_frame(df, categorizer, column_mapping=None, limit=None):
+    """Transactions from a DataFrame read from an Excel file (see process_excel_file).
+
+    Gives the same transactions as walking df.iterrows(): rows missing the
+    date, description or amount are skipped, as are rows with a date or
+    amount that does not convert or a zero amount.
+    """
+    import pandas as pd
+    from pandas.api.types import (is_datetime64_any_dtype, is_numeric_dtype, is_object_dtype,
+                                  is_string_dtype)
+
+    if limit:
+        df = df.iloc[:limit]
+    if df.empty:
+        return []
+    if not any(is_object_dtype(dtype) or is_string_dtype(dtype) for dtype in df.dtypes):
+        # iterrows() hands out the values in the frame's common dtype
+        df = pd.DataFrame(df.to_numpy(), index=df.index, columns=df.columns)
+
+    columns = list(df.columns)
+    if column_mapping:
+        names = (column_mapping['date_col'], column_mapping['description_col'], column_mapping['amount_col'])
+        category_name = column_mapping.get('category_col')
+        known = set(names) | ({category_name} if category_name else set())
+        if any(name not in columns for name in names):
+            return []                           # a mapped column the file lacks reads None
+        if category_name not in columns:
+            category_name = None
+        notes_positions = [position for position, name in enumerate(columns) if name not in known]
+    else:
+        lowered = {col.lower(): col for col in columns}
+        names = tuple(next((lowered[name] for name in candidates if name in lowered), None)
+                      for candidates in FALLBACK_EXCEL_COLUMNS)
+        if None in names:
+            return []
+        category_name = None
+        notes_positions = []
+
+    date_col, desc_col, amount_col = (df[name] for name in names)
+    if is_datetime64_any_dtype(date_col.dtype):
+        dates = date_col.dt.date
+    else:
+        dates = _by_value(date_col, _excel_date)
+    if is_numeric_dtype(amount_col.dtype):
+        amounts = amount_col.astype(float)
+    else:
+        amounts = _by_value(amount_col, _excel_amount).astype(float)
+    keep = (desc_col.notna() & dates.notna() & amounts.notna() & (amounts != 0)).to_numpy()
+
+    descriptions = [str(value) for value in desc_col[keep].tolist()]
+    notes_parts = []
+    for position in notes_positions:
+        column = df.iloc[keep, position]
+        name = columns[position]
+        notes_parts.append([f'{name}: {text}' if present and text.strip() else None
+                            for text, present in zip(map(str, column.tolist()), column.notna().tolist())])
+    notes = [' | '.join([part for part in parts if part]) for parts in zip(*notes_parts)] \
+        if notes_parts else [''] * len(descriptions)
+    if category_name is not None:
+        column = df[category_name][keep]
+        category_names = [str(value) if present else '' for value, present in
+                          zip(column.tolist(), column.notna().tolist())]
+    else:
+        category_names = [''] * len(descriptions)
+
+    categorize = _memoized(categorizer.categorize)
+    template_category = _memoized(categorizer.template_category)
+    transactions = []
+    for transaction_date, desc, amount, cat_str, note in zip(
+            dates[keep].tolist(), descriptions, amounts[keep].tolist(), category_names, notes):
+        category_id = template_category(cat_str) if cat_str.strip() else None
+        if not category_id:
+            category_id = categorize(desc)
+        transactions.append({
+            'date': transaction_date,
+            'description': desc.strip(),
+            'amount': abs(amount),
+            'type': 'expense' if amount < 0 else 'income',
+            'category_id': category_id,
+            'notes': note,
+        })
+    return transactions
@@ -0,0 +1,176 @@
+"""
+Full-text search over transactions.
+
+Searches description, notes and bank_source. On SQLite the text lives in an
+FTS5 table (transactions_fts) that uses `transactions` as its external
+content and is kept in sync by triggers, so inserts, updates and bulk deletes
+made through any code path are reflected without application code touching
+the index. On PostgreSQL the same columns are covered by a GIN index on a
+tsvector expression. Other backends (or SQLite builds without FTS5) fall back
+to substring matching.
+
+Queries are reduced to word tokens, each matched as a prefix and combined
+with AND, so user input can never inject FTS syntax.
+"""
+
+import re
+
+from sqlalchemy import text
+
+FTS_TABLE = 'transactions_fts'
+SEARCH_COLUMNS = ('description', 'notes', 'bank_source')
+# bm25 column weights: a hit in the description outranks one in the notes
+FTS_WEIGHTS = (10.0, 2.0, 1.0)
+
+PG_SEARCH_INDEX = 'ix_transactions_search'
+PG_DOCUMENT = ("to_tsvector('simple', coalesce(description, '') || ' ' || "
+               "coalesce(notes, '') || ' ' || coalesce(bank_source, ''))")
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_SQLITE_TRIGGERS = {
+    'transactions_fts_ai': f"""
+        CREATE TRIGGER transactions_fts_ai AFTER INSERT ON transactions BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, description, notes, bank_source)
+            VALUES (new.id, new.description, new.notes, new.bank_source);
+        END""",
+    'transactions_fts_ad': f"""
+        CREATE TRIGGER transactions_fts_ad AFTER DELETE ON transactions BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, notes, bank_source)
+            VALUES ('delete', old.id, old.description, old.notes, old.bank_source);
+        END""",
+    'transactions_fts_au': f"""
+        CREATE TRIGGER transactions_fts_au
+        AFTER UPDATE OF description, notes, bank_source ON transactions BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, notes, bank_source)
+            VALUES ('delete', old.id, old.description, old.notes, old.bank_source);
+            INSERT INTO {FTS_TABLE}(rowid, description, notes, bank_source)
+            VALUES (new.id, new.description, new.notes, new.bank_source);
+        END""",
+}
+
+
+def tokenize(query):
+    """Split free text into lower-cased search tokens."""
+    return [token.lower() for token in _TOKEN_RE.findall(query or '')]
+
+
+def _sqlite_has_fts5(conn):
+    try:
+        return bool(conn.execute(text(
+            "SELECT sqlite_compileoption_used('ENABLE_FTS5')"
+        )).scalar())
+    except Exception:
+        return False
+
+
+def search_backend(conn):
+    """Return 'fts5', 'postgresql' or 'like' for the connection's database."""
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        return 'postgresql'
+    if dialect == 'sqlite' and conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+    ), {'name': FTS_TABLE}).first():
+        return 'fts5'
+    return 'like'
+
+
+def ensure_search_index(conn):
+    """Create the search index (and its sync triggers) if missing.
+
+    Returns True when something was created. Called from schema migration 3
+    (which builds the PostgreSQL index concurrently itself); an existing
+    database is indexed in full on first run.
+    """
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        exists = conn.execute(text(
+            "SELECT 1 FROM pg_indexes WHERE indexname = :name"
+        ), {'name': PG_SEARCH_INDEX}).first()
+        if exists:
+            return False
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {PG_SEARCH_INDEX} ON transactions USING GIN (({PG_DOCUMENT}))"
+        ))
+        return True
+
+    if dialect != 'sqlite' or not _sqlite_has_fts5(conn):
+        return False
+
+    existing = {row[0] for row in conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE 'transactions_fts%'"
+    ))}
+    created = False
+    if FTS_TABLE not in existing:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"{', '.join(SEARCH_COLUMNS)}, content='transactions', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        ))
+        # Index rows that existed before the FTS table did
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        created = True
+    for name, ddl in _SQLITE_TRIGGERS.items():
+        if name not in existing:
+            conn.execute(text(ddl))
+            created = True
+    return created
+
+
+def drop_search_index(conn):
+    """Drop the search index and its triggers, e.g. before a bulk load.
+
+    ensure_search_index() rebuilds it afterwards in one pass, which is far
+    cheaper than maintaining it row by row while millions of rows go in.
+    """
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(f"DROP INDEX IF EXISTS {PG_SEARCH_INDEX}"))
+    elif conn.dialect.name == 'sqlite':
+        for name in _SQLITE_TRIGGERS:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+def search_transaction_ids(conn, user_id, query, limit=None, offset=0):
+    """Return (ids ordered by relevance, total matches) for a user's search.
+
+    Rank is bm25 on SQLite and ts_rank on PostgreSQL; ties and the substring
+    fallback are ordered newest first.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return [], 0
+
+    backend = search_backend(conn)
+    params = {'user_id': user_id}
+    if backend == 'fts5':
+        params['match'] = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+        source = (f"FROM {FTS_TABLE} JOIN transactions t ON t.id = {FTS_TABLE}.rowid "
+                  f"WHERE {FTS_TABLE} MATCH :match AND t.user_id = :user_id")
+        order = f"bm25({FTS_TABLE}, {weights}), t.date DESC, t.id DESC"
+    elif backend == 'postgresql':
+        params['tsquery'] = ' & '.join(f'{token}:*' for token in tokens)
+        document = PG_DOCUMENT.replace('coalesce(', 'coalesce(t.')
+        source = ("FROM transactions t WHERE t.user_id = :user_id "
+                  f"AND {document} @@ to_tsquery('simple', :tsquery)")
+        order = f"ts_rank({document}, to_tsquery('simple', :tsquery)) DESC, t.date DESC, t.id DESC"
+    else:
+        clauses = []
+        for i, token in enumerate(tokens):
+            params[f'p{i}'] = f'%{token}%'
+            clauses.append(' OR '.join(
+                f"lower(coalesce(t.{col}, '')) LIKE :p{i}" for col in SEARCH_COLUMNS
+            ))
+        source = ("FROM transactions t WHERE t.user_id = :user_id AND "
+                  + ' AND '.join(f'({c})' for c in clauses))
+        order = "t.date DESC, t.id DESC"
+
+    total = conn.execute(text(f"SELECT count(*) {source}"), params).scalar()
+    sql = f"SELECT t.id {source} ORDER BY {order}"
+    if limit is not None:
+        sql += " LIMIT :limit OFFSET :offset"
+        params.update(limit=limit, offset=offset)
+    ids = [row[0] for row in conn.execute(text(sql), params)]
+    return ids, total
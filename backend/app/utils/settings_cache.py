@@ -0,0 +1,119 @@
+"""
+Per-process cache of the ApiStatus and LogSettings singletons.
+
+check_api_status runs on every API request and every log_activity helper
+consults the log settings, so both are read from this cache instead of the
+database. Log settings are kept as a LogPolicy with the enabled categories
+and actions already parsed into frozensets.
+
+Any endpoint that changes either singleton calls invalidate_settings(),
+which clears this process's copy and bumps the counter in the
+settings_version table. Other workers compare that counter at most every
+SETTINGS_CACHE_CHECK_SECONDS (default 5) and reload when it has moved.
+"""
+
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.api_status import ApiStatus
+from app.models.log_settings import LogSettings
+from app.models.settings_version import SettingsVersion
+
+_lock = threading.Lock()
+
+
+class LogPolicy:
+    """Read-only view of LogSettings used to decide whether to log an entry."""
+
+    __slots__ = ('logging_enabled', 'categories', 'actions')
+
+    def __init__(self, settings=None):
+        if settings is None:
+            # No row yet: the column defaults apply
+            settings = LogSettings(
+                logging_enabled=True,
+                enabled_categories=LogSettings.enabled_categories.default.arg,
+                enabled_actions=LogSettings.enabled_actions.default.arg,
+            )
+        self.logging_enabled = bool(settings.logging_enabled)
+        self.categories = frozenset(settings.get_enabled_categories())
+        self.actions = frozenset(settings.get_enabled_actions())
+
+    def should_log(self, action, category):
+        """Check if this action/category combination should be logged"""
+        return self.logging_enabled and action in self.actions and category in self.categories
+
+
+def _state():
+    # Kept per app so separate app instances (e.g. in tests) never share entries
+    return current_app.extensions.setdefault('settings_cache', {'version': None, 'checked_at': 0.0})
+
+
+def _read_version():
+    return db.session.execute(
+        select(SettingsVersion.version).where(SettingsVersion.id == 1)
+    ).scalar() or 0
+
+
+def _current_state():
+    """Return the cache dict, dropping its contents if another worker changed settings."""
+    state = _state()
+    now = time.monotonic()
+    interval = current_app.config.get('SETTINGS_CACHE_CHECK_SECONDS', 5)
+    if now - state['checked_at'] >= interval:
+        version = _read_version()
+        with _lock:
+            if version != state['version']:
+                state.pop('api_enabled', None)
+                state.pop('log_policy', None)
+                state['version'] = version
+            state['checked_at'] = now
+    return state
+
+
+def api_enabled():
+    """Return whether the API is switched on (ApiStatus.is_enabled)."""
+    state = _current_state()
+    if 'api_enabled' not in state:
+        status = ApiStatus.query.first()
+        state['api_enabled'] = status.is_enabled if status else True
+    return state['api_enabled']
+
+
+def get_log_policy():
+    """Return the cached LogPolicy."""
+    state = _current_state()
+    if 'log_policy' not in state:
+        state['log_policy'] = LogPolicy(LogSettings.query.first())
+    return state['log_policy']
+
+
+def invalidate_settings():
+    """Drop cached settings here and signal other workers to reload theirs.
+
+    Call after committing a change to ApiStatus or LogSettings.
+    """
+    bump = (update(SettingsVersion).where(SettingsVersion.id == 1)
+            .values(version=SettingsVersion.version + 1))
+    if not db.session.execute(bump).rowcount:
+        # First change ever: create the counter row
+        try:
+            db.session.add(SettingsVersion(id=1, version=1))
+            db.session.commit()
+        except IntegrityError:
+            # Another worker created it first
+            db.session.rollback()
+            db.session.execute(bump)
+    db.session.commit()
+
+    state = _state()
+    with _lock:
+        state.pop('api_enabled', None)
+        state.pop('log_policy', None)
+        # Force the next read to pick up the new version number
+        state['checked_at'] = 0.0
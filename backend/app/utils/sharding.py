@@ -0,0 +1,386 @@
+"""
+Optional per-user SQLite shards (DB_SHARDING=user).
+
+With one SQLite file, a large upload holds the only write lock and every
+other user's writes queue behind it. In shard mode each user's own data
+lives in SHARD_DIR/user_<shard_key>.db:
+
+    transactions, excluded_expenses, budgets, budget_plans,
+    budget_plan_items, uploads
+
+Everything else (users, categories, categorization rules, bank templates,
+settings, activity logs) stays in the central database. Writes from different users
+then take different locks and run in parallel.
+
+Categories, rules and bank templates stay central even when they are
+personal. Transactions reference categories by id, and category names are
+unique across all users. Rule and template lookups read a user's own rows
+and the shared ones in one query. These tables are small and rarely written.
+
+Routing happens in RoutingSession.get_bind. While a request is signed in
+(or inside user_shard()), every statement of db.session goes to the user's
+shard engine. Each shard connection ATTACHes the central file, and SQLite
+resolves an unqualified table name in the main database first, then in the
+attached one. The existing queries therefore work unchanged, including
+joins between transactions and categories. Requests that are not signed in,
+and code using db.engine directly (activity writer, migrations, backups),
+talk to the central database only.
+
+Shard files are named by users.shard_key, a random key given to each new
+user, not by the id. SQLite reuses the id of a deleted user with the highest
+id. A new user must not reach the old file, or an engine another worker
+still has open for it. A user's key is read from the central database once
+per app context. The shard records its owner in shard_meta, and opening a
+shard owned by another user fails. Deleting a user closes and removes their
+shard in the worker that handled the request. Other workers never ask for
+that key again, so their engine for it just ages out of the cache.
+
+A shard is created on first use, with the same indexes and search index as
+the central tables. The user's rows already in the central database are
+moved into it in the same transaction. PRAGMA user_version records the
+schema version the shard was prepared for. A shard from an older version
+gets the model's missing columns added when it is next opened. Shards are
+SQLite only, and in WAL mode a commit that touches a shard and the central
+file is atomic per file, not across both.
+
+Database backups cover the shards. A backup is a ZIP of central.db and
+shards/user_<key>.db, and restoring one replaces the central file and
+every shard.
+"""
+
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+
+SHARDED_TABLES = (
+    'uploads', 'transactions', 'excluded_expenses', 'budgets', 'budget_plans', 'budget_plan_items',
+)
+CENTRAL_SCHEMA = 'central'
+# Shard engines kept open per process; the least recently used is disposed
+MAX_OPEN_SHARDS = 64
+# Entries of a shard-mode backup archive
+BACKUP_CENTRAL = 'central.db'
+BACKUP_SHARD = re.compile(r'shards/(user_[A-Za-z0-9]+\.db)')
+_SHARD_FILE = re.compile(r'user_[A-Za-z0-9]+\.db')
+
+_user_override = ContextVar('shard_user_id', default=None)
+# _user_override value that pins db.session to the central database
+_CENTRAL = object()
+
+
+class RoutingSession(Session):
+    """db.session class that sends a signed-in user's statements to their shard."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            shards = current_app.extensions.get('shards')
+            if shards is not None:
+                user_id = current_shard_user()
+                engine = shards.engine_for(user_id) if user_id is not None else None
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def current_shard_user():
+    """User whose shard db.session uses right now, or None for the central database."""
+    user_id = _user_override.get()
+    if user_id is _CENTRAL:
+        return None
+    if user_id is None and has_request_context():
+        user_id = session.get('user_id')
+    return user_id
+
+
+@contextmanager
+def user_shard(user_id):
+    """Route db.session to `user_id`'s shard outside a request (scripts, tests)."""
+    token = _user_override.set(user_id)
+    try:
+        yield
+    finally:
+        _user_override.reset(token)
+
+
+def each_database():
+    """Route db.session to every database holding user data, one at a time.
+
+    For installation-wide operations on SHARDED_TABLES (a profile reset): the
+    loop body runs for the central database, then for each existing shard,
+    with the user id of the shard (None for the central one). Without
+    sharding it runs once, for the central database.
+    """
+    shards = current_app.extensions.get('shards')
+    token = _user_override.set(_CENTRAL)
+    try:
+        yield None
+        if shards is None:
+            return
+        with shards.central_engine.connect() as conn:
+            users = conn.execute(text('SELECT id, shard_key FROM users ORDER BY id')).all()
+        for user_id, shard_key in users:
+            if shard_key and os.path.exists(shards.path_for(shard_key)):
+                _user_override.set(user_id)
+                yield user_id
+    finally:
+        _user_override.reset(token)
+
+
+class ShardManager:
+    """Per-user shard engines of one app (app.extensions['shards'])."""
+
+    def __init__(self, app, central_engine):
+        self.app = app
+        self.directory = app.config['SHARD_DIR']
+        self.central_engine = central_engine
+        self.central_path = os.path.abspath(central_engine.url.database)
+        self._engines = OrderedDict()       # shard_key -> (user_id, engine)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, shard_key):
+        return os.path.join(self.directory, f'user_{shard_key}.db')
+
+    def shard_key(self, user_id):
+        """users.shard_key of `user_id`, or None if there is no such user."""
+        keys = g.setdefault('shard_keys', {})
+        if user_id not in keys:
+            with self.central_engine.connect() as conn:
+                keys[user_id] = conn.execute(text('SELECT shard_key FROM users WHERE id = :id'),
+                                             {'id': user_id}).scalar()
+        return keys[user_id]
+
+    def engine_for(self, user_id):
+        """Engine of `user_id`'s shard, or None if the user does not exist."""
+        shard_key = self.shard_key(user_id)
+        if shard_key is None:
+            return None
+        with self._lock:
+            entry = self._engines.get(shard_key)
+            if entry is not None:
+                owner, engine = entry
+                if owner != user_id:
+                    raise RuntimeError(f'Shard {shard_key} belongs to user {owner}, not {user_id}')
+                self._engines.move_to_end(shard_key)
+                return engine
+            engine = self._create_engine(user_id, shard_key)
+            self._engines[shard_key] = (user_id, engine)
+            while len(self._engines) > MAX_OPEN_SHARDS:
+                _, (_, evicted) = self._engines.popitem(last=False)
+                evicted.dispose()
+            return engine
+
+    def _create_engine(self, user_id, shard_key):
+        from app.utils.database import engine_options, sqlite_pragmas
+
+        url = f'sqlite:///{self.path_for(shard_key)}'
+        engine = create_engine(url, **engine_options({**self.app.config, 'SQLALCHEMY_DATABASE_URI': url}))
+        pragmas = sqlite_pragmas(self.app.config)
+        central = self.central_path
+
+        @event.listens_for(engine, 'connect')
+        def _attach_central(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(f'PRAGMA {pragma}')
+                cursor.execute(f'ATTACH DATABASE ? AS {CENTRAL_SCHEMA}', (central,))
+            finally:
+                cursor.close()
+
+        instrumentation = self.app.extensions.get('instrumentation')
+        if instrumentation is not None:
+            instrumentation.watch(engine)
+
+        try:
+            prepare_shard(engine, user_id, shard_key)
+        except Exception:
+            engine.dispose()
+            raise
+        return engine
+
+    def drop(self, shard_key):
+        """Close and delete the shard named `shard_key` (after its user is deleted)."""
+        with self._lock:
+            entry = self._engines.pop(shard_key, None)
+        if entry is not None:
+            entry[1].dispose()
+        self._remove_files(self.path_for(shard_key))
+
+    @staticmethod
+    def _remove_files(path):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    def shard_files(self):
+        """Names of the shard files in SHARD_DIR."""
+        return sorted(name for name in os.listdir(self.directory) if _SHARD_FILE.fullmatch(name))
+
+    def backup_to_file(self, dest_path):
+        """Write a ZIP of the central database and every shard to `dest_path`.
+
+        Each file is copied with the SQLite online backup API, one after the
+        other, so the archive is consistent per file but not across files.
+        """
+        from app.utils.database import backup_to_file
+
+        with tempfile.TemporaryDirectory() as scratch, \
+                zipfile.ZipFile(dest_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            copy = os.path.join(scratch, 'copy.db')
+            backup_to_file(self.central_engine, copy)
+            archive.write(copy, BACKUP_CENTRAL)
+            for name in self.shard_files():
+                os.remove(copy)
+                _copy_sqlite(os.path.join(self.directory, name), copy)
+                archive.write(copy, f'shards/{name}')
+
+    def restore_from_file(self, src_path):
+        """Replace the central database and all shards with a backup_to_file() archive.
+
+        Every file in the archive is checked before anything is replaced.
+        Shards without a copy in the archive are deleted.
+        """
+        from app.utils.database import BackupError, check_sqlite_backup, restore_from_file
+
+        if not zipfile.is_zipfile(src_path):
+            raise BackupError('With DB_SHARDING=user a backup is a ZIP archive of the central database and the shards')
+        with tempfile.TemporaryDirectory() as scratch, zipfile.ZipFile(src_path) as archive:
+            members = {}
+            for member in archive.namelist():
+                shard = BACKUP_SHARD.fullmatch(member)
+                if member != BACKUP_CENTRAL and not shard:
+                    raise BackupError(f'Unexpected file in the backup archive: {member}')
+                members[member] = os.path.join(scratch, shard.group(1) if shard else BACKUP_CENTRAL)
+                with archive.open(member) as source, open(members[member], 'wb') as target:
+                    shutil.copyfileobj(source, target)
+            if BACKUP_CENTRAL not in members:
+                raise BackupError(f'The backup archive has no {BACKUP_CENTRAL}')
+            for path in members.values():
+                check_sqlite_backup(path)
+
+            self.dispose()
+            for name in self.shard_files():
+                self._remove_files(os.path.join(self.directory, name))
+            restore_from_file(self.central_engine, members.pop(BACKUP_CENTRAL))
+            for path in members.values():
+                _copy_sqlite(path, os.path.join(self.directory, os.path.basename(path)))
+
+    def dispose(self):
+        with self._lock:
+            entries, self._engines = list(self._engines.values()), OrderedDict()
+        for _, engine in entries:
+            engine.dispose()
+
+
+def _copy_sqlite(src_path, dest_path):
+    """Copy one SQLite file with the online backup API (includes pages still in the WAL)."""
+    source = sqlite3.connect(src_path)
+    try:
+        target = sqlite3.connect(dest_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+def prepare_shard(engine, user_id, shard_key):
+    """Check the shard's owner, create its schema and move the user's central rows into it.
+
+    Runs under the shard's write lock and does nothing more once the shard is
+    at the current schema version, so concurrent workers prepare it only once.
+    """
+    from app import MANAGED_INDEXES, db
+    from app.utils.migrations import SCHEMA_VERSION
+    from app.utils.search import ensure_search_index
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+        conn.exec_driver_sql('CREATE TABLE IF NOT EXISTS main.shard_meta '
+                             '(user_id INTEGER NOT NULL, shard_key VARCHAR(32) NOT NULL)')
+        owner = conn.exec_driver_sql('SELECT user_id, shard_key FROM main.shard_meta').first()
+        if owner is None:
+            conn.execute(text('INSERT INTO main.shard_meta (user_id, shard_key) VALUES (:user_id, :shard_key)'),
+                         {'user_id': user_id, 'shard_key': shard_key})
+        elif tuple(owner) != (user_id, shard_key):
+            conn.rollback()
+            raise RuntimeError(f'Shard {shard_key} belongs to user {owner[0]}, not {user_id}')
+        if conn.exec_driver_sql('PRAGMA main.user_version').scalar() >= SCHEMA_VERSION:
+            conn.commit()
+            return
+        tables = [db.metadata.tables[name] for name in SHARDED_TABLES]
+        new = not conn.exec_driver_sql(
+            "SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = 'transactions'").first()
+        for table in tables:
+            table.create(conn, checkfirst=True)
+        if not new:
+            _add_missing_columns(conn, tables)
+        for name, table, columns in MANAGED_INDEXES:
+            if table in SHARDED_TABLES:
+                conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS main.{name} ON {table} ({', '.join(columns)})")
+        if new:
+            _move_central_rows(conn, tables, user_id)
+        ensure_search_index(conn)
+        conn.exec_driver_sql(f'PRAGMA main.user_version = {int(SCHEMA_VERSION)}')
+        conn.commit()
+
+
+def _add_missing_columns(conn, tables):
+    for table in tables:
+        present = {row[1] for row in conn.exec_driver_sql(f'PRAGMA main.table_info({table.name})')}
+        for column in table.columns:
+            if column.name not in present:
+                conn.exec_driver_sql(f'ALTER TABLE main.{table.name} ADD COLUMN '
+                                     f'{column.name} {column.type.compile(conn.dialect)}')
+
+
+def _move_central_rows(conn, tables, user_id):
+    """Move rows `user_id` owns in the central tables into the new shard."""
+    central_columns = {}
+    for table in tables:
+        central_columns[table.name] = {row[1] for row in conn.exec_driver_sql(
+            f'PRAGMA {CENTRAL_SCHEMA}.table_info({table.name})')}
+
+    def owned(table):
+        if table.name == 'budget_plan_items':
+            return (f'plan_id IN (SELECT id FROM {CENTRAL_SCHEMA}.budget_plans '
+                    f'WHERE user_id = :user_id)')
+        return 'user_id = :user_id'
+
+    # Children before parents on delete, parents before children on insert
+    for table in tables:
+        columns = [c.name for c in table.columns if c.name in central_columns[table.name]]
+        if not columns:
+            continue
+        listed = ', '.join(columns)
+        conn.execute(text(
+            f'INSERT INTO main.{table.name} ({listed}) '
+            f'SELECT {listed} FROM {CENTRAL_SCHEMA}.{table.name} WHERE {owned(table)}'
+        ), {'user_id': user_id})
+    for table in reversed(tables):
+        if central_columns[table.name]:
+            conn.execute(text(f'DELETE FROM {CENTRAL_SCHEMA}.{table.name} WHERE {owned(table)}'),
+                         {'user_id': user_id})
+
+
+def init_sharding(app, central_engine):
+    """Enable per-user shards for `app` (DB_SHARDING=user)."""
+    database = central_engine.url.database
+    if central_engine.dialect.name != 'sqlite' or not database or database == ':memory:':
+        raise RuntimeError('DB_SHARDING=user needs a file-based SQLite database')
+    shards = ShardManager(app, central_engine)
+    app.extensions['shards'] = shards
+    return shards
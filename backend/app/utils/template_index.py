@@ -0,0 +1,110 @@
+"""
+Header-signature index for bank template detection.
+
+Detecting a file's bank means finding the template whose headers best
+cover the file's headers (BankTemplate.match_score: the share of the
+template's headers present in the file). Instead of decoding every
+template's JSON and building fresh lower-cased sets for each file, a
+TemplateIndex maps each normalized header to the ids of the templates
+that contain it (posting lists), and keeps the number of headers per
+template. Scoring a file only walks the postings of the file's own
+headers. Templates that share no header with the file are never touched.
+
+Each process caches one index per user. It covers the user's own
+templates and the shared ones (is_shared, offered to every user). Creating
+or deleting a template calls invalidate_templates(). Before reusing its
+copy, a process compares a count/sum/max signature of the same rows, so
+changes made through another worker are picked up on the next lookup.
+"""
+
+import threading
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import func, or_
+
+from app import db
+from app.models.bank_template import BankTemplate
+
+_lock = threading.Lock()
+
+
+def normalize_header(header):
+    return header.lower().strip()
+
+
+class TemplateIndex:
+    """Posting lists from normalized header to template ids."""
+
+    def __init__(self, templates):
+        # Template dicts in tie-break order: earlier wins an equal score
+        self.templates = [t.to_dict() for t in templates]
+        self.postings = {}
+        self.sizes = []
+        for position, template in enumerate(self.templates):
+            headers = {normalize_header(h) for h in template['headers']}
+            self.sizes.append(len(headers))
+            for header in headers:
+                self.postings.setdefault(header, []).append(position)
+
+    def matches(self, file_headers):
+        """[(template dict, score)] for every template sharing a header with the file, best first."""
+        hits = Counter()
+        for header in {normalize_header(h) for h in file_headers}:
+            hits.update(self.postings.get(header, ()))
+        ranked = sorted(hits.items(), key=lambda item: (-item[1] / self.sizes[item[0]], item[0]))
+        return [(self.templates[position], round(count / self.sizes[position], 3))
+                for position, count in ranked]
+
+    def best(self, file_headers):
+        """(best matching template dict, score), or (None, 0) when none matches."""
+        matches = self.matches(file_headers)
+        return matches[0] if matches else (None, 0)
+
+
+def _cache():
+    # One cache per app, so separate app instances never share entries
+    return current_app.extensions.setdefault('template_index_cache', {})
+
+
+def _visible_to(user_id):
+    return or_(BankTemplate.user_id == user_id, BankTemplate.is_shared.is_(True))
+
+
+def visible_templates(user_id):
+    """Query of the templates `user_id` may use: their own and the shared ones."""
+    return BankTemplate.query.filter(_visible_to(user_id))
+
+
+def _signature(user_id):
+    count, id_sum, newest = db.session.query(
+        func.count(BankTemplate.id), func.sum(BankTemplate.id), func.max(BankTemplate.created_at)
+    ).filter(_visible_to(user_id)).one()
+    return count, id_sum, newest
+
+
+def get_template_index(user_id):
+    """The TemplateIndex for `user_id`, rebuilt when their templates changed."""
+    signature = _signature(user_id)
+    cache = _cache()
+    with _lock:
+        entry = cache.get(user_id)
+    if entry and entry[0] == signature:
+        return entry[1]
+
+    templates = visible_templates(user_id).order_by(BankTemplate.id).all()
+    # The user's own templates win ties against shared ones
+    templates.sort(key=lambda t: t.user_id != user_id)
+    index = TemplateIndex(templates)
+    with _lock:
+        cache[user_id] = (signature, index)
+    return index
+
+
+def invalidate_templates(user_id=None):
+    """Drop the cached index of `user_id`, or of everyone (a shared template changed)."""
+    with _lock:
+        if user_id is None:
+            _cache().clear()
+        else:
+            _cache().pop(user_id, None)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark: report read latency while a bulk import is committing.
+
+Seeds a scratch database, then runs a writer process that imports
+transactions in upload-sized batches while several reader threads hammer
+/api/reports/summary through the Flask test client (the same mix gunicorn's
+2 workers x 4 threads see when someone uploads a statement).
+
+The run is repeated for SQLite's stock settings (rollback journal,
+synchronous=FULL) and for the tuned WAL configuration from create_app, and
+latency percentiles plus "database is locked" failures are printed for each.
+
+Usage (from the backend folder):
+    python benchmarks/bench_concurrent_reads.py [--seed-rows 20000] [--import-rows 50000]
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.user import User
+
+CONFIGURATIONS = {
+    'default': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_BUSY_TIMEOUT_MS': 5000,  # pysqlite's own default
+        'SQLITE_CACHE_SIZE_KB': 2000,
+        'SQLITE_MMAP_SIZE': 0,
+        'SQLITE_TEMP_STORE': 'DEFAULT',
+    },
+    'tuned': {},  # create_app defaults
+}
+
+
+def _rows(user_id, category_id, count, start_day):
+    today = date.today()
+    return [{
+        'description': f'Merchant {(start_day + i) % 500}',
+        'amount': float((i % 200) + 1),
+        'type': 'expense',
+        'date': today - timedelta(days=(start_day + i) % 365),
+        'category_id': category_id,
+        'user_id': user_id,
+        'source': 'upload',
+        'is_excluded': False,
+    } for i in range(count)]
+
+
+def _writer_process(config, user_id, category_id, import_rows, batch_size, done, error_count):
+    """Bulk import running in its own process, like a second gunicorn worker."""
+    app = create_app(config)
+    with app.app_context():
+        for offset in range(0, import_rows, batch_size):
+            count = min(batch_size, import_rows - offset)
+            try:
+                db.session.execute(insert(Transaction), _rows(user_id, category_id, count, offset))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with error_count.get_lock():
+                    error_count.value += 1
+        db.session.remove()
+        db.engine.dispose()
+    done.set()
+
+
+def run(name, overrides, seed_rows, import_rows, batch_size, readers):
+    workdir = tempfile.mkdtemp(prefix=f'bench_{name}_')
+    config = {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+    }
+    config.update(overrides)
+    app = create_app(config)
+
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        category = Category(name='Bench', type='expense', user_id=admin.id)
+        db.session.add(category)
+        db.session.commit()
+        user_id, category_id = admin.id, category.id
+        db.session.execute(insert(Transaction), _rows(user_id, category_id, seed_rows, 0))
+        db.session.commit()
+
+    ctx = multiprocessing.get_context('spawn')
+    done = ctx.Event()
+    writer_errors = ctx.Value('i', 0)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def reader():
+        client = app.test_client()
+        client.post('/api/auth/login', json={'username': 'admin', 'password': 'money'})
+        while not done.is_set():
+            started = time.perf_counter()
+            try:
+                response = client.get('/api/reports/summary?period=monthly')
+                ok = response.status_code == 200
+                detail = response.get_data(as_text=True)[:200]
+            except Exception as exc:
+                ok, detail = False, str(exc)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(detail)
+
+    writer = ctx.Process(target=_writer_process, args=(
+        config, user_id, category_id, import_rows, batch_size, done, writer_errors))
+    writer.start()
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    writer.join()
+    done.set()
+    import_seconds = time.perf_counter() - started
+    for t in threads:
+        t.join()
+
+    with app.app_context():
+        db.engine.dispose()
+
+    locked = sum(1 for e in errors if 'locked' in e)
+    print(f'\n[{name}]')
+    print(f'  imported {import_rows} rows in {import_seconds:.2f}s '
+          f'({import_rows / import_seconds:,.0f} rows/s, {writer_errors.value} failed batches)')
+    if latencies:
+        latencies.sort()
+        pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+        print(f'  reads: {len(latencies)} ok, mean {statistics.mean(latencies):.1f} ms, '
+              f'p50 {pct(0.50):.1f} ms, p95 {pct(0.95):.1f} ms, '
+              f'p99 {pct(0.99):.1f} ms, max {latencies[-1]:.1f} ms')
+    print(f'  read errors: {len(errors)} ({locked} "database is locked")')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--seed-rows', type=int, default=20000)
+    parser.add_argument('--import-rows', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--only', choices=sorted(CONFIGURATIONS))
+    args = parser.parse_args()
+
+    for name, overrides in CONFIGURATIONS.items():
+        if args.only and name != args.only:
+            continue
+        run(name, overrides, args.seed_rows, args.import_rows, args.batch_size, args.readers)
+
+
+if __name__ == '__main__':
+    main()
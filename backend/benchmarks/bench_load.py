@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent simulated users against a locally started server.
+
+Prepares a scratch database with generate_synthetic_data.py, starts the app
+the way the Docker image does (gunicorn, 2 workers x 4 threads), then runs
+--users simulated browser sessions plus --uploaders sessions that upload a
+large statement over and over. Each browser session logs in and then loops
+over the flows below, picked by weight, with an exponential think time
+between them. The requests are the ones frontend/static/js/app.js makes for
+each page:
+
+- dashboard     summary, expense and income by-category (in parallel) and
+                the month's transactions (loadDashboard)
+- transactions  categories and the month's transactions (loadTransactions)
+- reports       trending, budget analysis and by-category (loadReports)
+- upload page   bank templates and upload history (loadUploadHistory)
+
+Uploaders post the generated 'Generic Export' statement to
+/api/uploads/upload with its template, then delete the upload again so the
+data set stays the same size.
+
+Requests go through a small HTTP/1.1 client on asyncio streams (keep-alive,
+cookie jar), so one process can drive hundreds of sessions without extra
+dependencies. The report has p50/p95/p99 latency and the error rate per
+endpoint, plus database lock contention:
+
+- responses and server log lines mentioning a lock error ("database is
+  locked", lock timeouts, deadlocks)
+- a sampler that probes the database every --sample-ms. On SQLite it tries
+  BEGIN IMMEDIATE with no busy timeout, which fails while another connection
+  holds the write lock. On PostgreSQL it counts sessions waiting on a lock
+  in pg_stat_activity.
+
+Without gunicorn installed, --workers Werkzeug threaded servers are started
+on consecutive ports and sessions are spread across them. That keeps the
+multi-process write contention but not gunicorn's 4-thread limit per worker.
+With --url the load goes to an already running server instead; pass
+--database-url too to sample its lock contention.
+
+Usage (from the backend folder):
+    python benchmarks/bench_load.py [--users 50] [--uploaders 1] [--duration 60]
+        [--accounts 10] [--years 2] [--upload-rows 20000] [--think 1.0]
+        [--database-url URL] [--url http://host:port] [--json PATH]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import date
+from urllib.parse import urlencode, urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from generate_synthetic_data import DEFAULT_PASSWORD
+
+# (flow, relative weight) for browser sessions
+FLOW_WEIGHTS = {'dashboard': 4, 'transactions': 3, 'reports': 2, 'upload_page': 1}
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'lock timeout',
+               'could not obtain lock', 'deadlock detected')
+_ID = re.compile(r'/\d+(?=/|$)')
+
+
+# ── HTTP client ────────────────────────────────────────────────────────────────
+
+class Response:
+    __slots__ = ('status', 'headers', 'body')
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class Session:
+    """One browser: a keep-alive HTTP/1.1 connection plus its cookies."""
+
+    def __init__(self, host, port, stats):
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.cookies = {}
+        self._reader = self._writer = None
+        self._second = None
+
+    def second(self):
+        """A parallel connection sharing this session's cookies."""
+        if self._second is None:
+            self._second = Session(self.host, self.port, self.stats)
+            self._second.cookies = self.cookies
+        return self._second
+
+    async def close(self):
+        self._disconnect()
+        if self._second is not None:
+            self._second._disconnect()
+
+    def _disconnect(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def request(self, method, path, json_body=None, body=None, content_type=None, label=None):
+        if json_body is not None:
+            body, content_type = json.dumps(json_body).encode(), 'application/json'
+        label = label or f"{method} {_ID.sub('/{id}', path.split('?', 1)[0])}"
+        started = time.perf_counter()
+        try:
+            response = await self._send(method, path, body, content_type)
+        except (OSError, asyncio.IncompleteReadError, ConnectionError) as exc:
+            self.stats.record(label, time.perf_counter() - started, None, str(exc).encode())
+            raise
+        self.stats.record(label, time.perf_counter() - started, response.status, response.body)
+        return response
+
+    async def _send(self, method, path, body, content_type):
+        head = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', 'Accept: */*']
+        if self.cookies:
+            head.append('Cookie: ' + '; '.join(f'{k}={v}' for k, v in self.cookies.items()))
+        if body is not None:
+            head += [f'Content-Type: {content_type}', f'Content-Length: {len(body)}']
+        payload = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + (body or b'')
+
+        for attempt in (0, 1):
+            reused = self._writer is not None
+            if not reused:
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self._writer.write(payload)
+                await self._writer.drain()
+                return await self._read_response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self._disconnect()
+                # A kept-alive connection the server already closed; retry once on a fresh one
+                if not reused or attempt:
+                    raise
+
+    async def _read_response(self):
+        reader = self._reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed by server')
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers.setdefault(name.strip().lower(), []).append(value.strip())
+
+        for cookie in headers.get('set-cookie', []):
+            name, _, value = cookie.split(';', 1)[0].partition('=')
+            self.cookies[name.strip()] = value.strip()
+
+        if 'chunked' in headers.get('transfer-encoding', [''])[0].lower():
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length'][0]))
+        else:
+            body = await reader.read()
+
+        connection = headers.get('connection', [''])[0].lower()
+        if connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive'):
+            self._disconnect()
+        return Response(int(status), headers, body)
+
+
+def multipart(fields, files):
+    """(body, content type) of a multipart/form-data request."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+# ── measurements ───────────────────────────────────────────────────────────────
+
+class Stats:
+    def __init__(self):
+        # endpoint label -> latencies in seconds / error count / lock error count
+        self.latencies = {}
+        self.errors = {}
+        self.lock_errors = {}
+        self.upload_rows = 0
+        self.upload_seconds = 0.0
+
+    def record(self, label, elapsed, status, body):
+        self.latencies.setdefault(label, []).append(elapsed)
+        if status is None or status >= 400:
+            self.errors[label] = self.errors.get(label, 0) + 1
+            text = body[:2000].decode('utf-8', 'replace').lower()
+            if any(marker in text for marker in LOCK_ERRORS):
+                self.lock_errors[label] = self.lock_errors.get(label, 0) + 1
+
+    def summary(self):
+        rows = []
+        for label in sorted(self.latencies):
+            values = sorted(self.latencies[label])
+            pct = lambda p: values[min(len(values) - 1, int(len(values) * p))]
+            rows.append({
+                'endpoint': label, 'requests': len(values),
+                'errors': self.errors.get(label, 0), 'lock_errors': self.lock_errors.get(label, 0),
+                'p50_ms': pct(0.50) * 1000, 'p95_ms': pct(0.95) * 1000, 'p99_ms': pct(0.99) * 1000,
+                'max_ms': values[-1] * 1000,
+            })
+        return rows
+
+
+class LockSampler(threading.Thread):
+    """Polls the database for write-lock contention while the load runs."""
+
+    def __init__(self, database_url, interval):
+        super().__init__(daemon=True)
+        self.database_url = database_url
+        self.interval = interval
+        self.samples = 0
+        self.contended = 0
+        self.max_waiting = 0
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def run(self):
+        if self.database_url.startswith('sqlite'):
+            self._sample_sqlite()
+        elif self.database_url.startswith('postgres'):
+            self._sample_postgresql()
+
+    def _sample_sqlite(self):
+        import sqlite3
+        from sqlalchemy.engine import make_url
+
+        conn = sqlite3.connect(make_url(self.database_url).database, timeout=0, isolation_level=None)
+        try:
+            while not self._stopped.wait(self.interval):
+                self.samples += 1
+                try:
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.execute('ROLLBACK')
+                except sqlite3.OperationalError:
+                    # Another connection holds the write lock
+                    self.contended += 1
+        finally:
+            conn.close()
+
+    def _sample_postgresql(self):
+        import psycopg
+        from app.utils.database import resolve_database_url
+
+        url = resolve_database_url(self.database_url).replace('postgresql+psycopg://', 'postgresql://')
+        with psycopg.connect(url, autocommit=True) as conn:
+            while not self._stopped.wait(self.interval):
+                waiting = conn.execute(
+                    "SELECT count(*) FROM pg_stat_activity "
+                    "WHERE wait_event_type = 'Lock' AND datname = current_database()").fetchone()[0]
+                self.samples += 1
+                self.contended += waiting > 0
+                self.max_waiting = max(self.max_waiting, waiting)
+
+
+# ── flows ──────────────────────────────────────────────────────────────────────
+
+def _month_params(today):
+    last = date(today.year + today.month // 12, today.month % 12 + 1, 1).toordinal() - 1
+    return ({'period': 'monthly', 'calendar': 'gregorian', 'year': today.year, 'month': today.month},
+            {'start_date': today.replace(day=1).isoformat(), 'end_date': date.fromordinal(last).isoformat()})
+
+
+async def login(session, username):
+    response = await session.request('POST', '/api/auth/login',
+                                     json_body={'username': username, 'password': DEFAULT_PASSWORD})
+    if response.status != 200:
+        raise RuntimeError(f'login as {username} failed: {response.status}')
+    await session.request('GET', '/api/auth/me')
+    await session.request('GET', '/api/categories/?include_subcategories=true')
+    await session.request('GET', '/api/status/')
+
+
+async def dashboard(session):
+    period, month = _month_params(date.today())
+    params = urlencode({**period, 'include_excluded': 'false'})
+    await session.request('GET', f'/api/reports/summary?{params}')
+    # Promise.all in the browser: a second connection with the same cookies
+    await asyncio.gather(
+        session.request('GET', f'/api/reports/by-category?{params}&type=expense'),
+        session.second().request('GET', f'/api/reports/by-category?{params}&type=income'),
+    )
+    await session.request('GET', f"/api/transactions/?{urlencode({'include_excluded': 'false', **month})}")
+
+
+async def transactions(session):
+    _, month = _month_params(date.today())
+    await session.request('GET', '/api/categories/?include_subcategories=true')
+    await session.request('GET', f"/api/transactions/?{urlencode({'include_excluded': 'true', **month})}")
+
+
+async def reports(session):
+    period, _ = _month_params(date.today())
+    params = urlencode({**period, 'include_excluded': 'false'})
+    await session.request('GET', '/api/reports/trending?months=6&type=expense&calendar=gregorian')
+    await session.request('GET', f'/api/reports/budget-analysis?{params}')
+    await session.request('GET', f'/api/reports/by-category?{params}&type=expense')
+
+
+async def upload_page(session):
+    await session.request('GET', '/api/bank-templates/')
+    await session.request('GET', '/api/uploads/')
+
+
+FLOWS = {'dashboard': dashboard, 'transactions': transactions, 'reports': reports, 'upload_page': upload_page}
+
+
+async def browse(session, username, deadline, think, rng):
+    await login(session, username)
+    names = list(FLOW_WEIGHTS)
+    weights = [FLOW_WEIGHTS[name] for name in names]
+    while time.monotonic() < deadline:
+        try:
+            await FLOWS[rng.choices(names, weights)[0]](session)
+        except (OSError, asyncio.IncompleteReadError, ConnectionError):
+            await session.close()
+        await asyncio.sleep(min(rng.expovariate(1 / think) if think else 0, max(deadline - time.monotonic(), 0)))
+
+
+async def upload_loop(session, username, deadline, statement, rows):
+    await login(session, username)
+    templates = (await session.request('GET', '/api/bank-templates/')).json()
+    template_id = next(t['id'] for t in templates if t['name'] == 'Generic Export')
+    body, content_type = multipart({'template_id': template_id, 'uploaded_by': username},
+                                   {'file': ('generic_export.csv', statement)})
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        response = await session.request('POST', '/api/uploads/upload', body=body, content_type=content_type)
+        if response.status == 201:
+            session.stats.upload_rows += rows
+            session.stats.upload_seconds += time.perf_counter() - started
+            await session.request('DELETE', f"/api/uploads/{response.json()['upload_id']}")
+        else:
+            await asyncio.sleep(1)
+
+
+async def run_load(servers, args, statement, statement_rows, stats):
+    rng = random.Random(args.seed)
+    deadline = time.monotonic() + args.ramp + args.duration
+    tasks = []
+    for i in range(args.uploaders):
+        host, port = servers[i % len(servers)]
+        tasks.append(upload_loop(Session(host, port, stats), f'{args.prefix}{1:04d}', deadline,
+                                 statement, statement_rows))
+    for i in range(args.users):
+        host, port = servers[i % len(servers)]
+        username = f'{args.prefix}{i % args.accounts + 1:04d}'
+        tasks.append(_delayed(args.ramp * i / max(args.users, 1),
+                              browse(Session(host, port, stats), username, deadline, args.think,
+                                     random.Random(rng.random()))))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return [r for r in results if isinstance(r, BaseException)]
+
+
+async def _delayed(seconds, coroutine):
+    await asyncio.sleep(seconds)
+    return await coroutine
+
+
+# ── server ─────────────────────────────────────────────────────────────────────
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(host, port, processes, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if any(p.poll() is not None for p in processes):
+            raise RuntimeError('server exited during startup; see its log')
+        try:
+            urllib.request.urlopen(f'http://{host}:{port}/api/status/', timeout=2)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not come up within {timeout}s')
+
+
+def start_servers(env, workers, threads, log_path):
+    """Start the app locally; returns ([(host, port)], [processes], description)."""
+    log = open(log_path, 'ab')
+    if shutil.which('gunicorn') or _importable('gunicorn'):
+        port = _free_port()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+             '--threads', str(threads), 'run:app'], cwd=BACKEND_DIR, env=env, stdout=log, stderr=log)
+        _wait_ready('127.0.0.1', port, [process])
+        return [('127.0.0.1', port)], [process], f'gunicorn {workers} workers x {threads} threads'
+
+    processes, servers = [], []
+    for _ in range(workers):
+        port = _free_port()
+        processes.append(subprocess.Popen(
+            [sys.executable, '-c', 'import sys; from werkzeug.serving import run_simple; from run import app; '
+             'run_simple("127.0.0.1", int(sys.argv[1]), app, threaded=True)', str(port)],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=log))
+        servers.append(('127.0.0.1', port))
+    for host, port in servers:
+        _wait_ready(host, port, processes)
+    return servers, processes, f'{workers} Werkzeug threaded servers (gunicorn not installed)'
+
+
+def _importable(module):
+    import importlib.util
+    return importlib.util.find_spec(module) is not None
+
+
+# ── driver ─────────────────────────────────────────────────────────────────────
+
+def report(stats, sampler, log_path, elapsed, description):
+    rows = stats.summary()
+    total = sum(r['requests'] for r in rows)
+    errors = sum(r['errors'] for r in rows)
+    print(f"\nServer: {description}")
+    print(f"{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s), "
+          f"{errors} errors ({errors / max(total, 1):.2%})")
+    print(f"\n{'endpoint':<42} {'reqs':>6} {'err %':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for r in rows:
+        print(f"{r['endpoint']:<42} {r['requests']:>6} {r['errors'] / r['requests']:>6.1%} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+
+    contention = {'lock_error_responses': sum(r['lock_errors'] for r in rows)}
+    if log_path and os.path.exists(log_path):
+        with open(log_path, errors='replace') as f:
+            text = f.read().lower()
+        contention['lock_errors_in_server_log'] = sum(text.count(marker) for marker in LOCK_ERRORS)
+    if sampler is not None and sampler.samples:
+        contention['lock_samples'] = sampler.samples
+        contention['lock_contended_share'] = sampler.contended / sampler.samples
+        if sampler.max_waiting:
+            contention['max_sessions_waiting_on_lock'] = sampler.max_waiting
+    print('\nLock contention:')
+    for key, value in contention.items():
+        print(f"  {key}: {value:.1%}" if isinstance(value, float) else f"  {key}: {value}")
+    if stats.upload_seconds:
+        print(f"Uploads: {stats.upload_rows} rows at {stats.upload_rows / stats.upload_seconds:,.0f} rows/s")
+    return {'requests': total, 'errors': errors, 'seconds': elapsed, 'server': description,
+            'endpoints': rows, 'lock_contention': contention,
+            'upload_rows': stats.upload_rows, 'upload_seconds': stats.upload_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run concurrent simulated users against the app')
+    parser.add_argument('--users', type=int, default=50, help='browser sessions')
+    parser.add_argument('--uploaders', type=int, default=1, help='sessions uploading statements in a loop')
+    parser.add_argument('--duration', type=float, default=60, help='seconds of load after the ramp-up')
+    parser.add_argument('--ramp', type=float, default=5, help='seconds over which sessions start')
+    parser.add_argument('--think', type=float, default=1.0, help='mean think time between flows (seconds)')
+    parser.add_argument('--accounts', type=int, default=10, help='generated users the sessions log in as')
+    parser.add_argument('--years', type=int, default=2, help='history per generated user')
+    parser.add_argument('--upload-rows', type=int, default=20000, help='rows in the uploaded statement')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--database-url', help='database to load (default: scratch SQLite file)')
+    parser.add_argument('--url', help='use this running server instead of starting one')
+    parser.add_argument('--statement', help='statement to upload with --url (Generic Export layout)')
+    parser.add_argument('--prefix', default='synth', help='username prefix of the generated users')
+    parser.add_argument('--sample-ms', type=float, default=50, help='lock sampler interval')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+    args.accounts = max(1, args.accounts)
+
+    workdir = tempfile.mkdtemp(prefix='bench_load_')
+    processes = []
+    log_path = None
+    try:
+        database_url = args.database_url
+        if args.url:
+            parts = urlsplit(args.url)
+            servers = [(parts.hostname, parts.port or 80)]
+            description = args.url
+            statement_path = args.statement
+        else:
+            database_url = database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}"
+            statement_dir = os.path.join(workdir, 'statements')
+            print(f'Generating {args.accounts} user(s) x {args.years} year(s)...')
+            subprocess.run([sys.executable, 'generate_synthetic_data.py', '--users', str(args.accounts),
+                            '--years', str(args.years), '--prefix', args.prefix, '--database-url', database_url,
+                            '--statements', statement_dir, '--statement-rows', str(args.upload_rows),
+                            '--formats', 'csv'], cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL)
+            statement_path = os.path.join(statement_dir, 'generic_export.csv')
+            env = dict(os.environ, DATABASE_URL=database_url, DB_SETUP_MODE='check',
+                       ACTIVITY_RETENTION_ENABLED='false')
+            log_path = os.path.join(workdir, 'server.log')
+            servers, processes, description = start_servers(env, args.workers, args.threads, log_path)
+
+        statement = b''
+        if args.uploaders:
+            if not statement_path:
+                parser.error('--uploaders needs --statement when using --url')
+            with open(statement_path, 'rb') as f:
+                statement = f.read()
+        statement_rows = max(statement.count(b'\n') - 1, 0)
+
+        sampler = LockSampler(database_url, args.sample_ms / 1000) if database_url else None
+        if sampler:
+            sampler.start()
+        stats = Stats()
+        print(f'Running {args.users} session(s) and {args.uploaders} uploader(s) for '
+              f'{args.ramp + args.duration:.0f}s...')
+        started = time.perf_counter()
+        failures = asyncio.run(run_load(servers, args, statement, statement_rows, stats))
+        elapsed = time.perf_counter() - started
+        if sampler:
+            sampler.stop()
+        for failure in failures[:5]:
+            print(f'Session failed: {failure!r}')
+
+        results = report(stats, sampler, log_path, elapsed, description)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
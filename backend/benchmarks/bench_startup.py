@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: worker boot latency and memory.
+
+Prepares a scratch database with prestart's setup, then starts fresh Python
+processes that import the app and call create_app() the way a gunicorn
+worker does. Each child reports how long the import and create_app took, its
+resident memory afterwards and whether pandas got loaded. The run is repeated
+for DB_SETUP_MODE=always (the full create_all/migrations/seeding pass every
+worker used to do) and auto/check (schema version check only).
+
+Usage (from the backend folder):
+    python benchmarks/bench_startup.py [--runs 5] [--database-url URL]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+MODES = ('always', 'auto', 'check')
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app({'DB_SETUP_MODE': sys.argv[1], 'ACTIVITY_RETENTION_ENABLED': False})
+ready = time.perf_counter()
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+try:
+    with open('/proc/self/status') as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+except OSError:
+    pass
+print(json.dumps({'import': imported - start, 'create_app': ready - imported,
+                  'rss_mb': rss_kb / 1024, 'pandas': 'pandas' in sys.modules}))
+"""
+
+
+def boot(mode, env):
+    """Start one child process; return its measurements plus total wall time."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD, mode], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    stats['wall'] = wall
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure worker boot time and RSS')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--database-url', help='database to boot against (default: scratch SQLite file)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        subprocess.run([sys.executable, 'prestart.py'], cwd=BACKEND_DIR, env=env,
+                       capture_output=True, check=True)
+
+        print(f"{'mode':<8} {'wall ms':>9} {'import ms':>10} {'create_app ms':>14} {'RSS MB':>8}  pandas")
+        for mode in MODES:
+            runs = [boot(mode, env) for _ in range(args.runs)]
+            median = {key: statistics.median(r[key] for r in runs)
+                      for key in ('wall', 'import', 'create_app', 'rss_mb')}
+            print(f"{mode:<8} {median['wall'] * 1000:>9.0f} {median['import'] * 1000:>10.0f} "
+                  f"{median['create_app'] * 1000:>14.0f} {median['rss_mb']:>8.1f}  "
+                  f"{'yes' if any(r['pandas'] for r in runs) else 'no'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: ingest, categorization, reports, rules, exports and auth.
+
+Builds one scratch SQLite database per history size with
+generate_synthetic_data.py (--users users over each of --years years,
+ending on a fixed date so every run sees the same data), then times:
+
+- ingest.*       process_csv_file / process_excel_file on the generated
+                 statements, one per template layout (rows/s), and the
+                 /api/uploads/upload endpoint end to end
+- categorize.*   categorize_transaction per row, against the default rules
+                 plus 0, 50 and 250 personal rules
+- reports.*      every /api/reports/* endpoint over the whole history
+- rules.apply    POST /api/rules/apply over the user's transactions
+- exports.*      rules export, activity log export, settings backup and
+                 database backup
+- auth.*         the before_request middleware on its own, and a cheap
+                 authenticated endpoint end to end
+
+Case names carry their parameters (reports.summary[years=4]) so results
+from runs with the same arguments line up. Each run is saved under
+benchmarks/results/ by commit (see harness.py). --compare checks the run
+against an earlier one and exits with status 1 when a case's median got
+slower by more than --threshold.
+
+Usage (from the backend folder):
+    python benchmarks/bench_suite.py [--years 1,4] [--users 3] [--repeat 5]
+        [--only REGEX] [--compare [COMMIT|PATH]] [--threshold 0.10] [--no-save]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import date
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import DEFAULT_THRESHOLD, Runner, compare, load, result_path, save
+
+from app import create_app, db
+from app.models.bank_template import BankTemplate
+from app.models.categorization_rule import CategorizationRule
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.user import User
+from generate_synthetic_data import DEFAULT_PASSWORD, TEMPLATE_LAYOUTS, generate
+
+END = date(2025, 12, 31)
+USERNAME = 'synth0001'
+RULE_COUNTS = (0, 50, 250)
+CATEGORIZE_SAMPLE = 500
+
+
+def build(workdir, users, years, per_day, statement_rows):
+    """Scratch app with generated data; statements go to workdir/statements."""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        'ACTIVITY_ARCHIVE_DIR': os.path.join(workdir, 'activity_archive'),
+        'ACTIVITY_RETENTION_ENABLED': False,
+    })
+    generate(app, users=users, years=years, seed=42, per_day=per_day, end=END,
+             statements_dir=os.path.join(workdir, 'statements'),
+             statement_rows_limit=statement_rows, log=lambda message: None)
+    return app
+
+
+def login(app):
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': USERNAME, 'password': DEFAULT_PASSWORD})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return client
+
+
+def _ok(response, status=200):
+    assert response.status_code == status, f'{response.status_code}: {response.get_data(as_text=True)[:200]}'
+    return response
+
+
+def bench_ingest(runner, app, workdir):
+    from app.utils.file_processor import process_csv_file, process_excel_file
+
+    statements = os.path.join(workdir, 'statements')
+    client = login(app)
+    with app.app_context():
+        user = User.query.filter_by(username=USERNAME).one()
+        templates = {t.name: (t.id, t.get_mapping()) for t in BankTemplate.query.filter_by(user_id=user.id)}
+
+        for name in TEMPLATE_LAYOUTS:
+            slug = name.lower().replace(' ', '_')
+            template_id, mapping = templates[name]
+            for extension, process in (('csv', process_csv_file), ('xlsx', process_excel_file)):
+                path = os.path.join(statements, f'{slug}.{extension}')
+                rows = len(process(path, user_id=user.id, column_mapping=mapping))
+                runner.time(f'ingest.{extension}[{slug}]',
+                            lambda: process(path, user_id=user.id, column_mapping=mapping), rows=rows)
+
+    slug = 'generic_export'
+    template_id, _ = templates['Generic Export']
+    path = os.path.join(statements, f'{slug}.csv')
+    with open(path, 'rb') as f:
+        content = f.read()
+    rows = content.count(b'\n') - 1
+    uploaded = []
+
+    def upload():
+        from io import BytesIO
+        response = _ok(client.post('/api/uploads/upload', content_type='multipart/form-data', data={
+            'file': (BytesIO(content), f'{slug}.csv'), 'template_id': str(template_id)}), 201)
+        uploaded.append(response.get_json()['upload_id'])
+
+    def remove():
+        _ok(client.delete(f'/api/uploads/{uploaded.pop()}'))
+
+    runner.time(f'ingest.upload_endpoint[{slug}]', upload, rows=rows, teardown=remove)
+
+
+def bench_categorize(runner, app):
+    from app.utils.file_processor import categorize_transaction
+
+    with app.app_context():
+        user = User.query.filter_by(username=USERNAME).one()
+        descriptions = [d for (d,) in db.session.query(Transaction.description)
+                        .filter_by(user_id=user.id).order_by(Transaction.id).limit(CATEGORIZE_SAMPLE)]
+        category_id = Category.query.filter_by(name='Shopping/Retail', user_id=None).first().id
+
+        added = 0
+        for count in RULE_COUNTS:
+            # Personal rules that never match, so every row walks all of them
+            db.session.add_all(CategorizationRule(
+                name=f'Bench rule {i}', keywords=f'nomatch{i}a,nomatch{i}b', category_id=category_id,
+                priority=i, user_id=user.id) for i in range(added, count))
+            db.session.commit()
+            added = count
+
+            def categorize():
+                for description in descriptions:
+                    categorize_transaction(description, user_id=user.id)
+
+            runner.time(f'categorize.per_row[personal_rules={count}]', categorize, rows=len(descriptions))
+
+        CategorizationRule.query.filter(CategorizationRule.user_id == user.id,
+                                        CategorizationRule.name.like('Bench rule %')).delete()
+        db.session.commit()
+
+
+def bench_reports(runner, app, years):
+    client = login(app)
+    start = date(END.year - years, END.month, 1)
+    history = f'date_from={start.isoformat()}&date_to={END.isoformat()}'
+    months_back = (date.today().year - start.year) * 12 + date.today().month - start.month + 1
+    endpoints = {
+        'summary': f'/api/reports/summary?period=custom&{history}',
+        'by_category': f'/api/reports/by-category?period=custom&{history}',
+        'budget_analysis': f'/api/reports/budget-analysis?period=custom&{history}',
+        'trending': f'/api/reports/trending?months={min(months_back, 240)}',
+        'rollup': f'/api/reports/rollup?{history}',
+        'rollup_badi': f'/api/reports/rollup?calendar=badi&{history}',
+    }
+    for name, url in endpoints.items():
+        runner.time(f'reports.{name}[years={years}]', lambda: _ok(client.get(url)))
+
+    runner.time(f'rules.apply[years={years}]', lambda: _ok(client.post('/api/rules/apply')))
+
+
+def bench_exports(runner, app, years):
+    client = login(app)
+    runner.time(f'exports.rules[years={years}]', lambda: _ok(client.get('/api/rules/export')))
+    runner.time(f'exports.activity_csv[years={years}]',
+                lambda: _ok(client.get('/api/activity/export?format=csv')).get_data())
+    runner.time(f'exports.settings_backup[years={years}]', lambda: _ok(client.get('/api/status/settings/backup')))
+    runner.time(f'exports.db_backup[years={years}]',
+                lambda: _ok(client.get('/api/status/settings/db/backup')).get_data())
+
+
+def bench_auth(runner, app):
+    from flask import session
+
+    client = login(app)
+    with app.app_context():
+        user_id = User.query.filter_by(username=USERNAME).one().id
+
+    def middleware():
+        for _ in range(100):
+            with app.test_request_context('/api/transactions/'):
+                session['user_id'] = user_id
+                app.preprocess_request()
+
+    runner.time('auth.middleware[x100]', middleware)
+    runner.time('auth.status_endpoint', lambda: _ok(client.get('/api/status/')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite and check for regressions')
+    parser.add_argument('--years', default='1,4', help='comma-separated history sizes in years')
+    parser.add_argument('--users', type=int, default=3)
+    parser.add_argument('--per-day', type=float, default=3.0)
+    parser.add_argument('--statement-rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', help='only run cases whose name matches this regex')
+    parser.add_argument('--compare', nargs='?', const='', metavar='COMMIT|PATH',
+                        help='compare with a saved run (default: the newest other one)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative median slowdown reported as a regression')
+    parser.add_argument('--no-save', action='store_true', help='do not store this run under benchmarks/results')
+    args = parser.parse_args()
+
+    # Picked before this run can overwrite an earlier result for the same commit
+    baseline = None
+    if args.compare is not None:
+        baseline = load(args.compare or None, exclude=result_path())
+        if baseline is None:
+            print('No earlier results to compare with')
+
+    runner = Runner(repeat=args.repeat, only=args.only)
+    sizes = [int(y) for y in args.years.split(',')]
+    for i, years in enumerate(sizes):
+        with tempfile.TemporaryDirectory(prefix='bench_suite_') as workdir:
+            print(f'\nDataset: {args.users} user(s) x {years} year(s)')
+            app = build(workdir, args.users, years, args.per_day, args.statement_rows)
+            if i == 0:
+                bench_ingest(runner, app, workdir)
+                bench_categorize(runner, app)
+                bench_auth(runner, app)
+            bench_reports(runner, app, years)
+            bench_exports(runner, app, years)
+            writer = app.extensions.get('activity_writer')
+            if writer is not None:
+                writer.close()
+            with app.app_context():
+                db.engine.dispose()
+
+    parameters = {key: value for key, value in vars(args).items()
+                  if key in ('years', 'users', 'per_day', 'statement_rows', 'repeat')}
+    current = {'commit': 'working tree', 'created_at': 'now', 'results': runner.results}
+    if not args.no_save:
+        path = save(runner.results, parameters)
+        with open(path) as f:
+            current = json.load(f)
+        print(f'\n✓ Results saved to {os.path.relpath(path)}')
+
+    if baseline is not None:
+        if baseline.get('parameters', parameters) != parameters:
+            print(f"Note: baseline ran with {baseline['parameters']}")
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
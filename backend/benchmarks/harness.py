@@ -0,0 +1,147 @@
+"""
+Timing, result storage and regression checks shared by the benchmark scripts.
+
+A Runner times named cases: one warm-up call, then `repeat` timed calls.
+The median is the number that gets compared; min and spread are kept
+alongside it. Cases that process rows also report rows/s.
+
+save() writes a run to benchmarks/results/<commit>.json, one file per
+commit (suffixed -dirty when the working tree has local changes), together
+with the Python version and host. compare() matches cases by name against an
+earlier run and flags every case whose median grew by more than the
+threshold. Timings are only comparable on the same machine, so the result
+files are kept out of git and compared on the host that produced them.
+"""
+
+import glob
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_THRESHOLD = 0.10
+
+
+class Runner:
+    def __init__(self, repeat=5, warmup=1, only=None, log=print):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.only = re.compile(only) if only else None
+        self.log = log
+        self.results = {}
+
+    def wanted(self, name):
+        return self.only is None or bool(self.only.search(name))
+
+    def time(self, name, fn, rows=None, setup=None, teardown=None):
+        """Time `fn()`; `setup`/`teardown` run around each call, untimed."""
+        if not self.wanted(name):
+            return None
+        samples = []
+        for i in range(self.warmup + self.repeat):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            if teardown:
+                teardown()
+            if i >= self.warmup:
+                samples.append(elapsed)
+
+        median = statistics.median(samples)
+        result = {
+            'median': median,
+            'min': min(samples),
+            'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            'repeat': len(samples),
+        }
+        if rows:
+            result['rows'] = rows
+            result['rows_per_second'] = rows / median if median else None
+        self.results[name] = result
+        throughput = f"  {result['rows_per_second']:>12,.0f} rows/s" if rows else ''
+        self.log(f"  {name:<48} {median * 1000:>10.2f} ms{throughput}")
+        return result
+
+
+def git_revision(cwd=None):
+    """(commit sha, dirty) of the working tree, or ('unknown', False)."""
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=cwd, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, bool(dirty)
+
+
+def result_path(directory=RESULTS_DIR):
+    """Where save() stores a run of the current working tree."""
+    commit, dirty = git_revision()
+    return os.path.join(directory, f"{commit[:12]}{'-dirty' if dirty else ''}.json")
+
+
+def save(results, parameters=None, directory=RESULTS_DIR):
+    """Write a run's results under `directory`; returns the path."""
+    commit, dirty = git_revision()
+    run = {
+        'commit': commit,
+        'dirty': dirty,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'parameters': parameters or {},
+        'results': results,
+    }
+    os.makedirs(directory, exist_ok=True)
+    path = result_path(directory)
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2, sort_keys=True)
+    return path
+
+
+def load(reference=None, exclude=None, directory=RESULTS_DIR):
+    """A saved run by path or commit prefix; by default the newest one not at `exclude`."""
+    if reference and os.path.isfile(reference):
+        path = reference
+    else:
+        paths = sorted(glob.glob(os.path.join(directory, '*.json')), key=os.path.getmtime, reverse=True)
+        if reference:
+            paths = [p for p in paths if os.path.basename(p).startswith(reference[:12])]
+        if exclude:
+            paths = [p for p in paths if p != exclude]
+        if not paths:
+            return None
+        path = paths[0]
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, log=print):
+    """Print median changes per case; returns the names that regressed."""
+    before, after = baseline['results'], current['results']
+    log(f"\nCompared with {baseline['commit'][:12]}{' (dirty)' if baseline.get('dirty') else ''} "
+        f"from {baseline['created_at']} (threshold {threshold:.0%}):")
+    regressions = []
+    for name in sorted(set(before) & set(after)):
+        old, new = before[name]['median'], after[name]['median']
+        change = (new - old) / old if old else 0.0
+        flag = ''
+        if change > threshold:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = 'faster'
+        log(f"  {name:<48} {old * 1000:>10.2f} -> {new * 1000:>10.2f} ms  {change:>+7.1%}  {flag}")
+    for name in sorted(set(after) - set(before)):
+        log(f"  {name:<48} {'new':>10}")
+    return regressions
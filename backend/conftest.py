@@ -0,0 +1,117 @@
+"""
+Shared pytest fixtures.
+
+Each test gets its own app instance backed by a scratch database, so the
+suite never touches data/expense_tracker.db. Tests that use the `app` or
+`client` fixtures run once per database backend:
+
+  sqlite      a fresh file in the test's temporary directory
+  postgresql  a fresh database on the server given by TEST_POSTGRES_URL
+              (e.g. postgresql://postgres@127.0.0.1:5432/postgres), or on a
+              throwaway cluster started with initdb/pg_ctl when those are on
+              PATH. Skipped when neither is available.
+
+Modules that only make sense for one backend override `database_url`.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+
+from app import create_app, db
+
+
+def _start_local_postgres(base_dir):
+    """Start a throwaway PostgreSQL cluster; return (url, data_dir) or None."""
+    initdb, pg_ctl = shutil.which('initdb'), shutil.which('pg_ctl')
+    if not initdb or not pg_ctl or os.geteuid() == 0:
+        return None
+
+    data_dir = os.path.join(base_dir, 'pgdata')
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+
+    subprocess.run([initdb, '-D', data_dir, '-U', 'postgres', '--auth=trust', '--encoding=UTF8'],
+                   check=True, capture_output=True)
+    subprocess.run([pg_ctl, '-D', data_dir, '-w', '-l', os.path.join(base_dir, 'postgres.log'),
+                    '-o', f'-p {port} -k {base_dir} -c listen_addresses=127.0.0.1', 'start'],
+                   check=True, capture_output=True)
+    return f'postgresql://postgres@127.0.0.1:{port}/postgres', data_dir
+
+
+@pytest.fixture(scope='session')
+def postgres_server_url(tmp_path_factory):
+    """Admin URL of a PostgreSQL server the tests may create databases on."""
+    try:
+        import psycopg  # noqa: F401
+    except ImportError:
+        pytest.skip('psycopg is not installed')
+
+    url = os.environ.get('TEST_POSTGRES_URL')
+    if url:
+        yield url
+        return
+
+    started = _start_local_postgres(str(tmp_path_factory.mktemp('postgres')))
+    if not started:
+        pytest.skip('No PostgreSQL available (set TEST_POSTGRES_URL or put initdb/pg_ctl on PATH)')
+    url, data_dir = started
+    yield url
+    subprocess.run([shutil.which('pg_ctl'), '-D', data_dir, '-m', 'fast', 'stop'],
+                   capture_output=True)
+
+
+@pytest.fixture
+def postgres_url(postgres_server_url):
+    """URL of a freshly created PostgreSQL database, dropped after the test."""
+    name = f'test_{uuid.uuid4().hex[:12]}'
+    admin = create_engine(postgres_server_url, isolation_level='AUTOCOMMIT')
+    with admin.connect() as conn:
+        conn.execute(text(f"CREATE DATABASE {name} ENCODING 'UTF8' TEMPLATE template0"))
+    yield admin.url.set(database=name).render_as_string(hide_password=False)
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS {name} WITH (FORCE)'))
+    admin.dispose()
+
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def database_url(request, tmp_path):
+    if request.param == 'sqlite':
+        return f"sqlite:///{tmp_path / 'test.db'}"
+    return request.getfixturevalue('postgres_url')
+
+
+@pytest.fixture
+def app(database_url, tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'ACTIVITY_ARCHIVE_DIR': str(tmp_path / 'activity_archive'),
+    })
+    yield app
+    writer = app.extensions.get('activity_writer')
+    if writer is not None:
+        writer.close()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """Test client logged in as the default admin user."""
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'money'})
+    assert response.status_code == 200
+    return client
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Schema migration command line.
+
+Replaces the old standalone migrate_add_*.py scripts: every schema change is
+a numbered migration in app/utils/migrations.py, and the schema_version table
+records which ones this database has.
+
+Usage (from the backend folder):
+    python migrate.py status                  # list migrations and when each was applied
+    python migrate.py upgrade [--target N]    # apply pending migrations (up to N)
+
+prestart.py runs the upgrade (plus default data seeding) on every deploy, so
+this is only needed to inspect a database or to migrate it ahead of a deploy.
+"""
+
+import argparse
+import sys
+
+from app import create_app
+from app.utils import migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply or inspect schema migrations')
+    parser.add_argument('command', choices=('status', 'upgrade'))
+    parser.add_argument('--target', type=int, help='stop after this migration version')
+    parser.add_argument('--batch-size', type=int, help='rows per transaction in backfills')
+    args = parser.parse_args()
+
+    app = create_app({'DB_SETUP_MODE': 'skip', 'ACTIVITY_RETENTION_ENABLED': False})
+
+    if args.command == 'upgrade':
+        applied = migrations.upgrade(app, target=args.target, batch_size=args.batch_size)
+        print(f"✓ {len(applied)} migration(s) applied" if applied else "✓ Database already up to date")
+        return 0
+
+    for step, applied_at in migrations.status(app):
+        state = applied_at.strftime('%Y-%m-%d %H:%M:%S') if applied_at else 'pending'
+        print(f"{step.version:>4}  {state:<19}  {step.description}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Pre-start step: bring the database schema and default data up to date once,
+before the web workers boot.
+
+Creates missing tables, applies pending migrations (app/utils/migrations.py,
+recorded in the schema_version table) and seeds the default admin user and
+categorization rules. Workers started with DB_SETUP_MODE=check then skip all
+of this (and refuse to start against an out-of-date database).
+
+Usage (from the backend folder):
+    python prestart.py            # only when the schema is behind
+    python prestart.py --force    # run the full setup regardless
+"""
+
+import argparse
+import sys
+
+from app import create_app, db
+from app.utils.migrations import SCHEMA_VERSION, current_version
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--force', action='store_true', help='run the setup even if the schema is current')
+    args = parser.parse_args()
+
+    app = create_app({
+        'DB_SETUP_MODE': 'always' if args.force else 'auto',
+        'ACTIVITY_RETENTION_ENABLED': False,
+    })
+    with app.app_context():
+        version = current_version(db.engine)
+        db.engine.dispose()
+    if version < SCHEMA_VERSION:
+        print(f"ERROR: database schema is at version {version}, expected {SCHEMA_VERSION}")
+        return 1
+    print(f"✓ Database ready (schema version {version})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
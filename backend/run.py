@@ -1,7 +1,11 @@
 import os
+import multiprocessing
 from app import create_app
 
-app = create_app()
+# Ingest pool processes (app/utils/ingest_pool.py) are spawned and import
+# this module again; they only need the parsing code, not an app
+if multiprocessing.parent_process() is None:
+    app = create_app()
 
 if __name__ == '__main__':
     # Create data directory if it doesn't exist
@@ -0,0 +1,90 @@
+"""
+Tests for the streaming activity-log export.
+"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.activity_log import ActivityLog
+from app.models.log_settings import LogSettings
+from app.utils import activity_export
+
+
+def _add_logs(app, count):
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.execute(ActivityLog.__table__.insert(), [
+            {'action': 'create' if i % 2 else 'delete', 'category': 'transaction',
+             'description': f'entry {i}', 'username': 'exporter',
+             'created_at': now - timedelta(minutes=count - i)}
+            for i in range(count)
+        ])
+        db.session.commit()
+
+
+def _csv_rows(data):
+    rows = list(csv.reader(io.StringIO(data.decode('utf-8'))))
+    assert rows[0][0] == 'ID'
+    return [r for r in rows[1:] if r[2] == 'exporter']
+
+
+def test_csv_export_streams_in_chunks(app, client, monkeypatch):
+    monkeypatch.setattr(activity_export, 'EXPORT_CHUNK_SIZE', 3)
+    _add_logs(app, 10)
+
+    response = client.get('/api/activity/export?format=csv')
+    assert response.is_streamed
+    rows = _csv_rows(response.data)
+    assert [r[5] for r in rows] == [f'entry {i}' for i in range(9, -1, -1)]
+    assert int(response.headers['X-Export-Max-Id']) >= int(rows[0][0])
+
+
+def test_gzip_export_and_resume(app, client, monkeypatch):
+    monkeypatch.setattr(activity_export, 'EXPORT_CHUNK_SIZE', 4)
+    _add_logs(app, 9)
+
+    response = client.get('/api/activity/export?format=csv&compress=gzip&action=create')
+    assert response.mimetype == 'application/gzip'
+    assert response.headers['Content-Disposition'].endswith('.csv.gz')
+    rows = _csv_rows(gzip.decompress(response.data))
+    assert [r[5] for r in rows] == ['entry 7', 'entry 5', 'entry 3', 'entry 1']
+
+    # Resume below the second row: the rest of the same range
+    resume_from = int(rows[1][0]) - 1
+    response = client.get(f'/api/activity/export?format=csv&action=create&max_id={resume_from}')
+    assert [r[5] for r in _csv_rows(response.data)] == ['entry 3', 'entry 1']
+
+
+def test_json_export_is_valid_and_skips_time_ago(app, client):
+    _add_logs(app, 5)
+    data = json.loads(client.get('/api/activity/export?format=json').data)
+    logs = [log for log in data['logs'] if log['username'] == 'exporter']
+    assert len(logs) == 5 and data['total_records'] == len(data['logs'])
+    assert 'time_ago' not in logs[0] and logs[0]['description'] == 'entry 4'
+
+
+def test_unknown_compression_is_rejected(client):
+    response = client.get('/api/activity/export?compress=lzma')
+    assert response.status_code == 400
+    assert 'gzip' in response.get_json()['available']
+
+
+def test_save_to_local_streams_compressed_file(app, client, tmp_path):
+    _add_logs(app, 6)
+    with app.app_context():
+        settings = LogSettings.get_settings()
+        settings.file_logging_enabled = True
+        settings.log_destination_type = 'local'
+        settings.log_path = str(tmp_path / 'logs')
+        settings.export_format = 'txt'
+        db.session.commit()
+
+    result = client.post('/api/activity/save-to-file', json={'compress': 'gzip'}).get_json()
+    assert result['filepath'].endswith('.txt.gz')
+    with gzip.open(result['filepath'], 'rt', encoding='utf-8') as f:
+        text = f.read()
+    assert text.count('Description: entry') == 6
+    assert f"Total Records: {result['records']}" in text
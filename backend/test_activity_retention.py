@@ -0,0 +1,122 @@
+"""
+Tests for activity-log retention and monthly archival.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import db
+from app.models.activity_log import ActivityLog
+from app.models.log_settings import LogSettings
+from app.utils.activity_retention import run_retention
+
+
+def _add_logs(app, ages_in_days):
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.execute(ActivityLog.__table__.insert(), [
+            {'action': 'create', 'category': 'transaction', 'description': f'entry {i}',
+             'username': 'retention', 'created_at': now - timedelta(days=age)}
+            for i, age in enumerate(ages_in_days)
+        ])
+        db.session.commit()
+
+
+def _set_retention(app, days, auto_cleanup=True):
+    with app.app_context():
+        settings = LogSettings.get_settings()
+        settings.retention_days = days
+        settings.auto_cleanup = auto_cleanup
+        db.session.commit()
+
+
+def _remaining(app):
+    with app.app_context():
+        return ActivityLog.query.filter_by(username='retention').count()
+
+
+def _read_archives(archive_dir):
+    rows = {}
+    for name in sorted(os.listdir(archive_dir)):
+        if name.endswith('.jsonl.gz'):
+            with gzip.open(os.path.join(archive_dir, name), 'rt', encoding='utf-8') as f:
+                rows[name] = [json.loads(line) for line in f]
+    return rows
+
+
+def test_expired_logs_are_archived_by_month_then_deleted(app):
+    _set_retention(app, 30)
+    _add_logs(app, [1, 5, 40, 45, 400, 410])
+    app.config['ACTIVITY_RETENTION_CHUNK_SIZE'] = 2
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('DELETE FROM activity_logs'):
+            statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            status = run_retention(app, wait_for_idle=False)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert status['archived'] == 4 and status['deleted'] == 4
+    assert status['remaining'] == 0 and status['last_error'] is None
+    assert len(statements) == 2
+    assert _remaining(app) == 2
+
+    archives = _read_archives(app.config['ACTIVITY_ARCHIVE_DIR'])
+    archived = [row for rows in archives.values() for row in rows]
+    assert sorted(r['description'] for r in archived) == ['entry 2', 'entry 3', 'entry 4', 'entry 5']
+    for name, rows in archives.items():
+        assert all(name == f"activity_{r['created_at'][:7]}.jsonl.gz" for r in rows)
+
+
+def test_archives_are_appended_across_runs(app):
+    _set_retention(app, 30)
+    _add_logs(app, [60])
+    with app.app_context():
+        run_retention(app, wait_for_idle=False)
+    _add_logs(app, [60])
+    with app.app_context():
+        run_retention(app, wait_for_idle=False)
+
+    archives = _read_archives(app.config['ACTIVITY_ARCHIVE_DIR'])
+    assert sum(len(rows) for rows in archives.values()) == 2
+    assert _remaining(app) == 0
+
+
+def test_auto_cleanup_disabled_keeps_everything(app):
+    _set_retention(app, 30, auto_cleanup=False)
+    _add_logs(app, [100, 200])
+    with app.app_context():
+        status = run_retention(app, wait_for_idle=False)
+    assert status['skipped'] == 'auto_cleanup is disabled'
+    assert _remaining(app) == 2
+
+
+def test_retention_endpoints(app, client):
+    _set_retention(app, 30)
+    _add_logs(app, [50, 2])
+    app.config['ACTIVITY_ARCHIVE_ENABLED'] = False
+
+    result = client.post('/api/activity/retention/run').get_json()
+    assert result['status']['deleted'] == 1 and result['status']['archived'] == 0
+    assert not os.path.exists(app.config['ACTIVITY_ARCHIVE_DIR']) or not _read_archives(app.config['ACTIVITY_ARCHIVE_DIR'])
+
+    status = client.get('/api/activity/retention').get_json()
+    assert status['running'] is False and status['deleted'] == 1
+    assert _remaining(app) == 1
+
+
+def test_clear_endpoint_deletes_in_chunks(app, client):
+    _add_logs(app, [20, 21, 22, 23, 24, 1])
+    app.config['ACTIVITY_RETENTION_CHUNK_SIZE'] = 2
+    result = client.delete('/api/activity/clear?days=10').get_json()
+    assert result['deleted_count'] == 5
+    assert _remaining(app) == 1
@@ -0,0 +1,134 @@
+"""
+Tests for keyset pagination, counter-backed totals and stats in the activity viewer.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.activity_daily_count import ActivityDailyCount
+from app.models.activity_log import ActivityLog
+from app.utils.activity_counters import rebuild_counters
+from app.utils.activity_retention import purge_activity_logs
+from app.utils.activity_writer import get_activity_writer
+
+
+def _write(app, entries):
+    """Write entries through the activity writer so the counters follow."""
+    with app.app_context():
+        writer = get_activity_writer()
+        for entry in entries:
+            writer.submit(dict({'details': None, 'user_id': None, 'ip_address': None}, **entry))
+        writer.flush()
+
+
+def _entries(count, now, **overrides):
+    return [dict({'action': 'create', 'category': 'transaction', 'description': f'entry {i}',
+                  'username': 'viewer', 'created_at': now - timedelta(hours=i // 2)}, **overrides)
+            for i in range(count)]
+
+
+def _counter_rows(app):
+    with app.app_context():
+        return sorted((str(r.day), r.category, r.action, r.count)
+                      for r in ActivityDailyCount.query.all())
+
+
+def test_cursor_pages_cover_every_row_once(app, client):
+    # Pairs of entries share a timestamp, so ties must be broken by id
+    _write(app, _entries(11, datetime.utcnow()))
+
+    seen, cursor = [], None
+    while True:
+        url = '/api/activity/?per_page=4&username=viewer'
+        if cursor:
+            url += f'&cursor={cursor}'
+        data = client.get(url).get_json()
+        seen.extend(a['description'] for a in data['activities'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+        assert len(data['activities']) == 4
+
+    assert sorted(seen) == sorted(f'entry {i}' for i in range(11))
+    assert len(seen) == len(set(seen))
+    assert data['total'] == 11 and data['pages'] == 3
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get('/api/activity/?cursor=nonsense').status_code == 400
+
+
+def test_totals_come_from_counters(app, client):
+    now = datetime.utcnow()
+    _write(app, _entries(3, now) + _entries(2, now, category='upload', action='upload'))
+
+    def total(query):
+        return client.get(f'/api/activity/?{query}').get_json()['total']
+
+    assert total('category=upload') == 2
+    assert total('category=transaction&action=create') >= 3
+    day = now.strftime('%Y-%m-%d')
+    assert total(f'category=upload&start_date={day}&end_date={day}') == 2
+    assert total('category=upload&start_date=2000-01-01&end_date=2000-01-02') == 0
+
+
+def test_stats_match_a_full_recount(app, client):
+    now = datetime.utcnow()
+    _write(app, _entries(4, now) + _entries(3, now - timedelta(days=3), action='delete')
+           + _entries(2, now - timedelta(days=30), category='user'))
+
+    stats = client.get('/api/activity/stats').get_json()
+    with app.app_context():
+        week_ago = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=7)
+        assert stats['total_week'] == ActivityLog.query.filter(ActivityLog.created_at >= week_ago).count()
+    assert stats['by_action']['delete'] == 3
+    assert 'user' not in stats['by_category']
+
+    incremental = _counter_rows(app)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            rebuild_counters(conn)
+    assert _counter_rows(app) == incremental
+
+
+def test_purge_decrements_counters(app):
+    now = datetime.utcnow()
+    _write(app, _entries(3, now - timedelta(days=40)) + _entries(2, now))
+    with app.app_context():
+        purge_activity_logs(now - timedelta(days=30), chunk_size=2)
+        remaining = ActivityLog.query.count()
+        counted = sum(r.count for r in ActivityDailyCount.query.all())
+    assert counted == remaining
+    assert all(day >= str((now - timedelta(days=30)).date()) for day, _, _, _ in _counter_rows(app))
+
+
+@pytest.mark.parametrize('query', ['category=auth&action=login', 'action=login', 'username=admin'])
+def test_filtered_pages_use_indexes(app, client, query, database_url):
+    if not database_url.startswith('sqlite'):
+        pytest.skip('EXPLAIN QUERY PLAN output is SQLite-specific')
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith('SELECT') and 'FROM activity_logs' in statement \
+                and 'LIMIT' in statement:
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        assert client.get(f'/api/activity/?{query}').status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert statements
+    with app.app_context():
+        with db.engine.connect() as conn:
+            for statement, parameters in statements:
+                plan = [row[3] for row in conn.exec_driver_sql(
+                    f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                assert not any(p.startswith('SCAN activity_logs') for p in plan), plan
+                assert not any('TEMP B-TREE' in p for p in plan), plan
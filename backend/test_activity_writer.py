@@ -0,0 +1,108 @@
+"""
+Tests for the buffered activity-log writer.
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import db
+from app.models.activity_log import ActivityLog
+from app.utils.activity_writer import ActivityLogWriter
+
+
+def _entry(i):
+    return {'action': 'create', 'category': 'transaction', 'description': f'entry {i}',
+            'details': None, 'user_id': None, 'username': 'tester', 'ip_address': None,
+            'created_at': datetime.utcnow()}
+
+
+def _log_count(app):
+    with app.app_context():
+        return ActivityLog.query.filter_by(username='tester').count()
+
+
+def _reset_writer(app):
+    # Pick up changed ACTIVITY_LOG_* config on next use
+    writer = app.extensions.pop('activity_writer', None)
+    if writer is not None:
+        writer.close()
+
+
+def _writer(app, **kwargs):
+    with app.app_context():
+        return ActivityLogWriter(db.engine, **kwargs)
+
+
+def test_entries_are_written_in_batches(app):
+    writer = _writer(app, batch_size=4, flush_interval=60)
+    inserts = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO activity_logs'):
+            inserts.append(executemany)
+
+    event.listen(writer.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for i in range(10):
+            writer.submit(_entry(i))
+        writer.close()
+    finally:
+        event.remove(writer.engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert _log_count(app) == 10
+    assert len(inserts) == 3
+    assert writer.stats()['written'] == 10
+
+
+def test_background_thread_flushes_on_batch_size(app):
+    writer = _writer(app, batch_size=3, flush_interval=60)
+    try:
+        for i in range(3):
+            writer.submit(_entry(i))
+        deadline = time.monotonic() + 5
+        while writer.stats()['written'] < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert _log_count(app) == 3
+    finally:
+        writer.close()
+
+
+def test_full_buffer_drops_and_counts(app):
+    writer = _writer(app, buffer_size=5, batch_size=100, flush_interval=60)
+    try:
+        accepted = [writer.submit(_entry(i)) for i in range(8)]
+        assert accepted == [True] * 5 + [False] * 3
+        assert writer.stats()['dropped'] == 3
+    finally:
+        writer.close()
+    assert _log_count(app) == 5
+
+
+def test_requests_do_not_write_logs_synchronously(app, client):
+    app.config['ACTIVITY_LOG_FLUSH_SECONDS'] = 60
+    app.config['ACTIVITY_LOG_BATCH_SIZE'] = 1000
+    with app.app_context():
+        _reset_writer(app)
+        before = ActivityLog.query.count()
+
+    client.delete('/api/transactions/clear/by-date?date=2024-01-01')
+    with app.app_context():
+        assert ActivityLog.query.count() == before
+
+    # The activity viewer writes pending entries before reading
+    activities = client.get('/api/activity/').get_json()['activities']
+    assert activities[0]['action'] == 'bulk_delete'
+
+    stats = client.get('/api/activity/writer-stats').get_json()
+    assert stats['queued'] == 0 and stats['dropped'] == 0
+
+
+def test_synchronous_mode(app, client):
+    app.config['ACTIVITY_LOG_ASYNC'] = False
+    with app.app_context():
+        _reset_writer(app)
+        before = ActivityLog.query.count()
+    client.delete('/api/transactions/clear/by-date?date=2024-01-01')
+    with app.app_context():
+        assert ActivityLog.query.count() == before + 1
@@ -0,0 +1,82 @@
+"""
+Tests for the cached per-request auth context.
+"""
+from sqlalchemy import event
+
+from app import db
+from app.models.user import User
+
+
+def _user_queries(app, client, method, url, **kwargs):
+    """Issue a request and return (response, number of SELECTs on users)."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM users' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.open(url, method=method, **kwargs)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return response, len(statements)
+
+
+def _login_as(app, username, role):
+    with app.app_context():
+        user = User(username=username, role=role)
+        user.set_password('pw12')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    client = app.test_client()
+    assert client.post('/api/auth/login', json={'username': username, 'password': 'pw12'}).status_code == 200
+    return client, user_id
+
+
+def test_users_me_is_served_from_cache(app, client):
+    response, first = _user_queries(app, client, 'GET', '/api/users/me')
+    assert response.status_code == 200
+    assert response.get_json()['username'] == 'admin'
+    assert first <= 1
+
+    response, repeat = _user_queries(app, client, 'GET', '/api/users/me')
+    assert response.status_code == 200
+    assert repeat == 0
+
+
+def test_write_decorator_reuses_request_context(app, client):
+    # write_required on a cached user needs no users query at all
+    client.get('/api/users/me')
+    response, queries = _user_queries(app, client, 'PUT', '/api/transactions/exclude/999999')
+    assert response.status_code == 404
+    assert queries == 0
+
+
+def test_role_change_takes_effect_immediately(app, client):
+    other, user_id = _login_as(app, 'editor', 'standard')
+    assert other.delete('/api/transactions/bulk-delete/', json={'transaction_ids': [1]}).status_code == 404
+
+    assert client.put(f'/api/users/{user_id}', json={'role': 'viewer'}).status_code == 200
+    response = other.delete('/api/transactions/bulk-delete/', json={'transaction_ids': [1]})
+    assert response.status_code == 403
+    assert other.get('/api/users/me').get_json()['role'] == 'viewer'
+
+
+def test_session_timeout_update_refreshes_profile(app, client):
+    assert client.get('/api/users/me').get_json()['session_timeout'] == 15
+    assert client.put('/api/auth/session-config', json={'session_timeout': 45}).status_code == 200
+    assert client.get('/api/users/me').get_json()['session_timeout'] == 45
+    assert client.get('/api/auth/session-config').get_json()['session_timeout'] == 45
+
+
+def test_deleted_user_loses_access(app, client):
+    other, user_id = _login_as(app, 'leaver', 'standard')
+    assert other.get('/api/users/me').status_code == 200
+
+    assert client.delete(f'/api/users/{user_id}').status_code == 200
+    assert other.get('/api/users/me').status_code == 404
+    assert other.get('/api/auth/me').status_code == 401
@@ -0,0 +1,82 @@
+"""
+Tests for the Badí' calendar lookup table, Naw-Rúz dates and array conversion.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils import badi_calendar
+from app.utils.badi_calendar import (
+    BadiTable, ayyam_i_ha_days, badi_to_gregorian, get_naw_ruz,
+    gregorian_to_badi, gregorian_to_badi_array,
+)
+
+# Naw-Rúz 2015-2030 (172-187 BE)
+NAW_RUZ = {2015: 21, 2016: 20, 2017: 20, 2018: 21, 2019: 21, 2020: 20, 2021: 20, 2022: 21,
+           2023: 21, 2024: 20, 2025: 20, 2026: 21, 2027: 21, 2028: 20, 2029: 20, 2030: 20}
+
+
+def test_naw_ruz_dates():
+    assert {y: get_naw_ruz(y).day for y in NAW_RUZ} == NAW_RUZ
+    assert get_naw_ruz(1844) == date(1844, 3, 21)
+    assert get_naw_ruz(2014) == date(2014, 3, 21)
+
+
+def test_computed_naw_ruz_matches_published_years():
+    # Outside 2026, where the equinox falls within a minute of sunset, the
+    # equinox computation agrees with the published table
+    for offset, digit in enumerate(badi_calendar.PUBLISHED_NAW_RUZ):
+        year = badi_calendar.PUBLISHED_NAW_RUZ_FROM + offset
+        if year != 2026:
+            assert badi_calendar._astronomical_naw_ruz(year) == date(year, 3, 20 + int(digit)), year
+
+
+def test_ayyam_i_ha_follows_year_length():
+    # 182 BE runs from 2025-03-20 to 2026-03-20: 366 days
+    assert ayyam_i_ha_days(182) == 5 and ayyam_i_ha_days(181) == 4
+    assert gregorian_to_badi(date(2026, 2, 25)) == (182, 0, 1)
+    assert gregorian_to_badi(date(2026, 3, 1)) == (182, 0, 5)
+    assert gregorian_to_badi(date(2026, 3, 2)) == (182, 19, 1)
+    assert gregorian_to_badi(date(2026, 3, 20)) == (182, 19, 19)
+    assert gregorian_to_badi(date(2026, 3, 21)) == (183, 1, 1)
+
+
+def test_table_matches_direct_conversion_and_round_trips():
+    table = BadiTable(1990, 2070)
+    day = date(1990, 1, 1)
+    while day <= date(2070, 12, 31):
+        expected = badi_calendar._gregorian_to_badi_direct(day)
+        assert table.lookup(day.toordinal()) == expected, day
+        assert badi_to_gregorian(*expected) == day
+        day += timedelta(days=1)
+    assert table.lookup(date(1989, 12, 31).toordinal()) is None
+
+
+def test_dates_outside_the_table_span():
+    assert gregorian_to_badi(date(1850, 5, 1)) == (7, 3, 4)
+    assert badi_to_gregorian(457, 1, 5) == get_naw_ruz(2300) + timedelta(days=4)
+    assert gregorian_to_badi(get_naw_ruz(2300) + timedelta(days=4)) == (457, 1, 5)
+
+
+@pytest.mark.parametrize('values', [
+    lambda days: pd.Series(pd.to_datetime(days)),
+    lambda days: np.array(days, dtype='datetime64[D]'),
+    lambda days: [date.fromisoformat(d) for d in days],
+])
+def test_array_conversion_matches_scalar(values):
+    days = ['2024-03-19', '2024-03-20', '2026-02-26', '1850-05-01', '2300-03-25']
+    years, months, day_numbers = gregorian_to_badi_array(values(days))
+    expected = [gregorian_to_badi(date.fromisoformat(d)) for d in days]
+    assert list(zip(years.tolist(), months.tolist(), day_numbers.tolist())) == expected
+
+
+def test_array_conversion_leaves_missing_dates_zero():
+    years, months, days = gregorian_to_badi_array(pd.Series(pd.to_datetime(['2024-03-20', None])))
+    assert years.tolist() == [181, 0] and months.tolist() == [1, 0] and days.tolist() == [1, 0]
+
+
+def test_naw_ruz_endpoint(client):
+    dates = client.get('/api/calendar/badi/naw-ruz?start=2025&end=2027').get_json()
+    assert dates == {'2025': '2025-03-20', '2026': '2026-03-21', '2027': '2027-03-21'}
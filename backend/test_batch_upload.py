@@ -0,0 +1,135 @@
+"""
+Tests for the multi-file / ZIP batch upload endpoint (/api/uploads/batch).
+"""
+import io
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from app.models.transaction import Transaction
+from app.models.upload import Upload
+
+CARD_HEADERS = ['Posted', 'Merchant', 'Charge', 'Card Member']
+
+
+def _card_csv(rows, month=1):
+    frame = pd.DataFrame({
+        'Posted': [f'2025-{month:02d}-{day % 28 + 1:02d}' for day in range(rows)],
+        'Merchant': [f'Store {month}-{i}' for i in range(rows)],
+        'Charge': [f'-{i + 1}.00' for i in range(rows)],
+        'Card Member': ['J DOE'] * rows,
+    })
+    return frame.to_csv(index=False).encode()
+
+
+def _generic_xlsx(rows):
+    buffer = io.BytesIO()
+    pd.DataFrame({
+        'Date': ['2025-03-01'] * rows,
+        'Description': [f'Paycheck {i}' for i in range(rows)],
+        'Amount': [1000.0 + i for i in range(rows)],
+    }).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _create_card_template(client):
+    response = client.post('/api/bank-templates/', json={
+        'name': 'Card Co', 'headers': CARD_HEADERS,
+        'column_mapping': {'date_col': 'Posted', 'description_col': 'Merchant', 'amount_col': 'Charge'}})
+    assert response.status_code == 201
+
+
+def _post(client, files):
+    return client.post('/api/uploads/batch', content_type='multipart/form-data',
+                       data={'files': [(io.BytesIO(content), name) for name, content in files]})
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_batch_stores_each_file_as_its_own_upload(app, client, workers):
+    _create_card_template(client)
+    app.config['INGEST_WORKERS'] = workers
+    archive = _zip({
+        'statements/feb.csv': _card_csv(4, month=2),
+        'statements/payroll.xlsx': _generic_xlsx(2),
+        'statements/readme.txt': b'not a statement',
+        'statements/broken.xlsx': b'not a workbook',
+        '__MACOSX/statements/._feb.csv': b'resource fork',
+    })
+    try:
+        response = _post(client, [('jan.csv', _card_csv(3)), ('year.zip', archive)])
+    finally:
+        pool = app.extensions.pop('ingest_pool', None)
+        if pool is not None:
+            pool.close()
+    assert response.status_code == 201, response.get_json()
+    body = response.get_json()
+
+    by_name = {f['filename']: f for f in body['files']}
+    assert [f['filename'] for f in body['files']] == ['jan.csv', 'feb.csv', 'payroll.xlsx', 'readme.txt',
+                                                      'broken.xlsx']
+    assert by_name['jan.csv']['status'] == 'completed' and by_name['jan.csv']['template'] == 'Card Co'
+    assert by_name['feb.csv']['archive'] == 'year.zip' and by_name['feb.csv']['transactions_created'] == 4
+    assert by_name['payroll.xlsx']['template'] is None and by_name['payroll.xlsx']['transactions_created'] == 2
+    assert by_name['readme.txt']['status'] == 'skipped'
+    assert by_name['broken.xlsx']['status'] == 'failed'
+    assert body['files_completed'] == 3 and body['transactions_created'] == 9
+    # Scratch copies of the files and ZIP members are gone
+    assert os.listdir(app.config['UPLOAD_FOLDER']) == []
+
+    with app.app_context():
+        uploads = {u.original_filename: u for u in Upload.query.all()}
+        assert set(uploads) == {'jan.csv', 'feb.csv', 'payroll.xlsx'}
+        assert uploads['feb.csv'].transaction_count == 4
+        feb = Transaction.query.filter_by(upload_id=uploads['feb.csv'].id).order_by(Transaction.id).all()
+        assert [t.description for t in feb] == [f'Store 2-{i}' for i in range(4)]
+        assert {t.bank_source for t in feb} == {'Card Co'}
+        assert feb[0].notes == 'Card Member: J DOE'
+
+
+def test_batch_limits(app, client):
+    app.config.update(UPLOAD_BATCH_MAX_FILES=2, UPLOAD_ZIP_MAX_BYTES=1000)
+    archive = _zip({'big.csv': _card_csv(200)})
+    response = _post(client, [('a.csv', _card_csv(1)), ('big.zip', archive), ('c.csv', _card_csv(1))])
+    assert response.status_code == 201
+    statuses = [(f['filename'], f['status']) for f in response.get_json()['files']]
+    assert statuses == [('a.csv', 'completed'), ('big.csv', 'failed'), ('c.csv', 'skipped')]
+
+    assert _post(client, [('only.zip', b'not a zip')]).status_code == 400
+    assert client.post('/api/uploads/batch', content_type='multipart/form-data', data={}).status_code == 400
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_batch_stages_only_what_is_being_parsed(app, client, monkeypatch, workers):
+    from app.routes import uploads
+
+    app.config['INGEST_WORKERS'] = workers
+    on_disk = []
+    store_upload = uploads._store_upload
+
+    def watched(*args, **kwargs):
+        on_disk.append(len(os.listdir(app.config['UPLOAD_FOLDER'])))
+        return store_upload(*args, **kwargs)
+    monkeypatch.setattr(uploads, '_store_upload', watched)
+
+    archive = _zip({f'month_{month:02d}.csv': _card_csv(2, month=month) for month in range(1, 9)})
+    try:
+        response = _post(client, [('year.zip', archive)])
+    finally:
+        pool = app.extensions.pop('ingest_pool', None)
+        if pool is not None:
+            pool.close()
+    assert response.status_code == 201
+    assert response.get_json()['files_completed'] == 8
+    # Each file is removed once stored, and staging stays one file per worker ahead
+    assert len(on_disk) == 8 and 1 <= max(on_disk) <= max(workers, 1)
+    assert os.listdir(app.config['UPLOAD_FOLDER']) == []
@@ -0,0 +1,131 @@
+"""
+Tests for the set-based bulk delete and clear endpoints.
+"""
+import io
+from datetime import date, timedelta
+
+import pytest
+
+from app import db
+from app.models.category import Category
+from app.models.excluded_expense import ExcludedExpense
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.utils import bulk_delete
+
+START = date(2024, 3, 1)
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Force several chunks per request
+    monkeypatch.setattr(bulk_delete, 'DELETE_CHUNK_SIZE', 3)
+
+
+def _seed(app, username, days=10):
+    """One transaction per day from START for `username`; return their ids."""
+    with app.app_context():
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            user = User(username=username, role='standard')
+            user.set_password('pw')
+            db.session.add(user)
+            db.session.flush()
+        category = Category(name=f'Bulk {username}', type='expense', user_id=user.id)
+        db.session.add(category)
+        db.session.flush()
+        transactions = [
+            Transaction(description=f'{username} purchase {i}', amount=5 + i, type='expense',
+                        date=START + timedelta(days=i), category_id=category.id, user_id=user.id)
+            for i in range(days)
+        ]
+        db.session.add_all(transactions)
+        db.session.flush()
+        db.session.add(ExcludedExpense(transaction_id=transactions[0].id, user_id=user.id))
+        db.session.commit()
+        return [t.id for t in transactions]
+
+
+def _remaining(app, username):
+    with app.app_context():
+        user = User.query.filter_by(username=username).first()
+        return Transaction.query.filter_by(user_id=user.id).count()
+
+
+def test_bulk_delete_is_user_scoped(app, client):
+    mine = _seed(app, 'admin')
+    theirs = _seed(app, 'other')
+
+    response = client.delete('/api/transactions/bulk-delete/',
+                             json={'transaction_ids': mine[:7] + theirs})
+    assert response.status_code == 200
+    assert response.get_json()['deleted_count'] == 7
+    assert _remaining(app, 'admin') == 3
+    assert _remaining(app, 'other') == 10
+
+    with app.app_context():
+        # The exclusion that pointed at a deleted transaction went with it
+        assert ExcludedExpense.query.filter_by(transaction_id=mine[0]).count() == 0
+        assert ExcludedExpense.query.filter_by(transaction_id=theirs[0]).count() == 1
+
+
+def test_bulk_delete_of_foreign_ids_is_not_found(app, client):
+    theirs = _seed(app, 'other')
+    response = client.delete('/api/transactions/bulk-delete/', json={'transaction_ids': theirs})
+    assert response.status_code == 404
+    assert _remaining(app, 'other') == 10
+
+
+def test_bulk_delete_by_file_is_user_scoped(app, client):
+    mine = _seed(app, 'admin')
+    theirs = _seed(app, 'other')
+    ids = '\n'.join(str(i) for i in mine[:4] + theirs[:4])
+    response = client.post('/api/transactions/bulk-delete-by-file/',
+                           data={'file': (io.BytesIO(f'id\n{ids}\n'.encode()), 'ids.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['deleted_count'] == 4
+    assert _remaining(app, 'other') == 10
+
+
+def test_clear_by_date(app, client):
+    _seed(app, 'admin')
+    _seed(app, 'other')
+    day = (START + timedelta(days=2)).isoformat()
+
+    preview = client.get(f'/api/transactions/clear/preview?type=date&date={day}').get_json()
+    response = client.delete(f'/api/transactions/clear/by-date?date={day}')
+    assert response.get_json()['deleted_count'] == preview['count'] == 1
+    assert _remaining(app, 'admin') == 9
+    assert _remaining(app, 'other') == 10
+
+
+def test_clear_by_period(app, client):
+    _seed(app, 'admin')
+    _seed(app, 'other')
+    start, end = START.isoformat(), (START + timedelta(days=7)).isoformat()
+
+    preview = client.get(f'/api/transactions/clear/preview?type=period'
+                         f'&start_date={start}&end_date={end}').get_json()
+    response = client.delete(f'/api/transactions/clear/by-period?start_date={start}&end_date={end}')
+    assert response.status_code == 200
+    assert response.get_json()['deleted_count'] == preview['count'] == 8
+    assert _remaining(app, 'admin') == 2
+    assert _remaining(app, 'other') == 10
+
+    with app.app_context():
+        assert ExcludedExpense.query.join(
+            Transaction, ExcludedExpense.transaction_id == Transaction.id, isouter=True
+        ).filter(Transaction.id.is_(None)).count() == 0
+
+
+def test_clear_all_only_clears_the_callers_transactions(app, client):
+    _seed(app, 'admin')
+    _seed(app, 'other')
+
+    preview = client.get('/api/transactions/clear/preview?type=all').get_json()
+    response = client.delete('/api/transactions/clear/all')
+    assert response.status_code == 200
+    assert response.get_json()['deleted_count'] == preview['count'] == 10
+    assert _remaining(app, 'admin') == 0
+    assert _remaining(app, 'other') == 10
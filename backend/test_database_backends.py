@@ -0,0 +1,91 @@
+"""
+Backend-agnostic database behaviour, exercised against every backend in
+conftest.py (SQLite always, PostgreSQL when available).
+"""
+import io
+import shutil
+from datetime import date
+
+import pytest
+from sqlalchemy import inspect
+
+from app import create_app, db, MANAGED_INDEXES
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.user import User
+
+
+def _add_transaction(app, description='Coffee', amount=4.5):
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        category = Category.query.filter_by(user_id=admin.id, name='Backend Test').first()
+        if not category:
+            category = Category(name='Backend Test', type='expense', user_id=admin.id)
+            db.session.add(category)
+            db.session.flush()
+        t = Transaction(description=description, amount=amount, type='expense',
+                        date=date.today(), category_id=category.id, user_id=admin.id)
+        db.session.add(t)
+        db.session.commit()
+        return t.id
+
+
+def test_migrations_are_idempotent(app, database_url, tmp_path):
+    # A second start against the same database must find nothing to do
+    create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': database_url,
+                'UPLOAD_FOLDER': str(tmp_path / 'uploads')})
+
+    with app.app_context():
+        inspector = inspect(db.engine)
+        assert 'session_timeout' in {c['name'] for c in inspector.get_columns('users')}
+        plan_cols = {c['name'] for c in inspector.get_columns('budget_plan_items')}
+        assert {'group_name', 'consolidated_category_ids'} <= plan_cols
+        for name, table, _ in MANAGED_INDEXES:
+            assert name in {ix['name'] for ix in inspector.get_indexes(table)}
+
+
+def test_reports_on_backend(app, client):
+    _add_transaction(app, amount=12.5)
+    _add_transaction(app, amount=7.5)
+
+    summary = client.get('/api/reports/summary?period=monthly').get_json()
+    assert summary['total_expense'] == pytest.approx(20.0)
+    assert summary['transaction_count'] == 2
+
+    by_category = client.get('/api/reports/by-category?period=monthly&type=expense').get_json()
+    assert by_category['categories'][0]['category'] == 'Backend Test'
+
+
+def test_backup_and_restore_roundtrip(app, client):
+    with app.app_context():
+        if db.engine.dialect.name == 'postgresql' and not shutil.which('pg_dump'):
+            pytest.skip('pg_dump/pg_restore not on PATH')
+
+    kept_id = _add_transaction(app, 'Before backup')
+
+    response = client.get('/api/status/settings/db/backup')
+    assert response.status_code == 200
+    backup = response.get_data()
+    assert backup
+
+    _add_transaction(app, 'After backup')
+    with app.app_context():
+        assert Transaction.query.count() == 2
+
+    response = client.post('/api/status/settings/db/restore',
+                           data={'file': (io.BytesIO(backup), 'backup')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    with app.app_context():
+        assert [t.id for t in Transaction.query.all()] == [kept_id]
+
+
+def test_restore_rejects_garbage(app, client):
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            pytest.skip('header validation is SQLite-specific')
+    response = client.post('/api/status/settings/db/restore',
+                           data={'file': (io.BytesIO(b'not a database'), 'backup.db')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
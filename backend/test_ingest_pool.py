@@ -0,0 +1,109 @@
+"""
+Tests for the ingest process pool (app/utils/ingest_pool.py) and the
+categorizer snapshot it sends to the workers.
+"""
+import io
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from app import db
+from app.models.categorization_rule import CategorizationRule
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.utils.file_processor import (CategorizerSnapshot, categorize_transaction, parse_csv_rows,
+                                      process_csv_file, process_excel_file)
+from app.utils.ingest_pool import IngestPool, csv_ranges
+
+MAPPING = {'date_col': 'Date', 'description_col': 'Description', 'amount_col': 'Amount'}
+NO_RULES = CategorizerSnapshot([], [], 1, {}, {})
+
+
+def _write_statement(tmp_path, rows):
+    start = date(2025, 1, 1)
+    frame = pd.DataFrame({
+        'Date': [(start + timedelta(days=i % 300)).isoformat() for i in range(rows)],
+        'Description': [f'PAYEE {i}' if i % 7 else f'MULTI\nLINE "{i}", QUOTED' for i in range(rows)],
+        'Amount': [f'{(-1) ** i * (i + 0.25):.2f}' for i in range(rows)],
+        'Memo': [f'memo {i}' for i in range(rows)],
+    })
+    frame.to_csv(tmp_path / 'statement.csv', index=False)
+    frame.to_excel(tmp_path / 'statement.xlsx', index=False)
+    return tmp_path / 'statement.csv', tmp_path / 'statement.xlsx'
+
+
+def test_csv_ranges_end_on_record_boundaries(tmp_path):
+    csv_path, _ = _write_statement(tmp_path, 200)
+    expected = process_csv_file(str(csv_path), column_mapping=MAPPING, categorizer=NO_RULES)
+    assert len(expected) == 200
+
+    content = csv_path.read_bytes()
+    for parts in (1, 2, 3, 7):
+        header, ranges = csv_ranges(str(csv_path), parts, min_bytes=1)
+        assert len(ranges) == parts
+        assert header + b''.join(content[start:end] for start, end in ranges) == content
+        parsed = []
+        for start, end in ranges:
+            stream = io.TextIOWrapper(io.BytesIO(header + content[start:end]), encoding='utf-8')
+            parsed.extend(parse_csv_rows(stream, column_mapping=MAPPING, categorizer=NO_RULES))
+        assert parsed == expected
+
+    # Small files stay in one piece
+    assert len(csv_ranges(str(csv_path), 4, min_bytes=len(content))[1]) == 1
+
+
+def test_pool_parses_like_the_request_thread(tmp_path):
+    csv_path, xlsx_path = _write_statement(tmp_path, 300)
+    (tmp_path / 'broken.xlsx').write_bytes(b'not a workbook')
+    pool = IngestPool(workers=2, split_bytes=1024)
+    try:
+        files = [(str(csv_path), 'csv', MAPPING), (str(tmp_path / 'broken.xlsx'), 'xlsx', MAPPING),
+                 (str(xlsx_path), 'xlsx', MAPPING)]
+        results = {index: (rows, error) for index, rows, error in pool.parse(files, NO_RULES)}
+    finally:
+        pool.close()
+
+    assert results[0] == (process_csv_file(str(csv_path), column_mapping=MAPPING, categorizer=NO_RULES), None)
+    assert results[1][0] is None and 'Error processing Excel' in str(results[1][1])
+    assert results[2] == (process_excel_file(str(xlsx_path), column_mapping=MAPPING, categorizer=NO_RULES), None)
+    assert len(results[2][0]) == 300
+
+
+def test_snapshot_matches_categorize_transaction(app):
+    descriptions = ['WHOLE FOODS #12', 'Shell Oil 5531', 'Landlord rent March', 'ACME PAYROLL',
+                    'Coffee Corner', 'Nothing to see', 'netflix.com', 'Totally custom vendor']
+    with app.app_context():
+        user = User.query.filter_by(username='admin').one()
+        housing = Category.query.filter_by(name='Housing', user_id=None).one()
+        db.session.add(CategorizationRule(name='Custom', keywords='custom vendor, coffee', category_id=housing.id,
+                                          priority=99, user_id=user.id))
+        db.session.commit()
+
+        snapshot = CategorizerSnapshot.load(user.id)
+        for user_id, categorizer in ((user.id, snapshot), (None, CategorizerSnapshot.load())):
+            assert [categorizer.categorize(d) for d in descriptions] == \
+                [categorize_transaction(d, user_id=user_id) for d in descriptions]
+        assert snapshot.template_category(' housing ') == housing.id
+        assert snapshot.template_category('No such category') is None
+
+
+def test_upload_parses_in_the_pool(app, client, tmp_path):
+    csv_path, _ = _write_statement(tmp_path, 120)
+    app.config.update(INGEST_WORKERS=2, INGEST_SPLIT_BYTES=512)
+    try:
+        response = client.post('/api/uploads/upload', content_type='multipart/form-data', data={
+            'file': (io.BytesIO(csv_path.read_bytes()), 'statement.csv')})
+        assert response.status_code == 201, response.get_json()
+        assert response.get_json()['transactions_created'] == 120
+        assert app.extensions['ingest_pool'] is not None
+    finally:
+        pool = app.extensions.pop('ingest_pool', None)
+        if pool is not None:
+            pool.close()
+
+    with app.app_context():
+        stored = Transaction.query.order_by(Transaction.id).all()
+        assert [t.description for t in stored[:2]] == ['MULTI\nLINE "0", QUOTED', 'PAYEE 1']
+        assert stored[1].amount == pytest.approx(1.25) and stored[1].type == 'expense'
@@ -0,0 +1,85 @@
+"""
+Tests for the opt-in request/query instrumentation and /api/status/metrics.
+"""
+import logging
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app, db
+
+
+@pytest.fixture
+def instrumented(database_url, tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'INSTRUMENTATION_ENABLED': True,
+        'N_PLUS_ONE_THRESHOLD': 5,
+    })
+
+    @app.route('/api/test/lookups')
+    def lookups():
+        for i in range(6):
+            db.session.execute(text('SELECT :i'), {'i': i}).all()
+        return {'done': True}
+
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def _metric(body, name, endpoint):
+    for line in body.splitlines():
+        if line.startswith(f'expense_tracker_{name}{{') and f'endpoint="{endpoint}"' in line:
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+def test_queries_rows_and_n_plus_one_are_counted(instrumented, caplog):
+    client = instrumented.test_client()
+    with caplog.at_level(logging.WARNING, logger=instrumented.logger.name):
+        assert client.get('/api/test/lookups').status_code == 200
+        client.get('/api/test/lookups')
+
+    body = client.get('/api/status/metrics').get_data(as_text=True)
+    assert _metric(body, 'request_duration_seconds_count', 'lookups') == 2
+    assert _metric(body, 'request_queries_total', 'lookups') >= 12
+    assert _metric(body, 'request_rows_total', 'lookups') >= 12
+    assert _metric(body, 'request_n_plus_one_total', 'lookups') == 2
+    assert _metric(body, 'request_db_seconds_total', 'lookups') > 0
+    assert 'Possible N+1 in GET lookups: statement ran 6 times' in caplog.text
+
+
+def test_scrapes_are_not_measured(instrumented):
+    client = instrumented.test_client()
+    client.get('/api/test/lookups')
+    client.get('/api/status/metrics')
+    body = client.get('/api/status/metrics').get_data(as_text=True)
+    assert _metric(body, 'request_duration_seconds_count', 'lookups') == 1
+    assert 'status.get_metrics' not in body
+
+
+def test_slow_requests_are_logged_with_top_queries(instrumented, caplog):
+    instrumented.extensions['instrumentation'].slow_request_ms = 0
+    client = instrumented.test_client()
+    with caplog.at_level(logging.WARNING, logger=instrumented.logger.name):
+        client.get('/api/test/lookups')
+    assert 'Slow request GET /api/test/lookups (lookups)' in caplog.text
+    assert 'x6: SELECT' in caplog.text
+    body = client.get('/api/status/metrics').get_data(as_text=True)
+    assert _metric(body, 'request_slow_total', 'lookups') == 1
+
+
+def test_metrics_token(instrumented):
+    instrumented.config['METRICS_TOKEN'] = 'secret'
+    client = instrumented.test_client()
+    assert client.get('/api/status/metrics').status_code == 401
+    response = client.get('/api/status/metrics', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+
+
+def test_metrics_disabled_by_default(client):
+    assert client.get('/api/status/metrics').status_code == 404
@@ -0,0 +1,120 @@
+"""
+Tests for the versioned schema migration runner.
+"""
+from datetime import date
+
+from sqlalchemy import Column, Engine, MetaData, Table, create_engine, event, insert, text
+
+from app import create_app, db
+from app.utils import migrations
+from app.utils.database import index_names, table_columns
+from app.utils.migrations import SCHEMA_VERSION, Migration, MigrationContext
+
+# Columns an old database is missing, per table
+LEGACY_MISSING = {
+    'users': {'calendar_preference', 'session_timeout'},
+    'categories': {'is_default', 'user_id'},
+    'transactions': {'user_id', 'bank_source'},
+}
+
+
+class _Statements:
+    """Collect the SQL run on any engine while active."""
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(Engine, 'before_cursor_execute', self._record)
+        return self.statements
+
+    def __exit__(self, *exc):
+        event.remove(Engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+def _create_legacy_database(url):
+    """Tables as an old release created them, with some data in them."""
+    engine = create_engine(url)
+    metadata = MetaData()
+    for name, missing in LEGACY_MISSING.items():
+        Table(name, metadata, *[
+            Column(c.name, c.type, primary_key=c.primary_key)
+            for c in db.metadata.tables[name].columns if c.name not in missing
+        ])
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(metadata.tables['users']), [
+            {'username': 'first', 'password_hash': 'x', 'role': 'superuser'},
+            {'username': 'second', 'password_hash': 'x', 'role': 'standard'},
+        ])
+        conn.execute(insert(metadata.tables['categories']), [
+            {'name': 'Other', 'type': 'expense'},
+            {'name': 'Mine', 'type': 'expense'},
+        ])
+        conn.execute(insert(metadata.tables['transactions']), [
+            {'description': f'legacy {i}', 'amount': i, 'type': 'expense',
+             'date': date(2020, 1, 1), 'category_id': 2}
+            for i in range(7)
+        ])
+    engine.dispose()
+
+
+def test_fresh_database_is_fully_migrated(app):
+    assert [applied_at is not None for _, applied_at in migrations.status(app)] == [True] * len(migrations.MIGRATIONS)
+    assert migrations.upgrade(app) == []
+    with app.app_context():
+        assert migrations.current_version(db.engine) == SCHEMA_VERSION
+
+
+def test_legacy_database_gets_columns_and_batched_backfill(database_url, tmp_path):
+    _create_legacy_database(database_url)
+
+    with _Statements() as statements:
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': database_url,
+            'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+            'MIGRATION_BATCH_SIZE': 3,
+        })
+    try:
+        with app.app_context(), db.engine.connect() as conn:
+            for table, missing in LEGACY_MISSING.items():
+                assert missing <= table_columns(conn, table)
+            owners = conn.execute(text('SELECT DISTINCT user_id FROM transactions')).scalars().all()
+            categories = dict(conn.execute(text('SELECT name, user_id FROM categories')).all())
+            other_default = conn.execute(text("SELECT is_default FROM categories WHERE name = 'Other'")).scalar()
+            first_id = conn.execute(text("SELECT id FROM users WHERE username = 'first'")).scalar()
+        assert owners == [first_id]
+        assert categories['Mine'] == first_id and categories['Other'] is None and other_default
+        # 7 rows in id ranges of 3
+        assert len([s for s in statements if s.startswith('UPDATE transactions SET user_id')]) == 3
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+
+
+def test_indexes_are_rebuilt_online(app):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            conn.execute(text('DROP INDEX ix_budgets_category'))
+            conn.commit()
+            with _Statements() as statements:
+                migrations.create_managed_indexes(MigrationContext(conn, log=lambda message: None))
+            assert 'ix_budgets_category' in index_names(conn, {'budgets'})
+        created = [s for s in statements if s.startswith('CREATE INDEX')]
+        assert len(created) == 1
+        assert ('CONCURRENTLY' in created[0]) == (db.engine.dialect.name == 'postgresql')
+
+
+def test_new_migrations_apply_in_order_up_to_target(app, monkeypatch):
+    calls = []
+    extra = [Migration(SCHEMA_VERSION + 1, 'first', lambda ctx: calls.append(1)),
+             Migration(SCHEMA_VERSION + 2, 'second', lambda ctx: calls.append(2))]
+    monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS + extra)
+
+    assert migrations.upgrade(app, target=SCHEMA_VERSION + 1) == [SCHEMA_VERSION + 1]
+    assert migrations.upgrade(app) == [SCHEMA_VERSION + 2]
+    assert migrations.upgrade(app) == [] and calls == [1, 2]
+    with app.app_context():
+        assert migrations.current_version(db.engine) == SCHEMA_VERSION + 2
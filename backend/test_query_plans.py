@@ -0,0 +1,114 @@
+"""
+Regression test: the report endpoints must be served by index lookups.
+
+Every SQL statement issued while calling /api/reports/* is captured and run
+through EXPLAIN QUERY PLAN; any statement that full-scans transactions or
+budgets fails the test.
+"""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import db, MANAGED_INDEXES
+from app.models.budget import Budget
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.user import User
+
+CHECKED_TABLES = ('transactions', 'budgets')
+
+REPORT_URLS = [
+    '/api/reports/summary?period=monthly',
+    '/api/reports/summary?period=annual',
+    '/api/reports/summary?period=monthly&calendar=badi',
+    '/api/reports/by-category?period=monthly&type=expense',
+    '/api/reports/by-category?period=annual&type=income&include_excluded=true',
+    '/api/reports/budget-analysis?period=monthly&year={year}&month={month}',
+    '/api/reports/trending?months=6',
+    '/api/reports/trending?months=6&calendar=badi',
+    '/api/reports/rollup?calendar=badi&periods=24',
+]
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    # EXPLAIN QUERY PLAN output is SQLite-specific
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def _seed(app):
+    today = date.today()
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        groceries = Category(name='Groceries', type='expense', user_id=admin.id)
+        salary = Category(name='Salary', type='income', user_id=admin.id)
+        db.session.add_all([groceries, salary])
+        db.session.flush()
+        for i in range(60):
+            db.session.add(Transaction(
+                description=f'Purchase {i}', amount=10 + i, type='expense',
+                date=today - timedelta(days=i * 3), category_id=groceries.id,
+                user_id=admin.id, is_excluded=(i % 7 == 0),
+            ))
+        db.session.add(Transaction(
+            description='Payroll', amount=2500, type='income', date=today,
+            category_id=salary.id, user_id=admin.id,
+        ))
+        db.session.add(Budget(
+            category_id=groceries.id, amount=400, period='monthly',
+            year=today.year, month=today.month, user_id=admin.id,
+        ))
+        db.session.commit()
+
+
+def _capture_statements(app, client, url):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return statements
+
+
+def _full_scans(app, statement, parameters):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            plan = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    # Each plan row is (id, parent, notused, detail); a full scan reads
+    # "SCAN <table>" while an index lookup reads "SEARCH <table> USING ...".
+    return [row[3] for row in plan
+            if row[3].startswith('SCAN ') and row[3].split()[1] in CHECKED_TABLES]
+
+
+def test_managed_indexes_exist(app):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            names = {row[0] for row in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    missing = [name for name, _, _ in MANAGED_INDEXES if name not in names]
+    assert not missing, f'Missing indexes: {missing}'
+
+
+@pytest.mark.parametrize('url', REPORT_URLS)
+def test_report_queries_use_indexes(app, client, url):
+    _seed(app)
+    today = date.today()
+    statements = _capture_statements(app, client, url.format(year=today.year, month=today.month))
+
+    checked = [s for s in statements
+               if any(f'FROM {table}' in s[0] for table in CHECKED_TABLES)]
+    assert checked, f'No report queries captured for {url}'
+
+    for statement, parameters in checked:
+        scans = _full_scans(app, statement, parameters)
+        assert not scans, f'{url} full-scans {scans}:\n{statement}'
@@ -0,0 +1,139 @@
+"""
+Tests for bank-statement reconciliation used by delete-by-file.
+"""
+import io
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from app import db
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.utils.reconcile import normalize_tokens, reconcile
+
+DAY = date(2024, 5, 10)
+
+
+def _seed(app, rows, username='admin'):
+    """Insert (description, amount, date) rows for `username`; return their ids."""
+    with app.app_context():
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            user = User(username=username, role='standard')
+            user.set_password('pw')
+            db.session.add(user)
+            db.session.flush()
+        category = Category(name=f'Reconcile {username}', type='expense', user_id=user.id)
+        db.session.add(category)
+        db.session.flush()
+        transactions = [
+            Transaction(description=description, amount=amount, date=day, type='expense',
+                        category_id=category.id, user_id=user.id)
+            for description, amount, day in rows
+        ]
+        db.session.add_all(transactions)
+        db.session.commit()
+        return [t.id for t in transactions]
+
+
+def _admin_id(app):
+    with app.app_context():
+        return User.query.filter_by(username='admin').first().id
+
+
+def test_normalize_tokens_drops_numbers():
+    assert normalize_tokens('TARGET #1234 Minneapolis') == ['target', 'minneapolis']
+    assert normalize_tokens('7-Eleven') == ['eleven']
+    assert normalize_tokens('1234') == ['1234']
+
+
+def test_reconcile_matched_ambiguous_unmatched(app):
+    ids = _seed(app, [
+        ('TARGET STORE 1234', 42.17, DAY),
+        ('Costco Wholesale', 42.17, DAY),
+        ('Shell Oil', 30.00, DAY),
+        ('Chevron', 30.00, DAY),
+    ])
+    rows = [
+        {'payee': 'Target Store', 'amount': 42.17, 'date': DAY},
+        {'payee': '', 'amount': 30.0, 'date': DAY},
+        {'payee': 'Walmart', 'amount': 42.17, 'date': DAY},
+        {'payee': 'Costco', 'amount': None},
+    ]
+    with app.app_context():
+        result = reconcile(_admin_id(app), rows)
+    assert result['matched'] == [{'row': 0, 'transaction_id': ids[0]}]
+    assert result['ambiguous'] == [{'row': 1, 'candidate_ids': [ids[2], ids[3]]}]
+    assert result['unmatched'] == [2, 3]
+
+
+def test_reconcile_consumes_duplicates_and_prefers_same_day(app):
+    ids = _seed(app, [
+        ('Coffee Shop', 4.5, DAY),
+        ('Coffee Shop', 4.5, DAY),
+        ('Coffee Shop', 4.5, DAY + timedelta(days=1)),
+    ])
+    rows = [{'payee': 'coffee', 'amount': -4.5, 'date': DAY + timedelta(days=1)}] + \
+           [{'payee': 'coffee', 'amount': 4.5, 'date': DAY}] * 3
+    with app.app_context():
+        result = reconcile(_admin_id(app), rows)
+    assert [m['transaction_id'] for m in result['matched']] == [ids[2], ids[0], ids[1]]
+    assert result['unmatched'] == [3]
+
+
+def test_reconcile_is_user_scoped(app):
+    _seed(app, [('Netflix', 15.49, DAY)], username='other')
+    with app.app_context():
+        result = reconcile(_admin_id(app), [{'payee': 'Netflix', 'amount': 15.49}])
+    assert result['unmatched'] == [0]
+
+
+def test_statement_is_matched_in_constant_queries(app, client):
+    count = 300
+    _seed(app, [(f'Vendor {i} LLC', 10 + i * 0.25, DAY - timedelta(days=i % 28))
+                for i in range(count)])
+    lines = ['Date,Payee,Amount'] + [
+        f'{(DAY - timedelta(days=i % 28)).isoformat()},Vendor {i},-{10 + i * 0.25:.2f}'
+        for i in range(count)
+    ]
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM transactions' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.post('/api/transactions/bulk-delete-preview/',
+                               data={'file': (io.BytesIO('\n'.join(lines).encode()), 'statement.csv')},
+                               content_type='multipart/form-data')
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    body = response.get_json()
+    assert body['count'] == count
+    assert body['ambiguous'] == [] and body['unmatched_rows'] == []
+    # One query to reconcile, one to load the preview rows
+    assert len(statements) == 2
+
+
+def test_delete_by_file_uses_statement_matches(app, client):
+    ids = _seed(app, [
+        ('TARGET STORE 1234 MINNEAPOLIS', 42.17, DAY),
+        ('TARGET STORE 1234 MINNEAPOLIS', 9.99, DAY),
+        ('Costco', 42.17, DAY),
+    ])
+    statement = b'Payee,Amount\nTarget Store,"(42.17)"\nUnknown,1.00\n'
+    response = client.post('/api/transactions/bulk-delete-by-file/',
+                           data={'file': (io.BytesIO(statement), 'statement.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['deleted_count'] == 1
+    with app.app_context():
+        assert db.session.get(Transaction, ids[0]) is None
+        assert db.session.get(Transaction, ids[2]) is not None
@@ -0,0 +1,85 @@
+"""
+Tests for Gregorian and Badí' period rollups and the trending report.
+"""
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.utils.rollups import periods_between, shift_period, trailing_range
+
+
+def _add(app, *rows):
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        category = Category.query.first()
+        for day, amount, kind in rows:
+            db.session.add(Transaction(description='t', amount=amount, type=kind, date=day,
+                                       category_id=category.id, user_id=admin.id))
+        db.session.commit()
+
+
+def test_badi_periods_include_ayyam_i_ha():
+    # 182 BE: Mulk ends 2026-02-24, Ayyám-i-Há 02-25..03-01, 'Alá' from 03-02
+    periods = periods_between(date(2026, 2, 20), date(2026, 3, 21), 'badi')
+    assert periods == [(182, 18), (182, 0), (182, 19), (183, 1)]
+    assert shift_period((182, 19), -2, 'badi') == (182, 18)
+    assert shift_period((182, 1), -1, 'badi') == (181, 19)
+    assert shift_period((2026, 1), -1) == (2025, 12)
+
+
+def test_trailing_range():
+    assert trailing_range(3, today=date(2026, 2, 10)) == (date(2025, 12, 1), date(2026, 2, 28))
+    start, end = trailing_range(2, 'badi', today=date(2026, 2, 26))
+    assert (start, end) == (date(2026, 2, 6), date(2026, 3, 1))
+
+
+def test_badi_rollup(app, client):
+    _add(app,
+         (date(2026, 2, 24), 10, 'expense'),   # Mulk
+         (date(2026, 2, 25), 20, 'expense'),   # Ayyám-i-Há
+         (date(2026, 3, 1), 5, 'expense'),     # Ayyám-i-Há
+         (date(2026, 3, 1), 100, 'income'),
+         (date(2026, 3, 20), 7, 'expense'),    # 'Alá'
+         (date(2026, 3, 21), 1, 'expense'))    # Bahá 183
+
+    data = client.get('/api/reports/rollup?calendar=badi&date_from=2026-02-20&date_to=2026-03-21').get_json()
+    by_key = {p['key']: p for p in data['periods']}
+    assert list(by_key) == ['182-18', '182-00', '182-19', '183-01']
+    assert by_key['182-00']['expense'] == 25 and by_key['182-00']['income'] == 100
+    assert by_key['182-00']['label'] == 'Ayyám-i-Há 182'
+    assert by_key['182-00']['transaction_count'] == 3
+    assert (by_key['182-19']['expense'], by_key['183-01']['expense']) == (7, 1)
+
+    years = client.get('/api/reports/rollup?calendar=badi&granularity=year'
+                       '&date_from=2026-02-20&date_to=2026-03-21').get_json()['periods']
+    assert [(p['key'], p['expense']) for p in years] == [('182', 42), ('183', 1)]
+
+
+def test_gregorian_rollup_matches_month_totals(app, client):
+    _add(app, (date(2025, 12, 31), 3, 'expense'), (date(2026, 1, 1), 4, 'expense'),
+         (date(2026, 1, 31), 6, 'expense'))
+    periods = client.get('/api/reports/rollup?date_from=2025-12-01&date_to=2026-02-28').get_json()['periods']
+    assert [(p['key'], p['expense']) for p in periods] == [('2025-12', 3), ('2026-01', 10), ('2026-02', 0)]
+
+
+@pytest.mark.parametrize('calendar_type', ['gregorian', 'badi'])
+def test_trending_covers_consecutive_periods(app, client, calendar_type):
+    today = date.today()
+    _add(app, (today, 12.5, 'expense'))
+    data = client.get(f'/api/reports/trending?months=6&calendar={calendar_type}').get_json()
+    assert len(data['data']) == 6
+    assert data['data'][-1]['amount'] == 12.5
+    keys = [d['month'] for d in data['data']]
+    assert len(set(keys)) == 6
+
+
+@pytest.mark.parametrize('url', ['/api/reports/trending?calendar=julian', '/api/reports/rollup?calendar=Badi',
+                                 '/api/reports/rollup?granularity=week'])
+def test_unknown_calendar_or_granularity_is_rejected(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,79 @@
+"""
+Tests for the compiled statement row parsers (app/utils/row_parsers.py).
+"""
+import io
+from datetime import date
+
+import pandas as pd
+
+from app.utils.file_processor import CategorizerSnapshot, parse_csv_rows
+from app.utils.row_parsers import DATE_FORMATS, _date_formats, compile_csv_parser, parse_date, parse_excel_frame
+
+MAPPING = {'date_col': 'Date', 'description_col': 'Payee', 'amount_col': 'Amount', 'category_col': 'Category'}
+SNAPSHOT = CategorizerSnapshot([(['coffee'], 5)], [(['rent'], 7)], 1, {'Food': 9}, {'food': 9})
+
+
+def _parse(text, column_mapping=MAPPING, limit=None):
+    return parse_csv_rows(io.StringIO(text), limit=limit, column_mapping=column_mapping, categorizer=SNAPSHOT)
+
+
+def test_csv_rows_read_like_dict_reader():
+    text = ('Date,Payee,Amount,Memo,Category,Memo\n'
+            '2025-01-05,Coffee Bar,-3.50,first,,last\n'
+            '\n'
+            '2025-01-06, Landlord ,"$1,200.00", ,Food,\n'
+            '2025-01-07,Short row,1\n'
+            '2025-01-08,Long row,2,a,,b,surplus\n'
+            'not a date,Skipped,1,,,\n')
+    rows = _parse(text)
+    assert [(r['description'], r['amount'], r['type'], r['category_id']) for r in rows] == [
+        ('Coffee Bar', 3.5, 'expense', 5), ('Landlord', 1200.0, 'income', 9),
+        ('Short row', 1.0, 'income', 1), ('Long row', 2.0, 'income', 1)]
+    # A repeated column keeps its first place and its last value, missing
+    # fields read None and surplus ones are listed under None
+    assert [r['notes'] for r in rows] == ['Memo: last', '', 'Memo: None', "Memo: b | None: ['surplus']"]
+    assert len(_parse(text, limit=2)) == 2
+
+    fallback = _parse('Posted Date,Memo,Debit,Category\n01/05/2025,Rent,-900,Food\n', column_mapping=None)
+    assert fallback == [{'date': date(2025, 1, 5), 'description': 'Rent', 'amount': 900.0, 'type': 'expense',
+                         'category_id': 7, 'notes': ''}]
+
+
+def test_date_format_order_never_changes_a_result():
+    samples = ['2025-01-05', '01/05/2025', '01-05-2025', '13/01/2025', '2025/01/05', '05/01/2025']
+    for sample in samples:
+        formats = _date_formats(sample)
+        assert sorted(formats) == sorted(DATE_FORMATS)
+        assert [parse_date(s, formats) for s in samples] == [parse_date(s) for s in samples]
+    assert _date_formats('13/01/2025') == DATE_FORMATS
+    assert _date_formats('garbage') is None
+
+
+def test_compiled_parsers_are_cached_per_mapping_and_header():
+    header = ['Date', 'Payee', 'Amount']
+    parser = compile_csv_parser(MAPPING, header)
+    assert compile_csv_parser(dict(reversed(list(MAPPING.items()))), list(header)) is parser
+    assert compile_csv_parser({**MAPPING, 'category_col': 'Type'}, header) is not parser
+    assert compile_csv_parser(MAPPING, header + ['Memo']) is not parser
+
+
+def test_excel_frame_columns():
+    frame = pd.DataFrame({
+        'Date': pd.to_datetime(['2025-02-01', None, '2025-02-03', '2025-02-04']),
+        'Payee': ['Coffee', 'No date', 'Zero', 'Rent'],
+        'Amount': [-4.25, 10.0, 0.0, 950.0],
+        'Category': [None, 'Food', 'Food', ' food '],
+        'Memo': ['x', 'y', None, None],
+    })
+    rows = parse_excel_frame(frame, SNAPSHOT, column_mapping=MAPPING)
+    assert rows == [
+        {'date': date(2025, 2, 1), 'description': 'Coffee', 'amount': 4.25, 'type': 'expense',
+         'category_id': 5, 'notes': 'Memo: x'},
+        {'date': date(2025, 2, 4), 'description': 'Rent', 'amount': 950.0, 'type': 'income',
+         'category_id': 9, 'notes': ''},
+    ]
+
+    text_dates = frame.assign(Date=['02/01/2025', '2025-02-02', 'bad', '2025-02-04'], Amount=['$-4.25', '1', '2', 'x'])
+    assert [r['description'] for r in parse_excel_frame(text_dates, SNAPSHOT, column_mapping=MAPPING)] == \
+        ['Coffee', 'No date']
+    assert parse_excel_frame(frame, SNAPSHOT, column_mapping={**MAPPING, 'amount_col': 'Missing'}) == []
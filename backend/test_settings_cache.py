@@ -0,0 +1,86 @@
+"""
+Tests for the cached ApiStatus/LogSettings layer.
+"""
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.activity_log import ActivityLog
+from app.utils.activity_writer import flush_activity_log
+
+
+def _settings_queries(app, client, url):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if any(f'FROM {t}' in statement for t in ('api_status', 'log_settings', 'settings_version')):
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return response, statements
+
+
+def _login(app):
+    client = app.test_client()
+    assert client.post('/api/auth/login', json={'username': 'admin', 'password': 'money'}).status_code == 200
+    return client
+
+
+def test_hot_requests_skip_settings_queries(app, client):
+    app.config['SETTINGS_CACHE_CHECK_SECONDS'] = 3600
+    client.get('/api/transactions/')
+    response, statements = _settings_queries(app, client, '/api/transactions/')
+    assert response.status_code == 200
+    assert statements == []
+
+
+def test_toggle_takes_effect_immediately(app, client):
+    app.config['SETTINGS_CACHE_CHECK_SECONDS'] = 3600
+    assert client.get('/api/transactions/').status_code == 200
+
+    assert client.post('/api/status/set', json={'is_enabled': False}).status_code == 200
+    assert client.get('/api/transactions/').status_code == 503
+
+    assert client.post('/api/status/toggle', json={}).status_code == 200
+    assert client.get('/api/transactions/').status_code == 200
+
+
+def test_other_workers_reload_after_version_bump(app, client, database_url, tmp_path):
+    # A second app on the same database stands in for another worker
+    other = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': database_url,
+                        'UPLOAD_FOLDER': str(tmp_path / 'uploads2'),
+                        'SETTINGS_CACHE_CHECK_SECONDS': 3600})
+    try:
+        other_client = _login(other)
+        assert other_client.get('/api/transactions/').status_code == 200
+
+        assert client.post('/api/status/set', json={'is_enabled': False}).status_code == 200
+        # Within the check interval the other worker still serves its cached state
+        assert other_client.get('/api/transactions/').status_code == 200
+
+        other.config['SETTINGS_CACHE_CHECK_SECONDS'] = 0
+        assert other_client.get('/api/transactions/').status_code == 503
+    finally:
+        with other.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+def test_log_settings_update_changes_policy(app, client):
+    def transaction_logs():
+        with app.app_context():
+            flush_activity_log()
+            return ActivityLog.query.filter_by(category=ActivityLog.CATEGORY_TRANSACTION).count()
+
+    client.delete('/api/transactions/clear/by-date?date=2024-01-01')
+    assert transaction_logs() == 1
+
+    response = client.put('/api/activity/settings', json={'enabled_categories': ['auth']})
+    assert response.status_code == 200
+    client.delete('/api/transactions/clear/by-date?date=2024-01-01')
+    assert transaction_logs() == 1
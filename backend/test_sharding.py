@@ -0,0 +1,275 @@
+"""
+Tests for per-user SQLite shards (DB_SHARDING=user, app/utils/sharding.py).
+"""
+import io
+import os
+import sqlite3
+import tempfile
+import zipfile
+from datetime import date
+
+import pytest
+
+from app import create_app, db
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.user import User
+
+
+def _create_app(tmp_path, **config):
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'central.db'}",
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'ACTIVITY_ARCHIVE_DIR': str(tmp_path / 'activity_archive'),
+        'SHARD_DIR': str(tmp_path / 'shards'),
+        **config,
+    })
+
+
+def _close(app):
+    writer = app.extensions.get('activity_writer')
+    if writer is not None:
+        writer.close()
+    shards = app.extensions.get('shards')
+    if shards is not None:
+        shards.dispose()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def sharded_app(tmp_path):
+    app = _create_app(tmp_path, DB_SHARDING='user', SQLITE_BUSY_TIMEOUT_MS=200)
+    yield app
+    _close(app)
+
+
+def _login(app, username, password):
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': username, 'password': password})
+    assert response.status_code == 200
+    return client
+
+
+def _add_user(app, username):
+    admin = _login(app, 'admin', 'money')
+    response = admin.post('/api/users/', json={'username': username, 'password': 'secret123', 'role': 'standard'})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['id'], _login(app, username, 'secret123')
+
+
+def _category_id(app):
+    with app.app_context():
+        return Category.query.filter_by(name='Groceries', user_id=None).first().id
+
+
+def _add_transaction(client, category_id, description, amount=25.0):
+    response = client.post('/api/transactions/', json={
+        'description': description, 'amount': amount, 'type': 'expense',
+        'date': '2025-03-14', 'category_id': category_id, 'notes': ''})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['id']
+
+
+def _shard_path(app, user_id):
+    with app.app_context():
+        return app.extensions['shards'].path_for(db.session.get(User, user_id).shard_key)
+
+
+def _shard_descriptions(app, user_id):
+    with sqlite3.connect(_shard_path(app, user_id)) as conn:
+        return sorted(row[0] for row in conn.execute('SELECT description FROM transactions'))
+
+
+def test_each_user_writes_to_their_own_shard(sharded_app, tmp_path):
+    category_id = _category_id(sharded_app)
+    alice_id, alice = _add_user(sharded_app, 'alice')
+    bob_id, bob = _add_user(sharded_app, 'bob')
+    _add_transaction(alice, category_id, 'Corner market')
+    _add_transaction(bob, category_id, 'Farmers market', 40.0)
+
+    assert _shard_descriptions(sharded_app, alice_id) == ['Corner market']
+    assert _shard_descriptions(sharded_app, bob_id) == ['Farmers market']
+    with sqlite3.connect(tmp_path / 'central.db') as conn:
+        assert conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0] == 0
+
+    # Queries joining shard rows with central categories still work
+    assert [t['description'] for t in alice.get('/api/transactions/').get_json()] == ['Corner market']
+    report = bob.get('/api/reports/by-category?period=custom&date_from=2025-03-01&date_to=2025-03-31').get_json()
+    assert report['total'] == 40.0
+    assert report['categories'][0]['category'] == 'Groceries'
+    assert alice.get('/api/transactions/search?q=market').get_json()['total'] == 1
+
+
+def test_users_write_in_parallel(sharded_app):
+    category_id = _category_id(sharded_app)
+    alice_id, alice = _add_user(sharded_app, 'alice')
+    bob_id, bob = _add_user(sharded_app, 'bob')
+    _add_transaction(alice, category_id, 'Opens the shard')
+
+    # Hold alice's write lock: bob's insert must not wait for it
+    blocker = sqlite3.connect(_shard_path(sharded_app, alice_id), isolation_level=None)
+    try:
+        blocker.execute('BEGIN IMMEDIATE')
+        blocker.execute("UPDATE transactions SET notes = 'locked'")
+        _add_transaction(bob, category_id, 'Not blocked')
+        blocker.execute('ROLLBACK')
+    finally:
+        blocker.close()
+    assert _shard_descriptions(sharded_app, bob_id) == ['Not blocked']
+
+
+def test_existing_rows_move_into_the_new_shard(tmp_path):
+    app = _create_app(tmp_path)
+    with app.app_context():
+        user = User(username='carol', role='standard')
+        user.set_password('secret123')
+        db.session.add(user)
+        db.session.flush()
+        category_id = Category.query.filter_by(name='Groceries', user_id=None).first().id
+        db.session.add(Transaction(description='Before sharding', amount=12.5, type='expense',
+                                   date=date(2025, 1, 5), category_id=category_id, user_id=user.id))
+        db.session.commit()
+        user_id = user.id
+    _close(app)
+
+    app = _create_app(tmp_path, DB_SHARDING='user')
+    try:
+        carol = _login(app, 'carol', 'secret123')
+        assert [t['description'] for t in carol.get('/api/transactions/').get_json()] == ['Before sharding']
+        assert carol.get('/api/transactions/search?q=sharding').get_json()['total'] == 1
+        assert _shard_descriptions(app, user_id) == ['Before sharding']
+        with sqlite3.connect(tmp_path / 'central.db') as conn:
+            assert conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0] == 0
+    finally:
+        _close(app)
+
+
+def test_deleting_a_user_removes_their_shard(sharded_app):
+    alice_id, alice = _add_user(sharded_app, 'alice')
+    _add_transaction(alice, _category_id(sharded_app), 'Soon gone')
+    path = _shard_path(sharded_app, alice_id)
+
+    admin = _login(sharded_app, 'admin', 'money')
+    assert admin.delete(f'/api/users/{alice_id}').status_code == 200
+    assert not os.path.exists(path)
+
+
+def test_a_reused_user_id_gets_a_fresh_shard(sharded_app, tmp_path):
+    # A second worker on the same files keeps its engines across the deletion
+    other_worker = _create_app(tmp_path, DB_SHARDING='user')
+    try:
+        category_id = _category_id(sharded_app)
+        alice_id, _ = _add_user(sharded_app, 'alice')
+        _add_transaction(_login(other_worker, 'alice', 'secret123'), category_id, 'Written by the other worker')
+
+        admin = _login(sharded_app, 'admin', 'money')
+        assert admin.delete(f'/api/users/{alice_id}').status_code == 200
+        dave_id, dave = _add_user(sharded_app, 'dave')
+        assert dave_id == alice_id              # SQLite hands the id out again
+
+        _add_transaction(_login(other_worker, 'dave', 'secret123'), category_id, 'Dave via the other worker')
+        _add_transaction(dave, category_id, 'Dave via this worker')
+        assert sorted(t['description'] for t in dave.get('/api/transactions/').get_json()) == \
+            ['Dave via the other worker', 'Dave via this worker']
+        assert _shard_descriptions(sharded_app, dave_id) == ['Dave via the other worker', 'Dave via this worker']
+    finally:
+        _close(other_worker)
+
+
+def test_a_shard_of_another_user_is_rejected(sharded_app):
+    alice_id, alice = _add_user(sharded_app, 'alice')
+    bob_id, _ = _add_user(sharded_app, 'bob')
+    _add_transaction(alice, _category_id(sharded_app), 'Alice only')
+    shards = sharded_app.extensions['shards']
+    shards.dispose()
+    os.replace(_shard_path(sharded_app, alice_id), _shard_path(sharded_app, bob_id))
+
+    with sharded_app.app_context():
+        with pytest.raises(RuntimeError, match='belongs to user'):
+            shards.engine_for(bob_id)
+
+
+def test_sharding_needs_sqlite(tmp_path):
+    with pytest.raises(RuntimeError):
+        _create_app(tmp_path, DB_SHARDING='user', SQLALCHEMY_DATABASE_URI='sqlite://')
+
+
+@pytest.mark.parametrize('sharding', ['none', 'user'])
+def test_profile_reset_clears_every_users_budgets(tmp_path, sharding):
+    app = _create_app(tmp_path, DB_SHARDING=sharding)
+    try:
+        category_id = _category_id(app)
+        admin = _login(app, 'admin', 'money')
+        alice_id, alice = _add_user(app, 'alice')
+        for client in (admin, alice):
+            assert client.post('/api/budgets/', json={'category_id': category_id, 'amount': 300,
+                                                      'period': 'monthly', 'year': 2025, 'month': 3}).status_code == 201
+        alice_shard = _shard_path(app, alice_id) if sharding == 'user' else None
+
+        # Any writer may reset, and it reaches the other users' data too
+        assert alice.post('/api/status/settings/reset').status_code == 200
+        assert admin.get('/api/budgets/').get_json() == []
+        with app.app_context():
+            assert [u.username for u in User.query.all()] == ['admin']
+        if alice_shard:
+            assert not os.path.exists(alice_shard)
+    finally:
+        _close(app)
+
+
+def test_clear_all_stays_in_the_callers_shard(sharded_app):
+    category_id = _category_id(sharded_app)
+    alice_id, alice = _add_user(sharded_app, 'alice')
+    bob_id, bob = _add_user(sharded_app, 'bob')
+    _add_transaction(alice, category_id, 'Alice market')
+    _add_transaction(bob, category_id, 'Bob market')
+
+    assert alice.get('/api/transactions/clear/preview?type=all').get_json()['count'] == 1
+    assert alice.delete('/api/transactions/clear/all').get_json()['deleted_count'] == 1
+    assert _shard_descriptions(sharded_app, alice_id) == []
+    assert _shard_descriptions(sharded_app, bob_id) == ['Bob market']
+
+
+def test_backup_and_restore_cover_the_shards(sharded_app):
+    category_id = _category_id(sharded_app)
+    alice_id, alice = _add_user(sharded_app, 'alice')
+    _add_transaction(alice, category_id, 'In the backup')
+    admin = _login(sharded_app, 'admin', 'money')
+
+    response = admin.get('/api/status/settings/db/backup')
+    assert response.status_code == 200
+    backup = response.get_data()
+    with zipfile.ZipFile(io.BytesIO(backup)) as archive:
+        names = archive.namelist()
+        assert names[0] == 'central.db'
+        shard_name = f'shards/{os.path.basename(_shard_path(sharded_app, alice_id))}'
+        assert shard_name in names
+        with tempfile.TemporaryDirectory() as scratch:
+            archive.extract(shard_name, scratch)
+            with sqlite3.connect(os.path.join(scratch, shard_name)) as conn:
+                assert conn.execute('SELECT description FROM transactions').fetchall() == [('In the backup',)]
+
+    # Changes after the backup, including a user and shard it does not know
+    _add_transaction(alice, category_id, 'After the backup')
+    bob_id, bob = _add_user(sharded_app, 'bob')
+    _add_transaction(bob, category_id, 'Bob after the backup')
+    bob_shard = _shard_path(sharded_app, bob_id)
+
+    response = admin.post('/api/status/settings/db/restore', content_type='multipart/form-data',
+                          data={'file': (io.BytesIO(backup), 'backup.zip')})
+    assert response.status_code == 200, response.get_json()
+    assert _shard_descriptions(sharded_app, alice_id) == ['In the backup']
+    assert not os.path.exists(bob_shard)
+    with sharded_app.app_context():
+        assert User.query.filter_by(username='bob').first() is None
+
+    # A single database file is not a sharded backup
+    with open(_shard_path(sharded_app, alice_id), 'rb') as f:
+        plain = f.read()
+    response = admin.post('/api/status/settings/db/restore', content_type='multipart/form-data',
+                          data={'file': (io.BytesIO(plain), 'expense_tracker.db')})
+    assert response.status_code == 400
+    assert _shard_descriptions(sharded_app, alice_id) == ['In the backup']
@@ -0,0 +1,55 @@
+"""
+Tests for the schema-version guard that skips database setup on boot.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import app as app_module
+from app import create_app, db
+from app.utils.migrations import SCHEMA_VERSION, current_version
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _boot(database_url, tmp_path, **config):
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        **config,
+    })
+
+
+def _dispose(app):
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_setup_is_skipped_once_schema_is_current(app, database_url, tmp_path, monkeypatch):
+    with app.app_context():
+        assert current_version(db.engine) == SCHEMA_VERSION
+
+    def fail(*args, **kwargs):
+        raise AssertionError('setup ran against a current schema')
+
+    monkeypatch.setattr(app_module, 'prepare_database', fail)
+    _dispose(_boot(database_url, tmp_path))
+    _dispose(_boot(database_url, tmp_path, DB_SETUP_MODE='check'))
+
+
+def test_check_mode_refuses_an_unprepared_database(database_url, tmp_path):
+    with pytest.raises(RuntimeError, match='prestart.py'):
+        _boot(database_url, tmp_path, DB_SETUP_MODE='check')
+
+
+def test_create_app_does_not_import_pandas(tmp_path):
+    code = ("import sys; from app import create_app; "
+            f"create_app({{'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///{tmp_path / 'boot.db'}', "
+            f"'UPLOAD_FOLDER': '{tmp_path / 'uploads'}'}}); "
+            "print('pandas' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == 'False'
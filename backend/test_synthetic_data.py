@@ -0,0 +1,83 @@
+"""
+Tests for the synthetic data generator (generate_synthetic_data.py).
+"""
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from app import db
+from app.models.bank_template import BankTemplate
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.utils.file_processor import process_csv_file, process_excel_file
+from app.utils.search import ensure_search_index, search_transaction_ids
+from generate_synthetic_data import TEMPLATE_LAYOUTS, generate
+
+END = date(2025, 6, 30)
+
+
+def _transactions(username):
+    user = User.query.filter_by(username=username).one()
+    return [(t.date, t.description, t.amount, t.type, t.category_id, t.is_excluded)
+            for t in Transaction.query.filter_by(user_id=user.id).order_by(Transaction.id)]
+
+
+def test_same_seed_generates_same_data(app):
+    quiet = lambda message: None
+    first = generate(app, users=2, years=1, seed=7, per_day=1, end=END, prefix='a', log=quiet)
+    second = generate(app, users=2, years=1, seed=7, per_day=1, end=END, prefix='b', log=quiet)
+    assert first == second
+    assert first['transactions'] > 700
+
+    with app.app_context():
+        assert _transactions('a0001') == _transactions('b0001')
+        assert _transactions('a0001') != _transactions('a0002')
+        # The search index is rebuilt after the load
+        user = User.query.filter_by(username='a0001').one()
+        rent = db.session.execute(select(func.count()).where(
+            Transaction.user_id == user.id, Transaction.description == 'RENT PAYMENT LANDLORD')).scalar()
+        assert rent == 13
+        with db.engine.connect() as conn:
+            assert search_transaction_ids(conn, user.id, 'rent landlord')[1] == rent
+
+
+def test_statements_parse_with_their_templates(app, tmp_path):
+    totals = generate(app, users=1, years=1, seed=1, per_day=1, end=END, statements_dir=str(tmp_path),
+                      statement_rows_limit=40, log=lambda message: None)
+    assert totals['statements'] == 2 * len(TEMPLATE_LAYOUTS)
+
+    with app.app_context():
+        user = User.query.filter_by(username='synth0001').one()
+        templates = BankTemplate.query.filter_by(user_id=user.id).all()
+        assert {t.name for t in templates} == set(TEMPLATE_LAYOUTS)
+        for template in templates:
+            slug = template.name.lower().replace(' ', '_')
+            mapping = json.loads(template.column_mapping)
+            for path, process in ((tmp_path / f'{slug}.csv', process_csv_file),
+                                  (tmp_path / f'{slug}.xlsx', process_excel_file)):
+                parsed = process(str(path), user_id=user.id, column_mapping=mapping)
+                assert len(parsed) == 40, path
+                assert all(row['date'] <= END for row in parsed)
+
+
+def test_search_index_survives_a_failed_load(app, monkeypatch):
+    import generate_synthetic_data
+
+    def fail(*args, **kwargs):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(generate_synthetic_data, 'generate_user', fail)
+    with pytest.raises(KeyboardInterrupt):
+        generate(app, users=1, years=1, seed=1, per_day=1, end=END, prefix='broken', log=lambda message: None)
+
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').one()
+        housing = Category.query.filter_by(name='Housing', user_id=None).one()
+        db.session.add(Transaction(description='Landlord rent', amount=900, type='expense', date=END,
+                                   category_id=housing.id, user_id=admin.id))
+        db.session.commit()
+        with db.engine.connect() as conn:
+            assert not ensure_search_index(conn)     # nothing was missing
+            assert search_transaction_ids(conn, admin.id, 'landlord')[1] == 1
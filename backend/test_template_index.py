@@ -0,0 +1,81 @@
+"""
+Tests for the bank template header index (app/utils/template_index.py).
+"""
+import io
+import json
+import random
+
+from app import db
+from app.models.bank_template import BankTemplate
+from app.models.user import User
+from app.utils.template_index import TemplateIndex, get_template_index
+
+MAPPING = {'date_col': 'Date', 'description_col': 'Payee', 'amount_col': 'Amount'}
+
+
+def test_index_ranks_like_match_score():
+    rng = random.Random(3)
+    vocabulary = [f'Column {i}' for i in range(60)] + ['Date', 'Amount', 'Payee', ' memo ']
+    templates = [BankTemplate(id=i, name=f'T{i}', user_id=1, column_mapping=json.dumps(MAPPING),
+                              headers=json.dumps(rng.sample(vocabulary, rng.randint(1, 8))))
+                 for i in range(300)]
+    index = TemplateIndex(templates)
+
+    for _ in range(50):
+        file_headers = [h.upper() for h in rng.sample(vocabulary, rng.randint(1, 12))]
+        expected = sorted(((t.id, round(t.match_score(file_headers), 3)) for t in templates
+                           if t.match_score(file_headers) > 0), key=lambda item: (-item[1], item[0]))
+        assert [(t['id'], score) for t, score in index.matches(file_headers)] == expected
+    assert index.best(['Nothing', 'in common']) == (None, 0)
+
+
+def _create(client, name, headers, **extra):
+    return client.post('/api/bank-templates/', json={
+        'name': name, 'headers': headers, 'column_mapping': MAPPING, **extra})
+
+
+def _detect(client, headers):
+    content = (','.join(headers) + '\n').encode()
+    response = client.post('/api/bank-templates/detect', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(content), 'statement.csv')})
+    assert response.status_code == 200
+    best = response.get_json()['best_match']
+    return best and best['template']['name']
+
+
+def test_shared_templates_and_invalidation(app, client):
+    assert client.post('/api/users/', json={'username': 'sam', 'password': 'secret123',
+                                            'role': 'standard'}).status_code == 201
+    sam = app.test_client()
+    assert sam.post('/api/auth/login', json={'username': 'sam', 'password': 'secret123'}).status_code == 200
+
+    headers = ['Date', 'Payee', 'Amount', 'Reference']
+    assert _create(client, 'Admin Bank', headers).status_code == 201
+    assert _detect(client, headers) == 'Admin Bank'
+    assert _detect(sam, headers) is None
+
+    assert _create(sam, 'Shared by Sam', headers, is_shared=True).status_code == 403
+    shared = _create(client, 'Everyone Bank', headers[:3], is_shared=True).get_json()
+    assert shared['is_shared'] is True
+    assert _detect(sam, headers) == 'Everyone Bank'
+    assert [t['name'] for t in sam.get('/api/bank-templates/').get_json()] == ['Everyone Bank']
+
+    # A user's own template wins a tie against a shared one
+    own = _create(sam, 'Sam Bank', headers[:3]).get_json()
+    assert _detect(sam, headers) == 'Sam Bank'
+    assert sam.delete(f"/api/bank-templates/{own['id']}").status_code == 200
+    assert _detect(sam, headers) == 'Everyone Bank'
+    assert client.delete(f"/api/bank-templates/{shared['id']}").status_code == 200
+    assert _detect(sam, headers) is None
+
+
+def test_index_notices_changes_made_elsewhere(app):
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').one()
+        assert get_template_index(admin.id).best(['Date', 'Payee', 'Amount']) == (None, 0)
+        # As another worker would: no invalidate_templates() in this process
+        db.session.add(BankTemplate(name='Elsewhere', headers=json.dumps(['Date', 'Payee', 'Amount']),
+                                    column_mapping=json.dumps(MAPPING), user_id=admin.id))
+        db.session.commit()
+        template, score = get_template_index(admin.id).best(['Date', 'Payee', 'Amount'])
+        assert (template['name'], score) == ('Elsewhere', 1.0)
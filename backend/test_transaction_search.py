@@ -0,0 +1,103 @@
+"""
+Tests for /api/transactions/search and the search index it is served from.
+"""
+from datetime import date
+
+from app import db
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.user import User
+
+
+def _seed(app, rows, username='admin'):
+    """Insert (description, amount, notes) rows; return their ids."""
+    with app.app_context():
+        user = User.query.filter_by(username=username).first()
+        category = Category(name=f'Search {username}', type='expense', user_id=user.id)
+        db.session.add(category)
+        db.session.flush()
+        transactions = [
+            Transaction(description=description, amount=amount, notes=notes, type='expense',
+                        date=date(2024, 1, 1 + i), category_id=category.id, user_id=user.id,
+                        bank_source='Chase')
+            for i, (description, amount, notes) in enumerate(rows)
+        ]
+        db.session.add_all(transactions)
+        db.session.commit()
+        return [t.id for t in transactions]
+
+
+def _search(client, q, **params):
+    response = client.get('/api/transactions/search', query_string={'q': q, **params})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def test_search_ranks_description_hits_first(app, client):
+    in_notes, in_description = _seed(app, [
+        ('Hardware store', 12.0, 'bought coffee filters'),
+        ('Blue Bottle Coffee', 5.5, None),
+    ])
+
+    result = _search(client, 'coffee')
+    assert result['total'] == 2
+    assert [t['id'] for t in result['transactions']] == [in_description, in_notes]
+
+
+def test_search_matches_prefixes_and_all_terms(app, client):
+    ids = _seed(app, [
+        ('AMAZON MKTPLACE PMTS', 20.0, None),
+        ('Amazon Prime', 14.99, None),
+        ('Whole Foods', 80.0, None),
+    ])
+    assert _search(client, 'amaz')['total'] == 2
+    assert [t['id'] for t in _search(client, 'amazon prime')['transactions']] == [ids[1]]
+    # Bank source is searchable too
+    assert _search(client, 'chase')['total'] == 3
+    # FTS operators in user input are treated as plain words
+    assert _search(client, 'amazon OR "whole')['total'] == 0
+
+
+def test_search_pagination(app, client):
+    _seed(app, [(f'Uber trip {i}', 10.0 + i, None) for i in range(7)])
+    first = _search(client, 'uber', per_page=3)
+    last = _search(client, 'uber', per_page=3, page=3)
+    assert (first['total'], first['pages']) == (7, 3)
+    assert len(first['transactions']) == 3 and len(last['transactions']) == 1
+    seen = {t['id'] for p in (1, 2, 3) for t in _search(client, 'uber', per_page=3, page=p)['transactions']}
+    assert len(seen) == 7
+
+
+def test_search_index_follows_updates_and_deletes(app, client):
+    transaction_id, = _seed(app, [('Netflix', 15.49, None)])
+
+    response = client.put(f'/api/transactions/{transaction_id}',
+                          json={'description': 'Spotify', 'notes': 'family plan'})
+    assert response.status_code == 200
+    assert _search(client, 'netflix')['total'] == 0
+    assert _search(client, 'family')['total'] == 1
+
+    client.delete(f'/api/transactions/{transaction_id}')
+    assert _search(client, 'spotify')['total'] == 0
+
+
+def test_search_is_user_scoped(app, client):
+    with app.app_context():
+        other = User(username='searcher', role='standard')
+        other.set_password('pw')
+        db.session.add(other)
+        db.session.commit()
+    _seed(app, [('Starbucks', 6.0, None)], username='searcher')
+
+    assert _search(client, 'starbucks')['total'] == 0
+
+
+def test_search_requires_query(client):
+    assert client.get('/api/transactions/search?q=').status_code == 400
+
+
+def test_search_uses_index_backend(app):
+    from app.utils.search import search_backend
+    with app.app_context():
+        with db.engine.connect() as conn:
+            assert search_backend(conn) in ('fts5', 'postgresql')
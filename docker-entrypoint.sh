@@ -37,6 +37,15 @@ else
     echo "Database will be created on first run: $DATABASE_PATH"
 fi
 
+# Create/upgrade the schema and seed defaults once, before the workers boot
+echo "Preparing database..."
+if ! python prestart.py; then
+    echo "ERROR: Database preparation failed"
+    exit 1
+fi
+# Workers only verify the schema version instead of repeating the setup
+export DB_SETUP_MODE="${DB_SETUP_MODE:-check}"
+
 echo "Starting application with gunicorn..."
 echo "============================================"
 
@@ -208,17 +208,31 @@ const BADI_MONTHS = [
 ];
 
 // Badí' Calendar Helper Functions
+// Naw-Rúz dates by Gregorian year, loaded from the server (astronomical from 2015)
+let nawRuzDates = {};
+
+async function loadNawRuzDates() {
+    try {
+        const response = await fetch('/api/calendar/badi/naw-ruz', { credentials: 'include' });
+        if (response.ok) nawRuzDates = await response.json();
+    } catch (error) {
+        console.warn('Could not load Naw-Rúz dates:', error);
+    }
+}
+
 function getNawRuz(gregorianYear) {
-    // Naw-Rúz falls on March 20 or 21 depending on the spring equinox
-    // From 2015 onwards, we use March 20 (simplified)
+    // Naw-Rúz falls on March 20 or 21 depending on the spring equinox in Tehran
+    const known = nawRuzDates[gregorianYear];
+    if (known) return new Date(gregorianYear, 2, parseInt(known.slice(8, 10)));
+    // Outside the loaded range: March 21 before 2015, else March 20 (approximation)
     return new Date(gregorianYear, 2, gregorianYear >= 2015 ? 20 : 21);
 }
 
 function isLeapYearBadi(badiYear) {
-    // Check if the Badí' year is a leap year (5 Ayyám-i-Há days instead of 4)
+    // 5 Ayyám-i-Há days instead of 4 when the year is 366 days long
     const gregorianYear = badiYear + 1843;
-    const nextYear = gregorianYear + 1;
-    return (nextYear % 4 === 0 && nextYear % 100 !== 0) || (nextYear % 400 === 0);
+    const yearLength = Math.round((getNawRuz(gregorianYear + 1) - getNawRuz(gregorianYear)) / (1000 * 60 * 60 * 24));
+    return yearLength - 361 === 5;
 }
 
 function gregorianToBadi(gregorianDate) {
@@ -662,6 +676,7 @@ async function handleLogout() {
 }
 
 async function initializeApp() {
+    await loadNawRuzDates();
     const today = new Date();
     const year = today.getFullYear();
     const month = String(today.getMonth() + 1).padStart(2, '0');
@@ -2733,7 +2748,7 @@ async function loadReports() {
         params.append('include_excluded', 'false');
 
         // Load trending data
-        const trendingResponse = await apiFetch(`${API_URL}/reports/trending?months=6&type=expense`);
+        const trendingResponse = await apiFetch(`${API_URL}/reports/trending?months=6&type=expense&calendar=${state.calendarType || 'gregorian'}`);
         const trending = await trendingResponse.json();
         updateTrendingChart(trending);
 
@@ -2759,7 +2774,7 @@ function updateTrendingChart(data) {
     state.charts.trending = new Chart(ctx, {
         type: 'line',
         data: {
-            labels: data.data.map(d => d.month),
+            labels: data.data.map(d => d.label || d.month),
             datasets: [{
                 label: 'Monthly Expenses',
                 data: data.data.map(d => d.amount),
@@ -4145,7 +4160,7 @@ function displayBankTemplates(templates) {
             <tbody>
                 ${templates.map(t => `
                     <tr>
-                        <td style="padding:8px 12px;border-bottom:1px solid var(--border-color,#e0e0e0);font-weight:600;">${escapeHtml(t.name)}</td>
+                        <td style="padding:8px 12px;border-bottom:1px solid var(--border-color,#e0e0e0);font-weight:600;">${escapeHtml(t.name)}${t.is_shared ? ' <span style="font-size:0.75rem;font-weight:400;color:var(--text-muted,#888);">(shared)</span>' : ''}</td>
                         <td style="padding:8px 12px;border-bottom:1px solid var(--border-color,#e0e0e0);font-size:0.85rem;">
                             Date: <em>${escapeHtml(t.column_mapping.date_col || '')}</em><br>
                             Desc: <em>${escapeHtml(t.column_mapping.description_col || '')}</em><br>
@@ -4155,9 +4170,10 @@ function displayBankTemplates(templates) {
                         <td style="padding:8px 12px;border-bottom:1px solid var(--border-color,#e0e0e0);font-size:0.8rem;color:var(--text-muted,#888);">${(t.headers || []).join(', ')}</td>
                         <td style="padding:8px 12px;border-bottom:1px solid var(--border-color,#e0e0e0);font-size:0.85rem;">${t.created_at ? t.created_at.substring(0, 10) : '\u2014'}</td>
                         <td style="padding:8px 12px;border-bottom:1px solid var(--border-color,#e0e0e0);text-align:center;">
+                            ${!state.currentUser || t.user_id === state.currentUser.id ? `
                             <button class="btn-icon delete" title="Delete template" onclick="deleteBankTemplate(${t.id}, '${escapeHtml(t.name)}')">
                                 <i class="fas fa-trash"></i>
-                            </button>
+                            </button>` : ''}
                         </td>
                     </tr>
                 `).join('')}
@@ -5652,7 +5668,7 @@ async function previewAndConfirmClear(type, params) {
         // Update modal message
         let message = '';
         if (type === 'all') {
-            message = 'Are you sure you want to delete ALL transactions?';
+            message = 'Are you sure you want to delete ALL of your transactions?';
         } else if (type === 'date') {
             message = `Are you sure you want to delete all transactions from ${formatDateWithCalendar(params.date)}?`;
         } else if (type === 'period') {
@@ -5896,6 +5912,13 @@ function initializeUploadHistoryListeners() {
 
 let activityLogsPage = 1;
 const activityLogsPerPage = 50;
+// Keyset cursors: activityLogsCursors[n - 1] fetches page n
+let activityLogsCursors = [null];
+
+function resetActivityLogsPaging() {
+    activityLogsPage = 1;
+    activityLogsCursors = [null];
+}
 
 async function loadActivityLogs() {
     const tbody = document.getElementById('activityLogsBody');
@@ -5907,6 +5930,8 @@ async function loadActivityLogs() {
     
     try {
         let url = `/api/activity/?page=${activityLogsPage}&per_page=${activityLogsPerPage}`;
+        const cursor = activityLogsCursors[activityLogsPage - 1];
+        if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
         if (categoryFilter) url += `&category=${categoryFilter}`;
         if (actionFilter) url += `&action=${actionFilter}`;
         if (dateFilter) {
@@ -6002,7 +6027,8 @@ function updateActivityPagination(data) {
     const pageInfo = document.getElementById('activityPageInfo');
     
     if (prevBtn) prevBtn.disabled = activityLogsPage <= 1;
-    if (nextBtn) nextBtn.disabled = activityLogsPage >= data.pages;
+    activityLogsCursors[activityLogsPage] = data.next_cursor || null;
+    if (nextBtn) nextBtn.disabled = !data.next_cursor;
     if (pageInfo) pageInfo.textContent = `Page ${data.page} of ${data.pages || 1}`;
 }
 
@@ -6023,6 +6049,7 @@ async function clearOldActivityLogs() {
         
         if (response.ok) {
             showNotification(`Deleted ${data.deleted_count} old log entries`, 'success');
+            resetActivityLogsPaging();
             loadActivityLogs();
         } else {
             showNotification(data.error || 'Failed to clear logs', 'error');
@@ -6036,22 +6063,25 @@ async function clearOldActivityLogs() {
 function initializeActivityLogsListeners() {
     // Filter change handlers
     document.getElementById('activityCategoryFilter')?.addEventListener('change', () => {
-        activityLogsPage = 1;
+        resetActivityLogsPaging();
         loadActivityLogs();
     });
     
     document.getElementById('activityActionFilter')?.addEventListener('change', () => {
-        activityLogsPage = 1;
+        resetActivityLogsPaging();
         loadActivityLogs();
     });
     
     document.getElementById('activityDateFilter')?.addEventListener('change', () => {
-        activityLogsPage = 1;
+        resetActivityLogsPaging();
         loadActivityLogs();
     });
     
     // Refresh button
-    document.getElementById('refreshActivityLogsBtn')?.addEventListener('click', loadActivityLogs);
+    document.getElementById('refreshActivityLogsBtn')?.addEventListener('click', () => {
+        resetActivityLogsPaging();
+        loadActivityLogs();
+    });
     
     // Pagination
     document.getElementById('activityPrevPage')?.addEventListener('click', () => {
@@ -6062,6 +6092,7 @@ function initializeActivityLogsListeners() {
     });
     
     document.getElementById('activityNextPage')?.addEventListener('click', () => {
+        if (!activityLogsCursors[activityLogsPage]) return;
         activityLogsPage++;
         loadActivityLogs();
     });
@@ -6387,7 +6418,9 @@ function initializeLogSettingsListeners() {
             const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
             a.href = url;
-            a.download = 'expense_tracker.db';
+            // .db, .dump or .zip (sharded installs) depending on the backend
+            const disposition = /filename="?([^";]+)"?/.exec(resp.headers.get('Content-Disposition') || '');
+            a.download = disposition ? disposition[1] : 'expense_tracker.db';
             a.style.display = 'none';
             document.body.appendChild(a);
             a.click();